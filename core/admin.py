@@ -0,0 +1,22 @@
+from django.contrib import admin
+from .models import Generation, Job
+
+
+@admin.register(Job)
+class JobAdmin(admin.ModelAdmin):
+    list_display = (
+        "id",
+        "task",
+        "status",
+        "attempts",
+        "claimed_at",
+        "created_at",
+        "updated_at",
+    )
+    list_filter = ("status", "task")
+    readonly_fields = ("last_error",)
+
+
+@admin.register(Generation)
+class GenerationAdmin(admin.ModelAdmin):
+    list_display = ("name", "value")
@@ -0,0 +1,131 @@
+"""File de tâches adossée à la base de données.
+
+Les vues enfilent des ``Job`` (une simple insertion) ; la commande
+``manage.py run_workers`` les réclame par lots et les exécute dans un pool de
+processus, hors des threads de requête.
+
+Un job réservé depuis plus de ``JOB_STALE_SECONDS`` sans être terminé (worker
+tué) est remis en file, ou marqué en échec s'il a épuisé ses essais : les
+tâches doivent donc être idempotentes et plus courtes que ce délai.
+
+Les jobs terminés ou en échec depuis plus de ``JOB_RETENTION_DAYS`` sont
+supprimés par ``purge`` (appelé régulièrement par ``run_workers``).
+"""
+
+import logging
+import traceback
+from datetime import timedelta
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F, Q
+from django.utils import timezone
+from django.utils.module_loading import import_string
+from .models import Job
+
+logger = logging.getLogger("etickets.business")
+
+MAX_ATTEMPTS = 3
+
+
+def enqueue(task: str, **payload):
+    """Enfile une tâche ``task`` (chemin pointé) avec ses arguments nommés."""
+    return Job.objects.create(task=task, payload=payload)
+
+
+def enqueue_many(task: str, payloads):
+    """Enfile plusieurs exécutions de ``task`` en un seul INSERT."""
+    return Job.objects.bulk_create([Job(task=task, payload=p) for p in payloads])
+
+
+def reclaim_stale():
+    """Remet en file les jobs RUNNING abandonnés ; renvoie leur nombre."""
+    cutoff = timezone.now() - timedelta(
+        seconds=getattr(settings, "JOB_STALE_SECONDS", 600)
+    )
+    # claimed_at vide : réservé avant l'ajout de la colonne
+    stale = Job.objects.filter(
+        Q(claimed_at__lt=cutoff) | Q(claimed_at__isnull=True), status=Job.RUNNING
+    )
+    error = "Réservation expirée (worker interrompu ?)"
+    n = stale.filter(attempts__lt=MAX_ATTEMPTS).update(
+        status=Job.PENDING, claimed_at=None, last_error=error
+    )
+    n += stale.filter(attempts__gte=MAX_ATTEMPTS).update(
+        status=Job.FAILED, last_error=error
+    )
+    if n:
+        logger.warning(f"jobs: {n} stale running job(s) reclaimed")
+    return n
+
+
+def claim(limit: int = 20):
+    """Réserve jusqu'à ``limit`` jobs en attente et renvoie leurs ids.
+
+    Les réservations expirées sont d'abord récupérées (``reclaim_stale``).
+    ``skip_locked`` permet à plusieurs workers de se partager la file sur
+    PostgreSQL ; la clause est ignorée sur SQLite.
+    """
+    reclaim_stale()
+    with transaction.atomic():
+        ids = list(
+            Job.objects.select_for_update(skip_locked=True)
+            .filter(status=Job.PENDING)
+            .order_by("id")
+            .values_list("id", flat=True)[:limit]
+        )
+        if ids:
+            Job.objects.filter(id__in=ids).update(
+                status=Job.RUNNING,
+                attempts=F("attempts") + 1,
+                claimed_at=timezone.now(),
+            )
+    return ids
+
+
+def execute(job_id: int):
+    """Exécute la tâche d'un job réclamé. Appelé dans le processus worker."""
+    job = Job.objects.get(id=job_id)
+    import_string(job.task)(**job.payload)
+
+
+def finish(job_id: int, error: str = ""):
+    """Marque un job terminé, ou le remet en file tant qu'il reste des essais."""
+    if not error:
+        Job.objects.filter(id=job_id).update(status=Job.DONE, last_error="")
+        return
+    logger.warning(f"job {job_id} failed: {error.strip().splitlines()[-1]}")
+    Job.objects.filter(id=job_id, attempts__lt=MAX_ATTEMPTS).update(
+        status=Job.PENDING, last_error=error
+    )
+    Job.objects.filter(id=job_id, attempts__gte=MAX_ATTEMPTS).update(
+        status=Job.FAILED, last_error=error
+    )
+
+
+def purge(days: float = None):
+    """Supprime les jobs DONE/FAILED plus anciens que ``days`` ; renvoie leur nombre."""
+    if days is None:
+        days = getattr(settings, "JOB_RETENTION_DAYS", 7)
+    cutoff = timezone.now() - timedelta(days=days)
+    n, _ = Job.objects.filter(
+        status__in=[Job.DONE, Job.FAILED], updated_at__lt=cutoff
+    ).delete()
+    if n:
+        logger.info(f"jobs: {n} finished job(s) purged")
+    return n
+
+
+def run_pending(limit: int = 100):
+    """Exécute les jobs en attente dans le processus courant (tests, --workers 0).
+
+    Renvoie le nombre de jobs traités, réussis ou non.
+    """
+    ids = claim(limit)
+    for job_id in ids:
+        try:
+            execute(job_id)
+        except Exception:
+            finish(job_id, traceback.format_exc())
+        else:
+            finish(job_id)
+    return len(ids)
@@ -0,0 +1,86 @@
+import multiprocessing
+import os
+import time
+import traceback
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+from django.core.management.base import BaseCommand
+from core import jobs, workers
+
+# Intervalle entre deux purges des jobs terminés (``jobs.purge``), en secondes
+PURGE_INTERVAL = 3600
+
+
+class Command(BaseCommand):
+    help = (
+        "Exécute les jobs en file (rendu des factures, ...) dans un pool de processus"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--workers",
+            type=int,
+            default=os.cpu_count() or 1,
+            help="Taille du pool (0 = exécution dans ce processus)",
+        )
+        parser.add_argument(
+            "--batch", type=int, default=50, help="Jobs réclamés par tour"
+        )
+        parser.add_argument(
+            "--sleep",
+            type=float,
+            default=1.0,
+            help="Attente quand la file est vide (s)",
+        )
+        parser.add_argument(
+            "--once", action="store_true", help="Vider la file puis s'arrêter"
+        )
+
+    def purge_if_due(self):
+        now = time.monotonic()
+        if now - getattr(self, "purged_at", -PURGE_INTERVAL) >= PURGE_INTERVAL:
+            self.purged_at = now
+            jobs.purge()
+
+    def handle(self, *args, **opts):
+        if opts["workers"] <= 0:
+            total = 0
+            while True:
+                self.purge_if_due()
+                n = jobs.run_pending(opts["batch"])
+                total += n
+                if not n:
+                    if opts["once"]:
+                        break
+                    time.sleep(opts["sleep"])
+            self.stdout.write(self.style.SUCCESS(f"Jobs exécutés: {total}"))
+            return
+
+        # "spawn" : chaque worker ouvre ses propres connexions à la base
+        ctx = multiprocessing.get_context("spawn")
+        total = 0
+        with ProcessPoolExecutor(
+            max_workers=opts["workers"], mp_context=ctx, initializer=workers.init
+        ) as pool:
+            running = {}
+            while True:
+                self.purge_if_due()
+                free = opts["batch"] - len(running)
+                for job_id in jobs.claim(free) if free > 0 else []:
+                    running[pool.submit(workers.run, job_id)] = job_id
+                if not running:
+                    if opts["once"]:
+                        break
+                    time.sleep(opts["sleep"])
+                    continue
+                finished, _ = wait(
+                    running, timeout=opts["sleep"], return_when=FIRST_COMPLETED
+                )
+                for fut in finished:
+                    job_id = running.pop(fut)
+                    try:
+                        error = fut.result()
+                    except Exception:  # worker mort (BrokenProcessPool, ...)
+                        error = traceback.format_exc()
+                    jobs.finish(job_id, error)
+                    total += 1
+        self.stdout.write(self.style.SUCCESS(f"Jobs exécutés: {total}"))
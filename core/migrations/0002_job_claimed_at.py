@@ -0,0 +1,7 @@
+from django.db import migrations, models
+
+class Migration(migrations.Migration):
+    dependencies = [("core", "0001_initial")]
+    operations = [
+        migrations.AddField(model_name="job", name="claimed_at", field=models.DateTimeField(blank=True, null=True)),
+    ]
@@ -0,0 +1,13 @@
+from django.db import migrations, models
+
+class Migration(migrations.Migration):
+    dependencies = [("core", "0002_job_claimed_at")]
+    operations = [
+        migrations.CreateModel(
+            name="Generation",
+            fields=[
+                ("name", models.CharField(max_length=64, primary_key=True, serialize=False)),
+                ("value", models.PositiveBigIntegerField(default=0)),
+            ],
+        ),
+    ]
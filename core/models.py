@@ -0,0 +1,70 @@
+import time
+from django.db import models
+from django.db.models import F
+
+
+class Job(models.Model):
+    """Tâche différée stockée en base (file sans broker externe).
+
+    ``task`` est le chemin pointé d'une fonction importable, appelée avec
+    ``payload`` en arguments nommés par ``manage.py run_workers``.
+    ``claimed_at`` date la réservation : un job RUNNING trop ancien (worker
+    tué en cours de route) est remis en file par ``core.jobs.claim``.
+    """
+
+    PENDING, RUNNING, DONE, FAILED = "pending", "running", "done", "failed"
+    STATUSES = [
+        (PENDING, "En attente"),
+        (RUNNING, "En cours"),
+        (DONE, "Terminée"),
+        (FAILED, "Échec"),
+    ]
+
+    task = models.CharField(max_length=200)
+    payload = models.JSONField(default=dict, blank=True)
+    status = models.CharField(max_length=16, choices=STATUSES, default=PENDING)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    last_error = models.TextField(blank=True)
+    claimed_at = models.DateTimeField(null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["status", "id"], name="core_job_status_idx"),
+        ]
+
+    def __str__(self):
+        return f"Job<{self.id} {self.task} {self.status}>"
+
+
+class Generation(models.Model):
+    """Compteur nommé partagé par tous les processus et machines.
+
+    Signale aux caches en mémoire de chaque processus qu'ils doivent se
+    reconstruire (le cache Django par défaut est propre au processus).
+    ``touch`` y range plutôt un horodatage en µs (date d'un événement).
+    """
+
+    name = models.CharField(max_length=64, primary_key=True)
+    value = models.PositiveBigIntegerField(default=0)
+
+    @classmethod
+    def current(cls, name: str) -> int:
+        return (
+            cls.objects.filter(name=name).values_list("value", flat=True).first() or 0
+        )
+
+    @classmethod
+    def bump(cls, name: str):
+        cls.objects.get_or_create(name=name)
+        cls.objects.filter(name=name).update(value=F("value") + 1)
+
+    @classmethod
+    def touch(cls, name: str):
+        cls.objects.update_or_create(
+            name=name, defaults={"value": time.time_ns() // 1000}
+        )
+
+    def __str__(self):
+        return f"{self.name}={self.value}"
@@ -0,0 +1,106 @@
+"""Tests pour core/jobs.py - file de tâches en base"""
+
+import tempfile
+from datetime import timedelta
+from io import StringIO
+from pathlib import Path
+from django.test import TestCase, override_settings
+from django.core.management import call_command
+from django.contrib.auth.models import User
+from django.utils import timezone
+from offers.models import Offer
+from orders.models import Order, OrderItem
+from core.models import Job
+from core import jobs
+
+
+class JobQueueTest(TestCase):
+
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        patcher = override_settings(INVOICE_ROOT=tmp.name)
+        patcher.enable()
+        self.addCleanup(patcher.disable)
+        self.invoices = Path(tmp.name)
+        self.user = User.objects.create_user("queue", password="Password123!")
+        self.offer = Offer.objects.create(
+            name="Duo", offer_type="duo", price_eur=90, is_active=True
+        )
+        self.order = Order.objects.create(user=self.user)
+        OrderItem.objects.create(order=self.order, offer=self.offer, quantity=3)
+
+    def test_checkout_enqueues_invoice_render(self):
+        self.client.login(username="queue", password="Password123!")
+        self.client.post("/api/cart/add/", {"offer_id": self.offer.id, "qty": 1})
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(self.client.post("/api/cart/checkout/").status_code, 200)
+        job = Job.objects.get()
+        self.assertEqual(job.task, "orders.tasks.render_invoice")
+
+        self.assertEqual(jobs.run_pending(), 1)
+        job.refresh_from_db()
+        self.assertEqual(job.status, Job.DONE)
+        self.assertEqual(
+            len(list((self.invoices / str(job.payload["order_id"])).glob("*.pdf"))), 1
+        )
+
+    def test_claim_skips_running_jobs(self):
+        jobs.enqueue("orders.tasks.render_invoice", order_id=0)
+        first = jobs.claim(10)
+        self.assertEqual(len(first), 1)
+        self.assertEqual(jobs.claim(10), [])
+
+    @override_settings(JOB_STALE_SECONDS=60)
+    def test_stale_running_job_is_reclaimed(self):
+        job = jobs.enqueue("orders.tasks.render_invoice", order_id=self.order.id)
+        self.assertEqual(jobs.claim(10), [job.id])
+        # worker tué : la réservation n'est jamais terminée
+        Job.objects.filter(id=job.id).update(
+            claimed_at=timezone.now() - timedelta(seconds=61)
+        )
+        self.assertEqual(jobs.claim(10), [job.id])
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts), (Job.RUNNING, 2))
+        self.assertTrue(job.last_error)
+
+        Job.objects.filter(id=job.id).update(
+            attempts=jobs.MAX_ATTEMPTS,
+            claimed_at=timezone.now() - timedelta(seconds=61),
+        )
+        self.assertEqual(jobs.claim(10), [])
+        job.refresh_from_db()
+        self.assertEqual(job.status, Job.FAILED)
+
+    def test_failed_job_retried_then_marked_failed(self):
+        job = jobs.enqueue("core.jobs.does_not_exist")
+        for _ in range(jobs.MAX_ATTEMPTS):
+            jobs.run_pending()
+        job.refresh_from_db()
+        self.assertEqual(job.status, Job.FAILED)
+        self.assertEqual(job.attempts, jobs.MAX_ATTEMPTS)
+        self.assertTrue(job.last_error)
+
+    def test_run_workers_command_inline(self):
+        jobs.enqueue_many(
+            "orders.tasks.render_invoice", [{"order_id": self.order.id}] * 3
+        )
+        out = StringIO()
+        call_command("run_workers", workers=0, once=True, stdout=out)
+        self.assertIn("3", out.getvalue())
+        self.assertFalse(Job.objects.exclude(status=Job.DONE).exists())
+
+    @override_settings(JOB_RETENTION_DAYS=7)
+    def test_purge_keeps_recent_and_unfinished_jobs(self):
+        old = timezone.now() - timedelta(days=8)
+        done, failed, pending, recent = (
+            jobs.enqueue("orders.tasks.render_invoice", order_id=0) for _ in range(4)
+        )
+        Job.objects.filter(id=done.id).update(status=Job.DONE, updated_at=old)
+        Job.objects.filter(id=failed.id).update(status=Job.FAILED, updated_at=old)
+        Job.objects.filter(id=pending.id).update(updated_at=old)
+        Job.objects.filter(id=recent.id).update(status=Job.DONE)
+        call_command("run_workers", workers=0, once=True, stdout=StringIO())
+        self.assertEqual(
+            set(Job.objects.values_list("id", flat=True)), {pending.id, recent.id}
+        )
@@ -0,0 +1,34 @@
+"""Points d'entrée des processus du pool de ``run_workers``.
+
+Ce module n'importe aucun modèle au chargement : avec le démarrage "spawn",
+il est importé dans un interpréteur neuf avant ``django.setup()``.
+"""
+
+import traceback
+
+
+def init():
+    import django
+
+    django.setup()
+
+
+def run(job_id: int) -> str:
+    """Exécute un job et renvoie la trace d'erreur ('' si succès)."""
+    from core import jobs
+
+    try:
+        jobs.execute(job_id)
+    except Exception:
+        return traceback.format_exc()
+    return ""
+
+
+def render_invoices(order_ids: list) -> list:
+    """Rend (ou relit sur disque) les factures d'un lot : ``[(order_id, pdf), ...]``."""
+    from orders import invoice
+
+    return [
+        (data[0], invoice.get_or_render(data, invoice.content_hash(data)))
+        for data in invoice.invoice_data_many(order_ids)
+    ]
@@ -7,14 +7,34 @@ BASE_DIR = Path(__file__).resolve().parent.parent
 
 # === Environment (12‑factor) ===
 DJANGO_ENV = os.getenv("DJANGO_ENV", "development")
+
+
 def _env_bool(name, default=False):
-    return os.getenv(name, "1" if default else "0").lower() in ("1","true","yes","on")
+    return os.getenv(name, "1" if default else "0").lower() in (
+        "1",
+        "true",
+        "yes",
+        "on",
+    )
 
-DEBUG = (os.getenv("DEBUG", "0").lower() in ("1","true","yes","on")) if DJANGO_ENV == "production" else (os.getenv("DEBUG", "1").lower() in ("1","true","yes","on"))
+
+DEBUG = (
+    (os.getenv("DEBUG", "0").lower() in ("1", "true", "yes", "on"))
+    if DJANGO_ENV == "production"
+    else (os.getenv("DEBUG", "1").lower() in ("1", "true", "yes", "on"))
+)
 SECRET_KEY = os.getenv("DJANGO_SECRET_KEY", "dev-secret-key")
+# Clé HMAC des clés de ticket signées (v2) ; la changer invalide les billets émis
+TICKET_SIGNING_KEY = os.getenv("TICKET_SIGNING_KEY", SECRET_KEY)
 
-ALLOWED_HOSTS = [h.strip() for h in os.getenv("ALLOWED_HOSTS", "127.0.0.1,localhost").split(",") if h.strip()]
-_origins = [o.strip() for o in os.getenv("CSRF_TRUSTED_ORIGINS", "").split(",") if o.strip()]
+ALLOWED_HOSTS = [
+    h.strip()
+    for h in os.getenv("ALLOWED_HOSTS", "127.0.0.1,localhost").split(",")
+    if h.strip()
+]
+_origins = [
+    o.strip() for o in os.getenv("CSRF_TRUSTED_ORIGINS", "").split(",") if o.strip()
+]
 CSRF_TRUSTED_ORIGINS = [o if o.startswith("http") else "https://" + o for o in _origins]
 
 ADMIN_URL = os.getenv("ADMIN_URL", "admin/")
@@ -79,8 +99,13 @@ DATABASES = {
 
 # --- Password validation
 AUTH_PASSWORD_VALIDATORS = [
-    {"NAME": "django.contrib.auth.password_validation.UserAttributeSimilarityValidator"},
-    {"NAME": "django.contrib.auth.password_validation.MinimumLengthValidator", "OPTIONS": {"min_length": 10}},
+    {
+        "NAME": "django.contrib.auth.password_validation.UserAttributeSimilarityValidator"  # noqa: E501
+    },
+    {
+        "NAME": "django.contrib.auth.password_validation.MinimumLengthValidator",
+        "OPTIONS": {"min_length": 10},
+    },
     {"NAME": "django.contrib.auth.password_validation.CommonPasswordValidator"},
     {"NAME": "django.contrib.auth.password_validation.NumericPasswordValidator"},
 ]
@@ -102,6 +127,52 @@ WHITENOISE_AUTOREFRESH = True
 
 MEDIA_URL = "/media/"
 MEDIA_ROOT = BASE_DIR / "media"
+# PDF de factures rendus une fois : hors MEDIA_ROOT, servi publiquement sous /media/
+INVOICE_ROOT = os.getenv("INVOICE_ROOT", str(BASE_DIR / "var" / "invoices"))
+INVOICE_EXPORT_WORKERS = int(
+    os.getenv("INVOICE_EXPORT_WORKERS", "2")
+)  # pool de l'export ZIP (0 = dans la requête)
+
+# --- File de jobs (manage.py run_workers) : au-delà, un job "en cours" est réputé perdu
+JOB_STALE_SECONDS = int(os.getenv("JOB_STALE_SECONDS", "600"))
+JOB_RETENTION_DAYS = float(
+    os.getenv("JOB_RETENTION_DAYS", "7")
+)  # jobs terminés/en échec gardés pour diagnostic
+
+# --- QR codes rendus à la demande (taille du LRU en mémoire, par processus)
+QR_CACHE_SIZE = int(os.getenv("QR_CACHE_SIZE", "1024"))
+
+# --- Vérification des tickets (scanners)
+TICKET_VERIFY_BATCH_MAX = int(os.getenv("TICKET_VERIFY_BATCH_MAX", "500"))
+TICKET_VERIFY_CACHE_TTL = int(
+    os.getenv("TICKET_VERIFY_CACHE_TTL", "300")
+)  # résultats positifs
+TICKET_VERIFY_NEGATIVE_TTL = int(
+    os.getenv("TICKET_VERIFY_NEGATIVE_TTL", "60")
+)  # tickets inconnus
+TICKET_BLOOM_ENABLED = os.getenv("TICKET_BLOOM_ENABLED", "1").lower() in (
+    "1",
+    "true",
+    "yes",
+    "on",
+)  # filtre des clés héritées
+TICKET_BLOOM_FP_RATE = float(os.getenv("TICKET_BLOOM_FP_RATE", "0.001"))
+TICKET_BLOOM_CHECK_INTERVAL = int(
+    os.getenv("TICKET_BLOOM_CHECK_INTERVAL", "30")
+)  # secondes entre 2 lectures de la génération
+TICKET_SNAPSHOT_OVERLAP = int(
+    os.getenv("TICKET_SNAPSHOT_OVERLAP", "60")
+)  # recouvrement des deltas (s)
+
+# --- Catalogue des offres actives en cache (versionné, invalidé par signaux)
+OFFERS_CATALOG_TTL = int(os.getenv("OFFERS_CATALOG_TTL", "3600"))
+
+# --- Panier (orders.cart) : DatabaseCartStore (défaut), SessionCartStore,
+# ou CacheCartStore
+CART_STORE = os.getenv("CART_STORE", "orders.cart.DatabaseCartStore")
+CART_CACHE_TTL = int(
+    os.getenv("CART_CACHE_TTL", str(7 * 24 * 3600))
+)  # CacheCartStore (s)
 
 # --- Auth redirects
 LOGIN_URL = "/login/"
@@ -116,7 +187,11 @@ if DJANGO_ENV == "production":
     SECURE_HSTS_SECONDS = int(os.getenv("SECURE_HSTS_SECONDS", "31536000"))
     SECURE_HSTS_INCLUDE_SUBDOMAINS = _env_bool("SECURE_HSTS_INCLUDE_SUBDOMAINS", True)
     SECURE_HSTS_PRELOAD = _env_bool("SECURE_HSTS_PRELOAD", True)
-    SECURE_PROXY_SSL_HEADER = ("HTTP_X_FORWARDED_PROTO", "https") if _env_bool("USE_X_FORWARDED_PROTO", True) else None
+    SECURE_PROXY_SSL_HEADER = (
+        ("HTTP_X_FORWARDED_PROTO", "https")
+        if _env_bool("USE_X_FORWARDED_PROTO", True)
+        else None
+    )
 else:
     # Paramètres de développement - pas de HTTPS forcé
     SECURE_SSL_REDIRECT = False
@@ -135,4 +210,4 @@ REST_FRAMEWORK = {
     ],
 }
 
-DEFAULT_AUTO_FIELD = "django.db.models.BigAutoField"
\ No newline at end of file
+DEFAULT_AUTO_FIELD = "django.db.models.BigAutoField"
@@ -1,18 +1,38 @@
 from django.contrib import admin
 from .models import Offer
-from orders.models import OrderItem
-from django.db.models import Count
+from . import search
+
 
 @admin.register(Offer)
 class OfferAdmin(admin.ModelAdmin):
-    list_display = ("name","offer_type","price_eur","is_active","sales_count")
-    list_filter = ("offer_type","is_active")
+    list_display = (
+        "name",
+        "offer_type",
+        "price_eur",
+        "is_active",
+        "sales_count",
+        "revenue_display",
+    )
+    readonly_fields = ("tickets_sold", "revenue_eur")
+    list_filter = ("offer_type", "is_active")
     search_fields = ("name",)
 
-    def get_queryset(self, request):
-        qs = super().get_queryset(request)
-        return qs.annotate(_sales=Count("orderitem"))
+    def get_search_results(self, request, queryset, search_term):
+        # index plein texte (offers.search) plutôt qu'un ILIKE '%x%' sans index
+        if not search.words(search_term):
+            return super().get_search_results(request, queryset, search_term)
+        return search.filter_queryset(queryset, search_term), False
 
     def sales_count(self, obj):
-        return getattr(obj, "_sales", 0)
+        return (
+            obj.tickets_sold
+        )  # compteur tenu au checkout, sans jointure sur les lignes
+
     sales_count.short_description = "Ventes"
+    sales_count.admin_order_field = "tickets_sold"
+
+    def revenue_display(self, obj):
+        return f"{obj.revenue_eur:.2f} €"
+
+    revenue_display.short_description = "Chiffre d'affaires"
+    revenue_display.admin_order_field = "revenue_eur"
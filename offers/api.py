@@ -1,12 +1,147 @@
+from decimal import Decimal, InvalidOperation
 from rest_framework.decorators import api_view, permission_classes
 from rest_framework.permissions import AllowAny
 from rest_framework.response import Response
+from django.db.models import Q
+from django.http import HttpResponse
+from django.views.decorators.cache import cache_control
+from django.views.decorators.http import condition
+from . import catalog, search
 from .models import Offer
 from .serializers import OfferSerializer
 
+OFFERS_PAGE_SIZE = 50
+OFFERS_PAGE_MAX = 200
+OFFERS_SEARCH_LIMIT = 20
+OFFERS_SEARCH_MAX = 50
+# Paramètres qui font passer la réponse en page ``{"results", "next_cursor"}``
+PAGE_PARAMS = ("cursor", "limit", "fields", "offer_type", "min_price", "max_price")
+
+
+def _price(value: str) -> Decimal:
+    try:
+        price = Decimal(value)
+    except InvalidOperation:
+        raise ValueError(value)
+    if not price.is_finite():
+        raise ValueError(value)
+    return price
+
+
+def encode_cursor(offer) -> str:
+    return f"{offer.price_eur}_{offer.id}"
+
+
+def decode_cursor(cursor: str):
+    """``"<prix>_<id>"`` vers ``(Decimal, int)`` ; ``ValueError`` si invalide."""
+    price, pk = cursor.split("_", 1)
+    return _price(price), int(pk)
+
+
+def catalog_page(params):
+    """Page d'offres actives triées par ``(price_eur, id)`` (index ``offers_active_*``).
+
+    Les champs non demandés par ``fields`` sont différés en SQL (``.only()``) ;
+    ``ValueError`` avec un message si un paramètre est invalide.
+    """
+    allowed = OfferSerializer.Meta.fields
+    fields = [f for f in params.get("fields", "").split(",") if f] or allowed
+    unknown = set(fields) - set(allowed)
+    if unknown:
+        raise ValueError(f"Champs inconnus: {', '.join(sorted(unknown))}")
+    try:
+        limit = min(max(int(params.get("limit", OFFERS_PAGE_SIZE)), 1), OFFERS_PAGE_MAX)
+    except ValueError:
+        raise ValueError("limit invalide")
+
+    qs = Offer.objects.filter(is_active=True)
+    if params.get("offer_type"):
+        if params["offer_type"] not in dict(Offer.OFFER_TYPES):
+            raise ValueError("offer_type invalide")
+        qs = qs.filter(offer_type=params["offer_type"])
+    for param, lookup in (
+        ("min_price", "price_eur__gte"),
+        ("max_price", "price_eur__lte"),
+    ):
+        if params.get(param):
+            try:
+                qs = qs.filter(**{lookup: _price(params[param])})
+            except ValueError:
+                raise ValueError(f"{param} invalide")
+    if params.get("cursor"):
+        try:
+            price, pk = decode_cursor(params["cursor"])
+        except ValueError:
+            raise ValueError("Curseur invalide")
+        qs = qs.filter(Q(price_eur__gt=price) | Q(price_eur=price, id__gt=pk))
+
+    # id et price_eur servent au curseur même s'ils ne sont pas rendus
+    page = list(
+        qs.order_by("price_eur", "id").only(*{"id", "price_eur", *fields})[: limit + 1]
+    )
+    next_cursor = encode_cursor(page[limit - 1]) if len(page) > limit else None
+    return {
+        "results": OfferSerializer(page[:limit], many=True, fields=fields).data,
+        "next_cursor": next_cursor,
+    }
+
+
+def _catalog_etag(request):
+    return catalog.stamp(request)[0]
+
+
+def _catalog_last_modified(request):
+    return catalog.stamp(request)[1]
+
+
+@cache_control(public=True, no_cache=True)  # CDN et clients revalident par ETag
+@condition(etag_func=_catalog_etag, last_modified_func=_catalog_last_modified)
 @api_view(["GET"])
 @permission_classes([AllowAny])
 def offers_list(request):
-    qs = Offer.objects.filter(is_active=True).order_by("price_eur")
-    data = OfferSerializer(qs, many=True).data
-    return Response(data)
+    """GET /api/offers/ — offres actives.
+
+    Sans paramètre : liste complète, octets JSON servis depuis ``offers.catalog``.
+    Avec ``cursor``, ``limit``, ``fields``, ``offer_type``, ``min_price`` ou
+    ``max_price`` : page ``{"results": [...], "next_cursor": ...}``.
+    ``If-None-Match`` / ``If-Modified-Since`` reçoivent un 304 après la seule
+    lecture de l'empreinte.
+    """
+    if not any(p in request.query_params for p in PAGE_PARAMS):
+        return HttpResponse(
+            catalog.json_bytes(request), content_type="application/json"
+        )
+    try:
+        return Response(catalog_page(request.query_params))
+    except ValueError as exc:
+        return Response({"ok": False, "error": str(exc)}, status=400)
+
+
+@api_view(["GET"])
+@permission_classes([AllowAny])
+def offers_search(request):
+    """GET /api/offers/search/?q=<texte>&limit=<n> — recherche des offres actives.
+
+    Par préfixe et sans accents, sur l'index plein texte (voir ``offers.search``) ;
+    résultats les plus pertinents d'abord.
+    """
+    q = request.query_params.get("q", "").strip()
+    if not search.words(q):
+        return Response({"ok": False, "error": "Paramètre q requis"}, status=400)
+    try:
+        limit = min(
+            max(int(request.query_params.get("limit", OFFERS_SEARCH_LIMIT)), 1),
+            OFFERS_SEARCH_MAX,
+        )
+    except ValueError:
+        return Response({"ok": False, "error": "limit invalide"}, status=400)
+    ids = search.search_ids(q[:200], limit=limit)
+    offers = Offer.objects.in_bulk(ids)
+    return Response(
+        {
+            "q": q,
+            "results": OfferSerializer(
+                [offers[i] for i in ids if i in offers], many=True
+            ).data,
+        }
+    )
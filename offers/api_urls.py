@@ -1,11 +1,23 @@
 from django.urls import path
-from .api import offers_list
-from orders.api import cart_add, checkout, cart_summary, cart_update, cart_clear
+from .api import offers_list, offers_search
+from orders.api import (
+    cart_add,
+    checkout,
+    cart_summary,
+    cart_update,
+    cart_lines,
+    cart_clear,
+    invoices_export,
+)
+
 urlpatterns = [
     path("offers/", offers_list, name="offers_list"),
+    path("offers/search/", offers_search, name="offers_search"),
     path("cart/", cart_summary, name="cart_summary"),
     path("cart/add/", cart_add, name="cart_add"),
     path("cart/update/", cart_update, name="cart_update"),
+    path("cart/lines/", cart_lines, name="cart_lines"),
     path("cart/clear/", cart_clear, name="cart_clear"),
     path("cart/checkout/", checkout, name="checkout"),
+    path("orders/invoices/export/", invoices_export, name="invoices_export"),
 ]
@@ -1,4 +1,30 @@
 from django.apps import AppConfig
+from django.db.models.signals import post_migrate
+
+
+def ensure_search_index(sender, using, **kwargs):
+    """Réinstalle l'index FTS5 si une migration a reconstruit ``offers_offer``.
+
+    SQLite uniquement ; voir ``offers.search.ensure_sqlite``.
+    """
+    from django.db import connections
+    from . import search
+
+    connection = connections[using]
+    if (
+        connection.vendor != "sqlite"
+        or "offers_offer" not in connection.introspection.table_names()
+    ):
+        return
+    with connection.cursor() as cur:
+        search.ensure_sqlite(cur)
+
+
 class OffersConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "offers"
+
+    def ready(self):
+        from . import signals  # noqa: F401
+
+        post_migrate.connect(ensure_search_index, sender=self)
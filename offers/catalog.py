@@ -0,0 +1,133 @@
+"""Cache versionné du catalogue des offres actives.
+
+Les entrées sont rangées sous ``offers_catalog:<version>:<forme>``, où la
+version est l'empreinte de la table des offres (nombre de lignes et
+``Max(updated_at)``) lue en base par une seule requête agrégée. Toute
+écriture d'offre, quel que soit le processus qui la fait (admin, shell,
+``seed_offers``, autre worker), change donc la version vue par tous les
+processus à la requête suivante ; les anciennes entrées ne sont plus jamais
+lues et expirent d'elles-mêmes. Seuls les ``update()`` en masse qui ne
+renseignent pas ``updated_at`` passent inaperçus (les compteurs de ventes,
+absents du catalogue, sont dans ce cas).
+L'API garde directement les octets JSON, sans repasser par DRF.
+
+``stamp()`` fournit l'ETag (cette même empreinte) et la date de dernière
+modification du catalogue : ``Max(updated_at)``, ou la dernière suppression
+d'offre si elle est plus récente (``core.Generation``, datée par le signal
+``post_delete``). Même valeur dans tous les processus, lue dans la même
+requête ; passer ``request`` la mémorise pour la durée de la requête HTTP.
+
+Les compteurs de hits/misses sont propres au processus (``stats()``).
+Une panne du cache ne fait jamais échouer l'affichage du catalogue.
+"""
+
+import hashlib
+import logging
+import threading
+from datetime import datetime, timezone as dt_timezone
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count, Max, Subquery
+from core.models import Generation
+from rest_framework.renderers import JSONRenderer
+from .models import Offer
+
+logger = logging.getLogger("etickets.business")
+
+# ``core.Generation`` datant la dernière suppression (``Max(updated_at)`` n'avance pas)
+DELETED_KEY = "offers_catalog_deleted_at"
+# Attribut de la requête HTTP où ``stamp()`` mémorise l'empreinte lue
+REQUEST_ATTR = "_offers_catalog_stamp"
+
+_lock = threading.Lock()
+_stats = {"hits": 0, "misses": 0}
+
+
+def active_offers():
+    return Offer.objects.filter(is_active=True).order_by("price_eur")
+
+
+def record_deletion():
+    Generation.touch(DELETED_KEY)
+
+
+def _count(outcome: str):
+    with _lock:
+        _stats[outcome] += 1
+
+
+def stats() -> dict:
+    with _lock:
+        return dict(_stats)
+
+
+def _compute_stamp():
+    deleted = Generation.objects.filter(name=DELETED_KEY).values("value")[:1]
+    agg = Offer.objects.aggregate(
+        n=Count("id"), last=Max("updated_at"), deleted=Max(Subquery(deleted))
+    )
+    deleted_at = agg["deleted"] and datetime.fromtimestamp(
+        agg["deleted"] / 1e6, tz=dt_timezone.utc
+    )
+    moments = [m for m in (agg["last"], deleted_at) if m]
+    last = agg["last"] and agg["last"].isoformat()
+    digest = hashlib.sha256(f"{agg['n']}|{last}|{agg['deleted']}".encode())
+    return digest.hexdigest()[:32], max(moments) if moments else None
+
+
+def stamp(request=None):
+    """``(empreinte, dernière modification)`` du catalogue, lus en base.
+
+    Tous les processus calculent la même empreinte pour le même état de la table.
+    """
+    if request is not None and hasattr(request, REQUEST_ATTR):
+        return getattr(request, REQUEST_ATTR)
+    value = _compute_stamp()
+    if request is not None:
+        setattr(request, REQUEST_ATTR, value)
+    return value
+
+
+def version(request=None) -> str:
+    return stamp(request)[0]
+
+
+def _cached(name: str, build, request=None):
+    try:
+        key = f"offers_catalog:{version(request)}:{name}"
+        value = cache.get(key)
+    except Exception as exc:
+        logger.warning(f"offers catalog get failed: {exc}")
+        return build()
+    if value is not None:
+        _count("hits")
+        return value
+    _count("misses")
+    value = build()
+    try:
+        cache.set(key, value, getattr(settings, "OFFERS_CATALOG_TTL", 3600))
+    except Exception as exc:
+        logger.warning(f"offers catalog set failed: {exc}")
+    return value
+
+
+def json_bytes(request=None) -> bytes:
+    """Catalogue sérialisé comme le rendrait ``OfferSerializer`` + ``JSONRenderer``."""
+    from .serializers import OfferSerializer
+
+    return _cached(
+        "json",
+        lambda: JSONRenderer().render(OfferSerializer(active_offers(), many=True).data),
+        request,
+    )
+
+
+def _evaluated():
+    qs = active_offers()
+    len(qs)  # un QuerySet évalué se picke avec ses résultats (``count()`` sans requête)
+    return qs
+
+
+def offers(request=None):
+    """Offres actives (QuerySet déjà évalué) pour la page ``/offers/``."""
+    return _cached("page", _evaluated, request)
@@ -0,0 +1,89 @@
+from decimal import Decimal
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Count, DecimalField, Exists, F, OuterRef, Sum
+from offers.models import Offer
+
+
+class Command(BaseCommand):
+    help = (
+        "Recalcule tickets_sold et revenue_eur des offres depuis les tickets émis, "
+        "par lots"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--chunk-size",
+            type=int,
+            default=500,
+            help="Offres recalculées par transaction",
+        )
+        parser.add_argument(
+            "--dry-run",
+            action="store_true",
+            help="Signaler les écarts sans les corriger",
+        )
+
+    def handle(self, *args, **opts):
+        from orders.models import OrderItem
+        from tickets.models import Ticket
+
+        money = DecimalField(max_digits=12, decimal_places=2)
+        chunk = max(opts["chunk_size"], 1)
+        checked = fixed = 0
+        last_id = 0
+        while True:
+            with transaction.atomic():
+                # Offres verrouillées d'abord : un checkout concurrent attend
+                # (ses tickets ne sont pas encore comptés) ou a déjà validé
+                # (ils le sont)
+                offers = list(
+                    Offer.objects.select_for_update()
+                    .filter(id__gt=last_id)
+                    .order_by("id")
+                    .only("id", "tickets_sold", "revenue_eur")[:chunk]
+                )
+                if not offers:
+                    break
+                ids = [o.id for o in offers]
+                sold = dict(
+                    Ticket.objects.filter(offer_id__in=ids)
+                    .order_by()
+                    .values("offer_id")
+                    .annotate(n=Count("id"))
+                    .values_list("offer_id", "n")
+                )
+                revenue = dict(
+                    OrderItem.objects.filter(offer_id__in=ids)
+                    .filter(Exists(Ticket.objects.filter(order=OuterRef("order_id"))))
+                    .order_by()
+                    .values("offer_id")
+                    .annotate(
+                        total=Sum(
+                            F("unit_price_eur") * F("quantity"), output_field=money
+                        )
+                    )
+                    .values_list("offer_id", "total")
+                )
+                changed = []
+                for offer in offers:
+                    expected = (
+                        sold.get(offer.id, 0),
+                        Decimal(revenue.get(offer.id) or 0).quantize(Decimal("0.01")),
+                    )
+                    if (offer.tickets_sold, offer.revenue_eur) != expected:
+                        self.stdout.write(
+                            f"Offre {offer.id}: {offer.tickets_sold} billets / "
+                            f"{offer.revenue_eur} € -> {expected[0]} / {expected[1]} €"
+                        )
+                        offer.tickets_sold, offer.revenue_eur = expected
+                        changed.append(offer)
+                if changed and not opts["dry_run"]:
+                    Offer.objects.bulk_update(changed, ["tickets_sold", "revenue_eur"])
+            checked += len(offers)
+            fixed += len(changed)
+            last_id = ids[-1]
+        verb = "à corriger" if opts["dry_run"] else "corrigées"
+        self.stdout.write(
+            self.style.SUCCESS(f"Offres vérifiées: {checked}, {verb}: {fixed}")
+        )
@@ -0,0 +1,17 @@
+from django.db import migrations, models
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ('offers', '0002_offer_updated_at'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='offer',
+            index=models.Index(condition=models.Q(('is_active', True)), fields=['offer_type', 'price_eur', 'id'], name='offers_active_type_price_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='offer',
+            index=models.Index(condition=models.Q(('is_active', True)), fields=['price_eur', 'id'], name='offers_active_price_idx'),
+        ),
+    ]
@@ -0,0 +1,59 @@
+from django.db import migrations
+
+# SQL figé à la date de la migration (ne pas importer offers.search, qui peut évoluer)
+FTS_TABLE = 'offers_offer_fts'
+
+SQLITE_INSTALL = [
+    f"CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5("
+    f"name, description, content='offers_offer', content_rowid='id', tokenize='unicode61 remove_diacritics 2')",
+    f"""CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ai AFTER INSERT ON offers_offer BEGIN
+        INSERT INTO {FTS_TABLE}(rowid, name, description) VALUES (new.id, new.name, new.description);
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ad AFTER DELETE ON offers_offer BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, name, description) VALUES ('delete', old.id, old.name, old.description);
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_au AFTER UPDATE OF name, description ON offers_offer BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, name, description) VALUES ('delete', old.id, old.name, old.description);
+        INSERT INTO {FTS_TABLE}(rowid, name, description) VALUES (new.id, new.name, new.description);
+    END""",
+    f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')",
+]
+SQLITE_UNINSTALL = [
+    f"DROP TRIGGER IF EXISTS {FTS_TABLE}_ai",
+    f"DROP TRIGGER IF EXISTS {FTS_TABLE}_ad",
+    f"DROP TRIGGER IF EXISTS {FTS_TABLE}_au",
+    f"DROP TABLE IF EXISTS {FTS_TABLE}",
+]
+
+POSTGRES_INSTALL = [
+    "CREATE EXTENSION IF NOT EXISTS unaccent",
+    """CREATE OR REPLACE FUNCTION offers_unaccent(text) RETURNS text
+        LANGUAGE sql IMMUTABLE PARALLEL SAFE STRICT
+        AS $$ SELECT public.unaccent('public.unaccent'::regdictionary, $1) $$""",
+    """CREATE INDEX IF NOT EXISTS offers_search_idx ON offers_offer
+        USING gin (to_tsvector('simple', offers_unaccent(name || ' ' || description)))""",
+]
+POSTGRES_UNINSTALL = [
+    "DROP INDEX IF EXISTS offers_search_idx",
+    "DROP FUNCTION IF EXISTS offers_unaccent(text)",
+]
+
+def _run(schema_editor, statements):
+    with schema_editor.connection.cursor() as cur:
+        for sql in statements.get(schema_editor.connection.vendor, []):
+            cur.execute(sql)
+
+def install(apps, schema_editor):
+    _run(schema_editor, {'sqlite': SQLITE_INSTALL, 'postgresql': POSTGRES_INSTALL})
+
+def uninstall(apps, schema_editor):
+    _run(schema_editor, {'sqlite': SQLITE_UNINSTALL, 'postgresql': POSTGRES_UNINSTALL})
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ('offers', '0003_offer_catalog_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(install, uninstall),
+    ]
@@ -0,0 +1,59 @@
+from django.db import migrations, models
+from django.db.models import Count, DecimalField, Exists, F, OuterRef, Sum
+
+def backfill(apps, schema_editor):
+    Offer = apps.get_model('offers', 'Offer')
+    OrderItem = apps.get_model('orders', 'OrderItem')
+    Ticket = apps.get_model('tickets', 'Ticket')
+    sold = dict(Ticket.objects.order_by().values('offer_id').annotate(n=Count('id')).values_list('offer_id', 'n'))
+    revenue = dict(OrderItem.objects.filter(Exists(Ticket.objects.filter(order=OuterRef('order_id'))))
+                   .order_by().values('offer_id')
+                   .annotate(total=Sum(F('unit_price_eur') * F('quantity'), output_field=DecimalField(max_digits=12, decimal_places=2)))
+                   .values_list('offer_id', 'total'))
+    for offer_id in set(sold) | set(revenue):
+        Offer.objects.filter(id=offer_id).update(tickets_sold=sold.get(offer_id, 0), revenue_eur=revenue.get(offer_id) or 0)
+
+# Triggers FTS5 de 0004, figés ici (ne pas importer offers.search)
+FTS_TABLE = 'offers_offer_fts'
+SQLITE_TRIGGERS = [
+    f"""CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ai AFTER INSERT ON offers_offer BEGIN
+        INSERT INTO {FTS_TABLE}(rowid, name, description) VALUES (new.id, new.name, new.description);
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ad AFTER DELETE ON offers_offer BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, name, description) VALUES ('delete', old.id, old.name, old.description);
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_au AFTER UPDATE OF name, description ON offers_offer BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, name, description) VALUES ('delete', old.id, old.name, old.description);
+        INSERT INTO {FTS_TABLE}(rowid, name, description) VALUES (new.id, new.name, new.description);
+    END""",
+    f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')",
+]
+
+def reinstall_search(apps, schema_editor):
+    # AddField reconstruit offers_offer sous SQLite : les triggers FTS5 sont perdus
+    if schema_editor.connection.vendor == 'sqlite':
+        with schema_editor.connection.cursor() as cur:
+            for sql in SQLITE_TRIGGERS:
+                cur.execute(sql)
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ('offers', '0004_offer_search'),
+        ('orders', '0005_order_totals_unit_price'),
+        ('tickets', '0004_snapshot_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='offer',
+            name='tickets_sold',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='offer',
+            name='revenue_eur',
+            field=models.DecimalField(decimal_places=2, default=0, editable=False, max_digits=12),
+        ),
+        migrations.RunPython(reinstall_search, migrations.RunPython.noop),
+        migrations.RunPython(backfill, migrations.RunPython.noop),
+    ]
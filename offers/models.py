@@ -1,13 +1,74 @@
 from django.db import models
+from django.db.models import F
+
+# Écrits uniquement par ``Offer.add_sales`` et la réconciliation (UPDATE atomiques)
+COUNTER_FIELDS = ("tickets_sold", "revenue_eur")
+
 
 class Offer(models.Model):
-    SOLO, DUO, FAMILLE = "solo","duo","familiale"
-    OFFER_TYPES = [(SOLO,"Solo"),(DUO,"Duo"),(FAMILLE,"Familiale")]
+    SOLO, DUO, FAMILLE = "solo", "duo", "familiale"
+    OFFER_TYPES = [(SOLO, "Solo"), (DUO, "Duo"), (FAMILLE, "Familiale")]
     name = models.CharField(max_length=100)
     offer_type = models.CharField(max_length=16, choices=OFFER_TYPES)
     description = models.TextField(blank=True)
     price_eur = models.DecimalField(max_digits=8, decimal_places=2)
     is_active = models.BooleanField(default=True)
+    updated_at = models.DateTimeField(auto_now=True)  # Last-Modified du catalogue
+    # Compteurs tenus au checkout (``add_sales``), recalculés par
+    # ``reconcile_offer_sales``
+    tickets_sold = models.PositiveIntegerField(default=0, editable=False)
+    revenue_eur = models.DecimalField(
+        max_digits=12, decimal_places=2, default=0, editable=False
+    )
+
+    class Meta:
+        # Pagination par curseur (price_eur, id) de l'API, avec ou sans filtre de type
+        indexes = [
+            models.Index(
+                fields=["offer_type", "price_eur", "id"],
+                condition=models.Q(is_active=True),
+                name="offers_active_type_price_idx",
+            ),
+            models.Index(
+                fields=["price_eur", "id"],
+                condition=models.Q(is_active=True),
+                name="offers_active_price_idx",
+            ),
+        ]
+
+    def save(self, *args, **kwargs):
+        """Sur une offre existante, ``save()`` sans ``update_fields`` n'écrit pas
+        ``COUNTER_FIELDS`` : une instance périmée (admin, shell) n'écrase pas les
+        ventes enregistrées entre-temps par ``add_sales``.
+
+        Écart avec ``Model.save`` : une valeur de compteur affectée à la main est
+        ignorée (passer ``update_fields`` explicitement, ou ``reconcile_offer_sales``),
+        et si la ligne a été supprimée entre-temps, ``save()`` lève ``DatabaseError``
+        au lieu de la réinsérer.
+        """
+        if not self._state.adding and kwargs.get("update_fields") is None:
+            kwargs["update_fields"] = [
+                f.name
+                for f in self._meta.concrete_fields
+                if not f.primary_key and f.name not in COUNTER_FIELDS
+            ]
+        return super().save(*args, **kwargs)
+
+    @classmethod
+    def add_sales(cls, sales):
+        """Ajoute ``{offer_id: (tickets, montant)}`` aux compteurs.
+
+        Un ``UPDATE ... F()`` par offre.
+
+        Offres traitées par id croissant : deux checkouts concurrents verrouillent
+        les lignes dans le même ordre (pas d'interblocage).
+        """
+        for offer_id in sorted(sales):
+            tickets, amount = sales[offer_id]
+            cls.objects.filter(id=offer_id).update(
+                tickets_sold=F("tickets_sold") + tickets,
+                revenue_eur=F("revenue_eur") + amount,
+            )
 
     def __str__(self):
         return f"{self.name} ({self.offer_type})"
@@ -0,0 +1,154 @@
+"""Recherche plein texte des offres (nom + description), par préfixe et sans accents.
+
+- PostgreSQL : index GIN sur
+  ``to_tsvector('simple', offers_unaccent(nom || ' ' || description))``,
+  requête ``to_tsquery('mot:* & ...')``. ``offers_unaccent`` est une enveloppe
+  IMMUTABLE de l'extension ``unaccent``, indispensable pour indexer l'expression.
+- SQLite : table virtuelle FTS5 ``offers_offer_fts`` à contenu externe,
+  tenue à jour par triggers (``unicode61 remove_diacritics 2``), requête ``"mot"*``.
+
+Dans les deux cas le coût dépend des correspondances, pas de la taille du catalogue.
+Les triggers SQLite disparaissent quand Django reconstruit ``offers_offer``
+(ajout ou modification de colonne) : après chaque ``migrate``, un handler
+``post_migrate`` (``offers.apps``) appelle ``ensure_sqlite``. Les migrations
+gardent leur propre copie figée du SQL.
+"""
+
+import re
+import unicodedata
+from django.db import connection
+from django.db.models.expressions import RawSQL
+
+FTS_TABLE = "offers_offer_fts"
+_WORD_RE = re.compile(r"[^\W_]+")
+
+SQLITE_TRIGGERS = [
+    f"""CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ai
+        AFTER INSERT ON offers_offer BEGIN
+        INSERT INTO {FTS_TABLE}(rowid, name, description)
+            VALUES (new.id, new.name, new.description);
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ad
+        AFTER DELETE ON offers_offer BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, name, description)
+            VALUES ('delete', old.id, old.name, old.description);
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_au
+        AFTER UPDATE OF name, description ON offers_offer BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, name, description)
+            VALUES ('delete', old.id, old.name, old.description);
+        INSERT INTO {FTS_TABLE}(rowid, name, description)
+            VALUES (new.id, new.name, new.description);
+    END""",
+]
+
+
+def ensure_sqlite(cursor) -> bool:
+    """Crée ce qui manque de la table FTS5 et de ses triggers (idempotent).
+
+    Si quelque chose manquait, l'index a pu manquer des écritures : il est
+    reconstruit depuis ``offers_offer``. Renvoie ``True`` dans ce cas.
+    """
+    expected = {FTS_TABLE, f"{FTS_TABLE}_ai", f"{FTS_TABLE}_ad", f"{FTS_TABLE}_au"}
+    cursor.execute(
+        "SELECT name FROM sqlite_master WHERE name IN (%s, %s, %s, %s)",
+        sorted(expected),
+    )
+    if {row[0] for row in cursor.fetchall()} == expected:
+        return False
+    cursor.execute(
+        f"CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5("
+        "name, description, content='offers_offer', content_rowid='id', "
+        "tokenize='unicode61 remove_diacritics 2')"
+    )
+    for sql in SQLITE_TRIGGERS:
+        cursor.execute(sql)
+    cursor.execute(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')")
+    return True
+
+
+def words(q: str) -> list:
+    """Mots de la requête, en minuscules et sans accents."""
+    text = "".join(
+        c for c in unicodedata.normalize("NFKD", q) if not unicodedata.combining(c)
+    )
+    return _WORD_RE.findall(text.lower())
+
+
+def _pg_query(terms) -> str:
+    return " & ".join(f"{t}:*" for t in terms)
+
+
+def _fts_query(terms) -> str:
+    return " ".join(f'"{t}"*' for t in terms)
+
+
+PG_DOCUMENT = "to_tsvector('simple', offers_unaccent(o.name || ' ' || o.description))"
+
+
+def search_ids(q: str, limit=20, active_only: bool = True) -> list:
+    """Identifiants des offres dont le nom ou la description contient des mots
+    commençant par chacun des mots de ``q`` (tous requis), les plus pertinentes d'abord.
+    """
+    terms = words(q)
+    if not terms:
+        return []
+    active = "AND o.is_active" if active_only else ""
+    limit_sql = "LIMIT %s" if limit else ""
+    if connection.vendor == "postgresql":
+        query = "to_tsquery('simple', %s)"
+        sql = (
+            f"SELECT o.id FROM offers_offer o WHERE {PG_DOCUMENT} @@ {query} {active} "
+            f"ORDER BY ts_rank({PG_DOCUMENT}, {query}) DESC, o.id {limit_sql}"
+        )
+        params = [_pg_query(terms)] * 2
+    elif connection.vendor == "sqlite":
+        sql = (
+            f"SELECT o.id FROM {FTS_TABLE} "
+            f"JOIN offers_offer o ON o.id = {FTS_TABLE}.rowid "
+            f"WHERE {FTS_TABLE} MATCH %s {active} "
+            f"ORDER BY bm25({FTS_TABLE}), o.id {limit_sql}"
+        )
+        params = [_fts_query(terms)]
+    else:  # autres moteurs : balayage, sans index
+        from .models import Offer
+
+        qs = (
+            Offer.objects.filter(is_active=True) if active_only else Offer.objects.all()
+        )
+        ids = filter_queryset(qs, q).order_by("id").values_list("id", flat=True)
+        return list(ids[:limit] if limit else ids)
+    if limit:
+        params.append(limit)
+    with connection.cursor() as cur:
+        cur.execute(sql, params)
+        return [row[0] for row in cur.fetchall()]
+
+
+def filter_queryset(qs, q: str):
+    """``qs`` (offres) restreint aux correspondances de ``q``, sans tri par pertinence.
+
+    Filtre par sous-requête SQL : aucune liste d'ids ne transite par Python,
+    quel que soit le nombre de correspondances (recherche de l'admin).
+    """
+    terms = words(q)
+    if not terms:
+        return qs.none()
+    if connection.vendor == "postgresql":
+        return qs.filter(
+            id__in=RawSQL(
+                f"SELECT o.id FROM offers_offer o "
+                f"WHERE {PG_DOCUMENT} @@ to_tsquery('simple', %s)",
+                [_pg_query(terms)],
+            )
+        )
+    if connection.vendor == "sqlite":
+        return qs.filter(
+            id__in=RawSQL(
+                f"SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s",
+                [_fts_query(terms)],
+            )
+        )
+    for t in terms:
+        qs = qs.filter(name__icontains=t) | qs.filter(description__icontains=t)
+    return qs
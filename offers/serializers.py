@@ -1,7 +1,15 @@
 from rest_framework import serializers
 from .models import Offer
 
+
 class OfferSerializer(serializers.ModelSerializer):
     class Meta:
         model = Offer
-        fields = ["id","name","offer_type","description","price_eur","is_active"]
+        fields = ["id", "name", "offer_type", "description", "price_eur", "is_active"]
+
+    def __init__(self, *args, fields=None, **kwargs):
+        """``fields`` : sous-ensemble des champs à rendre (``?fields=`` de l'API)."""
+        super().__init__(*args, **kwargs)
+        if fields is not None:
+            for name in set(self.fields) - set(fields):
+                self.fields.pop(name)
@@ -0,0 +1,17 @@
+from django.db.models.signals import post_delete
+from django.dispatch import receiver
+from . import catalog
+from .models import Offer
+
+
+@receiver(post_delete, sender=Offer)
+def record_catalog_deletion(sender, instance, **kwargs):
+    """Date la suppression en base pour ``Last-Modified``.
+
+    ``Max(updated_at)`` ne bouge pas quand une offre disparaît.
+
+    La version du cache et l'ETag se lisent en base : ils suivent déjà toute
+    écriture, y compris celles des autres processus. Un ``delete()`` sur un
+    QuerySet émet aussi ce signal ; seul du SQL brut y échappe.
+    """
+    catalog.record_deletion()
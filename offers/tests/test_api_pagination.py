@@ -0,0 +1,77 @@
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from offers.models import Offer
+
+
+class OffersApiPaginationTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        for i, (kind, price) in enumerate(
+            [("solo", 50), ("duo", 90), ("solo", 50), ("familiale", 150), ("solo", 20)]
+        ):
+            Offer.objects.create(
+                name=f"Offre {i}",
+                offer_type=kind,
+                price_eur=price,
+                description="x" * 500,
+            )
+        Offer.objects.create(
+            name="Inactive", offer_type="solo", price_eur=1, is_active=False
+        )
+
+    def _pages(self, query):
+        url, seen = f"/api/offers/?{query}", []
+        while url:
+            data = self.client.get(url).json()
+            seen.extend(data["results"])
+            url = (
+                f"/api/offers/?{query}&cursor={data['next_cursor']}"
+                if data["next_cursor"]
+                else None
+            )
+        return seen
+
+    def test_bare_request_keeps_full_list(self):
+        data = self.client.get("/api/offers/").json()
+        self.assertIsInstance(data, list)
+        self.assertEqual(len(data), 5)
+
+    def test_cursor_walks_price_then_id(self):
+        expected = list(
+            Offer.objects.filter(is_active=True)
+            .order_by("price_eur", "id")
+            .values_list("id", flat=True)
+        )
+        self.assertEqual([o["id"] for o in self._pages("limit=2")], expected)
+
+    def test_filters(self):
+        solo = self._pages("offer_type=solo&limit=1")
+        self.assertEqual([o["price_eur"] for o in solo], ["20.00", "50.00", "50.00"])
+        ranged = self._pages("min_price=50&max_price=90")
+        self.assertEqual(
+            sorted(o["price_eur"] for o in ranged), ["50.00", "50.00", "90.00"]
+        )
+
+    def test_sparse_fields_deferred_in_sql(self):
+        with CaptureQueriesContext(connection) as ctx:
+            data = self.client.get("/api/offers/?fields=id,name").json()
+        self.assertEqual(set(data["results"][0]), {"id", "name"})
+        self.assertEqual(
+            len(ctx.captured_queries), 2
+        )  # empreinte du catalogue, puis la page
+        self.assertNotIn("description", ctx.captured_queries[1]["sql"])
+
+    def test_invalid_parameters(self):
+        for query in (
+            "fields=id,secret",
+            "offer_type=vip",
+            "min_price=abc",
+            "cursor=nope",
+            "limit=x",
+            "max_price=NaN",
+        ):
+            resp = self.client.get(f"/api/offers/?{query}")
+            self.assertEqual(resp.status_code, 400, query)
+            self.assertFalse(resp.json()["ok"])
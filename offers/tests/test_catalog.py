@@ -0,0 +1,65 @@
+import json
+from django.core.cache import cache
+from django.test import TestCase
+from django.utils import timezone
+from offers import catalog
+from offers.models import Offer
+
+
+class OffersCatalogCacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.solo = Offer.objects.create(name="Solo", offer_type="solo", price_eur=50)
+        Offer.objects.create(name="Duo", offer_type="duo", price_eur=90)
+        Offer.objects.create(
+            name="Ancienne", offer_type="solo", price_eur=10, is_active=False
+        )
+
+    def test_api_served_from_cache(self):
+        before = catalog.stats()
+        first = self.client.get("/api/offers/")
+        with self.assertNumQueries(
+            1
+        ):  # empreinte de la table, lue une fois par requête
+            second = self.client.get("/api/offers/")
+        self.assertEqual(first.content, second.content)
+        self.assertEqual([o["name"] for o in first.json()], ["Solo", "Duo"])
+        self.assertEqual(first.json()[0]["price_eur"], "50.00")
+        after = catalog.stats()
+        self.assertEqual(
+            (after["misses"] - before["misses"], after["hits"] - before["hits"]), (1, 1)
+        )
+
+    def test_save_and_delete_invalidate(self):
+        self.client.get("/api/offers/")
+        self.solo.price_eur = 95
+        self.solo.save()
+        self.assertEqual(
+            [o["name"] for o in self.client.get("/api/offers/").json()], ["Duo", "Solo"]
+        )
+        self.solo.delete()
+        self.assertEqual(
+            [o["name"] for o in json.loads(self.client.get("/api/offers/").content)],
+            ["Duo"],
+        )
+
+    def test_page_uses_cached_offers(self):
+        self.client.get("/offers/")
+        with self.assertNumQueries(1):
+            resp = self.client.get("/offers/")
+        self.assertEqual([o.name for o in resp.context["offers"]], ["Solo", "Duo"])
+
+    def test_write_without_signal_is_seen(self):
+        """Écriture d'un autre processus : aucun signal ici, version lue en base."""
+        catalog.json_bytes()
+        Offer.objects.filter(id=self.solo.id).update(
+            name="Solo renommée", updated_at=timezone.now()
+        )
+        self.assertIn(b"Solo renomm", catalog.json_bytes())
+        Offer.objects.bulk_create([Offer(name="Trio", offer_type="duo", price_eur=120)])
+        self.assertIn(b"Trio", catalog.json_bytes())
+
+    def test_lost_cache_starts_fresh(self):
+        catalog.json_bytes()
+        cache.clear()
+        self.assertEqual(len(json.loads(catalog.json_bytes())), 2)
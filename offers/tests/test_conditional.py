@@ -0,0 +1,81 @@
+from datetime import timedelta
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.test import TestCase
+from django.utils import timezone
+from django.utils.http import http_date, parse_http_date
+from offers.models import Offer
+
+
+class CatalogConditionalGetTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.offer = Offer.objects.create(name="Solo", offer_type="solo", price_eur=50)
+
+    def test_offer_updated_at_moves_on_save(self):
+        before = self.offer.updated_at
+        self.offer.price_eur = 60
+        self.offer.save()
+        self.assertGreater(self.offer.updated_at, before)
+
+    def test_api_if_none_match(self):
+        first = self.client.get("/api/offers/")
+        etag = first["ETag"]
+        self.assertIn("no-cache", first["Cache-Control"])
+        with self.assertNumQueries(
+            1
+        ):  # l'empreinte seule, calculée une fois pour ETag et Last-Modified
+            resp = self.client.get("/api/offers/", HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(resp.status_code, 304)
+        self.offer.delete()
+        resp = self.client.get("/api/offers/", HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(resp.status_code, 200)
+        self.assertNotEqual(resp["ETag"], etag)
+
+    def test_api_if_modified_since(self):
+        last_modified = self.client.get("/api/offers/")["Last-Modified"]
+        resp = self.client.get("/api/offers/", HTTP_IF_MODIFIED_SINCE=last_modified)
+        self.assertEqual(resp.status_code, 304)
+        resp = self.client.get("/api/offers/", HTTP_IF_MODIFIED_SINCE=http_date(0))
+        self.assertEqual(resp.status_code, 200)
+
+    def test_stamp_read_from_database(self):
+        """Même ETag quel que soit le cache du processus (autre worker, redémarrage)."""
+        etag = self.client.get("/api/offers/")["ETag"]
+        cache.clear()
+        self.assertEqual(
+            self.client.get("/api/offers/", HTTP_IF_NONE_MATCH=etag).status_code, 304
+        )
+
+    def test_deletion_moves_last_modified(self):
+        Offer.objects.create(name="Duo", offer_type="duo", price_eur=90)
+        Offer.objects.update(updated_at=timezone.now() - timedelta(hours=1))
+        last_modified = self.client.get("/api/offers/")["Last-Modified"]
+        self.offer.delete()
+        cache.clear()
+        resp = self.client.get("/api/offers/", HTTP_IF_MODIFIED_SINCE=last_modified)
+        self.assertEqual(resp.status_code, 200)
+        self.assertGreater(
+            parse_http_date(resp["Last-Modified"]), parse_http_date(last_modified)
+        )
+
+    def test_page_etag_depends_on_user(self):
+        anonymous = self.client.get("/offers/")["ETag"]
+        self.assertEqual(
+            self.client.get("/offers/", HTTP_IF_NONE_MATCH=anonymous).status_code, 304
+        )
+        User.objects.create_user("fan", password="StrongPassw0rd!")
+        self.client.login(username="fan", password="StrongPassw0rd!")
+        resp = self.client.get("/offers/", HTTP_IF_NONE_MATCH=anonymous)
+        self.assertEqual(resp.status_code, 200)
+        self.assertContains(resp, "fan")
+
+    def test_pending_messages_bypass_304(self):
+        User.objects.create_user("fan", password="StrongPassw0rd!")
+        self.client.login(username="fan", password="StrongPassw0rd!")
+        etag = self.client.get("/offers/")["ETag"]
+        self.client.get(
+            "/orders/checkout/"
+        )  # panier vide : message puis redirection vers /offers/
+        resp = self.client.get("/offers/", HTTP_IF_NONE_MATCH=etag)
+        self.assertContains(resp, "Votre panier est vide")
@@ -0,0 +1,83 @@
+import io
+from decimal import Decimal
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.db import DatabaseError, transaction
+from django.test import TestCase
+from offers.models import Offer
+from orders.models import Order, OrderItem
+
+
+class OfferSalesCountersTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user("buyer", password="StrongPassw0rd!")
+        self.solo = Offer.objects.create(name="Solo", offer_type="solo", price_eur=50)
+        self.duo = Offer.objects.create(name="Duo", offer_type="duo", price_eur=90)
+        self.client.login(username="buyer", password="StrongPassw0rd!")
+
+    def _checkout(self, *lines):
+        for offer, qty in lines:
+            self.client.post("/api/cart/add/", {"offer_id": offer.id, "qty": qty})
+        self.assertEqual(self.client.post("/api/cart/checkout/").status_code, 200)
+
+    def test_checkout_increments_counters(self):
+        self._checkout((self.solo, 2), (self.duo, 1))
+        self.solo.price_eur = (
+            10  # prix figé sur la ligne : le chiffre d'affaires n'en dépend pas
+        )
+        self.solo.save()
+        self._checkout((self.solo, 1))
+        self.solo.refresh_from_db()
+        self.duo.refresh_from_db()
+        self.assertEqual(
+            (self.solo.tickets_sold, self.solo.revenue_eur), (3, Decimal("110.00"))
+        )
+        self.assertEqual(
+            (self.duo.tickets_sold, self.duo.revenue_eur), (1, Decimal("90.00"))
+        )
+
+    def test_abandoned_cart_is_not_a_sale(self):
+        self.client.post("/api/cart/add/", {"offer_id": self.solo.id, "qty": 4})
+        self.solo.refresh_from_db()
+        self.assertEqual(self.solo.tickets_sold, 0)
+
+    def test_reconcile_fixes_drift(self):
+        self._checkout((self.solo, 2))
+        order = Order.objects.create(user=self.user)  # panier abandonné, ignoré
+        OrderItem.objects.create(order=order, offer=self.duo, quantity=5)
+        Offer.objects.filter(id=self.solo.id).update(tickets_sold=7, revenue_eur=1)
+        out = io.StringIO()
+        call_command("reconcile_offer_sales", "--dry-run", stdout=out)
+        self.assertIn("à corriger: 1", out.getvalue())
+        self.assertEqual(Offer.objects.get(id=self.solo.id).tickets_sold, 7)
+        call_command("reconcile_offer_sales", "--chunk-size", "1", stdout=out)
+        self.solo.refresh_from_db()
+        self.assertEqual(
+            (self.solo.tickets_sold, self.solo.revenue_eur), (2, Decimal("100.00"))
+        )
+        self.assertEqual(Offer.objects.get(id=self.duo.id).tickets_sold, 0)
+
+    def test_admin_reads_counters(self):
+        self._checkout((self.solo, 2))
+        User.objects.create_superuser("admin", "admin@example.com", "StrongPassw0rd!")
+        self.client.login(username="admin", password="StrongPassw0rd!")
+        resp = self.client.get("/admin/offers/offer/")
+        self.assertContains(resp, "100.00 €")
+        self.assertNotIn("orders_orderitem", str(resp.context["cl"].queryset.query))
+
+    def test_stale_instance_save(self):
+        stale = Offer.objects.get(id=self.solo.id)
+        self._checkout((self.solo, 2))
+        stale.name = "Solo renommé"
+        stale.tickets_sold = 99  # ignoré sans update_fields explicite
+        stale.save()
+        self.solo.refresh_from_db()
+        self.assertEqual((self.solo.name, self.solo.tickets_sold), ("Solo renommé", 2))
+        stale.save(update_fields=["tickets_sold"])
+        self.assertEqual(Offer.objects.get(id=self.solo.id).tickets_sold, 99)
+
+        gone = Offer.objects.create(name="Éphémère", offer_type="solo", price_eur=5)
+        Offer.objects.filter(id=gone.id).delete()
+        with self.assertRaises(DatabaseError), transaction.atomic():
+            gone.save()  # pas de réinsertion silencieuse
+        self.assertFalse(Offer.objects.filter(id=gone.id).exists())
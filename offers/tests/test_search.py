@@ -0,0 +1,103 @@
+from unittest import skipUnless
+from django.contrib.auth.models import User
+from django.core.management.sql import emit_post_migrate_signal
+from django.db import connection
+from django.test import TestCase
+from offers import search
+from offers.models import Offer
+
+
+class OfferSearchTests(TestCase):
+    def setUp(self):
+        self.athle = Offer.objects.create(
+            name="Athlétisme — finale 100 m",
+            offer_type="solo",
+            price_eur=80,
+            description="Stade de France, session du soir",
+        )
+        self.escrime = Offer.objects.create(
+            name="Escrime",
+            offer_type="duo",
+            price_eur=60,
+            description="Épée individuelle, Grand Palais",
+        )
+        self.natation = Offer.objects.create(
+            name="Natation",
+            offer_type="familiale",
+            price_eur=120,
+            description="Finales à La Défense Arena",
+        )
+        Offer.objects.create(
+            name="Athlétisme qualifications",
+            offer_type="solo",
+            price_eur=30,
+            is_active=False,
+        )
+
+    def _names(self, q):
+        resp = self.client.get("/api/offers/search/", {"q": q})
+        self.assertEqual(resp.status_code, 200)
+        return [o["name"] for o in resp.json()["results"]]
+
+    def test_prefix_and_accent_insensitive(self):
+        self.assertEqual(self._names("athle"), [self.athle.name])
+        self.assertEqual(self._names("EPEE"), ["Escrime"])
+        self.assertEqual(self._names("defen"), ["Natation"])
+
+    def test_all_words_required(self):
+        self.assertEqual(
+            sorted(self._names("final")), sorted([self.athle.name, "Natation"])
+        )
+        self.assertEqual(self._names("final stade"), [self.athle.name])
+
+    def test_index_follows_updates_and_deletes(self):
+        self.escrime.name = "Sabre"
+        self.escrime.save()
+        self.assertEqual(self._names("escri"), [])
+        self.assertEqual(self._names("sab"), ["Sabre"])
+        self.natation.delete()
+        self.assertEqual(self._names("arena"), [])
+
+    def test_query_syntax_is_not_interpreted(self):
+        self.assertEqual(self._names('"athle*" ) (^'), [self.athle.name])
+        self.assertEqual(
+            self.client.get("/api/offers/search/", {"q": " *- "}).status_code, 400
+        )
+        self.assertEqual(self.client.get("/api/offers/search/").status_code, 400)
+
+    def test_admin_search_uses_index_and_includes_inactive(self):
+        self.assertEqual(
+            len(search.search_ids("athletisme", limit=None, active_only=False)), 2
+        )
+        User.objects.create_superuser("admin", "admin@example.com", "StrongPassw0rd!")
+        self.client.login(username="admin", password="StrongPassw0rd!")
+        resp = self.client.get("/admin/offers/offer/", {"q": "qualif"})
+        self.assertContains(resp, "Athlétisme qualifications")
+        self.assertNotContains(resp, "Escrime")
+
+    def test_admin_filter_is_a_subquery(self):
+        qs = search.filter_queryset(
+            Offer.objects.all(), "a"
+        )  # requête courte, nombreuses correspondances
+        self.assertEqual(qs.count(), 3)
+        sql, params = qs.query.sql_with_params()
+        self.assertIn("SELECT", sql.split("IN", 1)[1])  # pas de liste d'ids liés
+        self.assertEqual(len(params), 1)
+
+
+@skipUnless(connection.vendor == "sqlite", "index FTS5 propre à SQLite")
+class SqliteSearchIndexRepairTests(TestCase):
+    def test_post_migrate_reinstalls_lost_triggers(self):
+        with connection.cursor() as cur:
+            self.assertFalse(search.ensure_sqlite(cur))  # déjà complet : rien à faire
+            cur.execute(
+                f"DROP TRIGGER {search.FTS_TABLE}_ai"
+            )  # comme après une reconstruction de table
+        Offer.objects.create(name="Handball", offer_type="solo", price_eur=40)
+        self.assertEqual(search.search_ids("handb"), [])
+        emit_post_migrate_signal(0, False, "default")
+        self.assertEqual(
+            search.search_ids("handb"), list(Offer.objects.values_list("id", flat=True))
+        )
+        Offer.objects.create(name="Handisport", offer_type="solo", price_eur=20)
+        self.assertEqual(len(search.search_ids("handi")), 1)
@@ -1,8 +1,30 @@
+import hashlib
+from django.contrib.messages import get_messages
 from django.shortcuts import render
+from django.views.decorators.cache import cache_control
 from django.views.decorators.csrf import ensure_csrf_cookie
-from .models import Offer
+from django.views.decorators.http import condition
+from . import catalog
+
+
+def _page_etag(request):
+    """Empreinte du catalogue propre à l'utilisateur (la barre de navigation en
+    dépend) ; aucune tant que des messages flash attendent d'être affichés."""
+    if len(get_messages(request)):
+        return None
+    return hashlib.sha256(
+        f"{catalog.stamp(request)[0]}|{request.user.pk or 0}".encode()
+    ).hexdigest()[:32]
+
+
+def _page_last_modified(request):
+    if len(get_messages(request)):
+        return None
+    return catalog.stamp(request)[1]
+
 
 @ensure_csrf_cookie
+@cache_control(private=True, no_cache=True)
+@condition(etag_func=_page_etag, last_modified_func=_page_last_modified)
 def offers_page(request):
-    offers = Offer.objects.filter(is_active=True).order_by("price_eur")
-    return render(request, "offers.html", {"offers": offers})
+    return render(request, "offers.html", {"offers": catalog.offers(request)})
@@ -1,13 +1,32 @@
 from django.contrib import admin
 from .models import Order, OrderItem
+from .export import admin_action
+
 
 class OrderItemInline(admin.TabularInline):
     model = OrderItem
     extra = 0
+    readonly_fields = ("unit_price_eur",)
+
 
 @admin.register(Order)
 class OrderAdmin(admin.ModelAdmin):
     inlines = [OrderItemInline]
-    list_display = ("id","user","created_at","purchase_key","total_display")
+    list_display = (
+        "id",
+        "user",
+        "created_at",
+        "purchase_key",
+        "item_count",
+        "total_display",
+    )
+    list_select_related = ("user",)
+    actions = [
+        admin_action("lines", "csv", "Exporter les lignes (CSV)"),
+        admin_action("lines", "jsonl", "Exporter les lignes (JSONL)"),
+        admin_action("tickets", "csv", "Exporter les tickets (CSV)"),
+        admin_action("tickets", "jsonl", "Exporter les tickets (JSONL)"),
+    ]
+
     def total_display(self, obj):
-        return f"{obj.total_eur():.2f} €"
+        return f"{obj.total_eur:.2f} €"  # colonne dénormalisée, sans requête par ligne
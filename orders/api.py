@@ -1,79 +1,94 @@
 from rest_framework.decorators import api_view, permission_classes
-from django.views.decorators.csrf import csrf_exempt
-from rest_framework.permissions import AllowAny, IsAuthenticated
+import logging
+from rest_framework.permissions import AllowAny, IsAdminUser, IsAuthenticated
 from rest_framework.response import Response
+from django.conf import settings
+from django.http import StreamingHttpResponse
 from django.shortcuts import get_object_or_404
-from django.contrib.auth.models import User
-from django.utils.crypto import get_random_string
+from django.db import transaction
+from django.utils.dateparse import parse_date
+from core import jobs
 from offers.models import Offer
-from .models import Order, OrderItem
+from .models import Order
+from . import export
+from .cart import SESSION_KEY, adopt_order, get_cart  # noqa: F401 (réexportés)
 from tickets.models import Ticket
 
-SESSION_KEY = "current_order_id"
-GUEST_KEY = "guest_user_id"
+MAX_CART_LINES = 100
+
+logger = logging.getLogger("etickets.business")
+
+
+def cart_payload(lines):
+    """Résumé JSON d'un panier ``{offer_id: (qty, prix unitaire)}``.
+
+    ``lines`` vient de ``CartStore.priced_lines``.
+
+    Prix relevés sur les lignes, ceux que le checkout facturera ; une requête
+    sur les offres pour les noms.
+    """
+    offers = Offer.objects.only("id", "name").in_bulk(list(lines))
+    items = [
+        {
+            "offer_id": offer.id,
+            "name": offer.name,
+            "price": float(price),
+            "qty": qty,
+            "line_total": float(price * qty),
+        }
+        for offer_id, (qty, price) in lines.items()
+        if (offer := offers.get(offer_id))
+    ]
+    return {
+        "items": items,
+        "total": float(
+            sum(
+                price * qty
+                for offer_id, (qty, price) in lines.items()
+                if offer_id in offers
+            )
+        ),
+    }
+
+
+def checkout_cart(cart, user):
+    """Matérialise le panier, émet les tickets et incrémente les compteurs de
+    ventes des offres (``Offer.add_sales``), en une transaction. Le rendu de la
+    facture est confié aux workers après le commit (``orders.tasks``).
+
+    Renvoie ``(order, tickets)`` ou ``None`` si le panier est vide ; lève
+    ``Order.DoesNotExist`` si le panier référence une commande disparue.
+    """
+    with transaction.atomic():
+        order = cart.checkout(user)
+        if order is None:
+            return None
+        tickets = Ticket.issue_for_order(order)
+        Offer.add_sales(
+            {
+                offer_id: (qty, price * qty)
+                for offer_id, qty, price in order.items.values_list(
+                    "offer_id", "quantity", "unit_price_eur"
+                )
+            }
+        )
+        transaction.on_commit(
+            lambda: jobs.enqueue("orders.tasks.render_invoice", order_id=order.id)
+        )
+    cart.forget()
+    return order, tickets
 
-def get_or_create_guest_user(request):
-    if request.user.is_authenticated:
-        return request.user
-    uid = request.session.get(GUEST_KEY)
-    if uid:
-        try:
-            return User.objects.get(id=uid)
-        except User.DoesNotExist:
-            pass
-    username = f"guest-{get_random_string(16)}"
-    user = User.objects.create_user(username=username)
-    user.set_unusable_password()
-    user.save()
-    request.session[GUEST_KEY] = user.id
-    request.session.modified = True
-    return user
-
-def get_or_create_order_for(request, user):
-    order_id = request.session.get(SESSION_KEY)
-    if order_id:
-        try:
-            order = Order.objects.get(id=order_id)
-            if order.user_id != user.id:
-                order.user = user   # adopt guest order to authed user
-                order.save()
-            return order
-        except Order.DoesNotExist:
-            pass
-    order = Order.objects.create(user=user)
-    request.session[SESSION_KEY] = order.id
-    request.session.modified = True
-    return order
 
 @api_view(["GET"])
 @permission_classes([AllowAny])
 def cart_summary(request):
-    user = get_or_create_guest_user(request)
-    order_id = request.session.get(SESSION_KEY)
-    if not order_id:
-        return Response({"items": [], "total": 0.0})
-    try:
-        # Optimized: use select_related to avoid N+1 queries
-        order = Order.objects.select_related('user').get(id=order_id)
-    except Order.DoesNotExist:
-        return Response({"items": [], "total": 0.0})
-    
-    # Optimized: prefetch related offer data in one query
-    items = [{
-        "offer_id": it.offer_id,
-        "name": it.offer.name,
-        "price": float(it.offer.price_eur) if it.offer.price_eur is not None else 0.0,
-        "qty": it.quantity if it.quantity is not None else 0,
-        "line_total": float(it.offer.price_eur * it.quantity) if (it.offer.price_eur is not None and it.quantity is not None) else 0.0,
-    } for it in order.items.select_related("offer")]
-    
-    total = sum(i["line_total"] for i in items)
-    return Response({"items": items, "total": total})
+    # lecture seule : aucune écriture (ni utilisateur invité, ni session)
+    return Response(cart_payload(get_cart(request).priced_lines()))
+
 
 @api_view(["POST"])
 @permission_classes([AllowAny])
 def cart_add(request):
-    user = get_or_create_guest_user(request)
     offer_id = request.data.get("offer_id")
     try:
         qty = int(request.data.get("qty", 1))
@@ -81,80 +96,140 @@ def cart_add(request):
         qty = 1
     offer = get_object_or_404(Offer, id=offer_id, is_active=True)
 
-    order = get_or_create_order_for(request, user)
-    item, created = OrderItem.objects.get_or_create(order=order, offer=offer, defaults={"quantity": 0})
-    item.quantity = (item.quantity or 0) + max(qty, 1)
-    item.save()
-    request.session.modified = True
-    return Response({"ok": True, "order_id": order.id})
+    cart = get_cart(request)
+    new_qty = cart.add(offer.id, max(qty, 1))
+    return Response({"ok": True, "order_id": cart.order_id, "qty": new_qty})
+
 
 @api_view(["POST"])
 @permission_classes([AllowAny])
 def cart_update(request):
-    user = get_or_create_guest_user(request)
-    offer_id = request.data.get("offer_id")
+    try:
+        offer_id = int(request.data.get("offer_id"))
+    except (TypeError, ValueError):
+        return Response({"ok": True})
     try:
         qty = int(request.data.get("qty", 0))
     except Exception:
         qty = 0
-    order_id = request.session.get(SESSION_KEY)
-    if not order_id:
-        return Response({"ok": True})
-    try:
-        order = Order.objects.get(id=order_id)
-    except Order.DoesNotExist:
-        return Response({"ok": True})
-    try:
-        item = OrderItem.objects.get(order=order, offer_id=offer_id)
-    except OrderItem.DoesNotExist:
-        return Response({"ok": True})
-    if qty <= 0:
-        item.delete()
-    else:
-        item.quantity = qty
-        item.save()
-    request.session.modified = True
+    cart = get_cart(request)
+    if offer_id in cart.lines():  # seules les lignes existantes sont modifiées
+        cart.set(offer_id, qty)
     return Response({"ok": True})
 
+
+@api_view(["POST"])
+@permission_classes([AllowAny])
+def cart_lines(request):
+    """POST /api/cart/lines/ {"lines": [{"offer_id": 1, "qty": 2}, ...]}
+
+    Remplace tout le panier par l'ensemble reçu (qty 0 ou ligne absente =
+    suppression) et renvoie le résumé recalculé, comme ``GET /api/cart/``.
+    """
+    raw = request.data.get("lines")
+    if not isinstance(raw, list):
+        return Response({"ok": False, "error": "Liste lines requise"}, status=400)
+    if len(raw) > MAX_CART_LINES:
+        return Response(
+            {"ok": False, "error": f"Maximum {MAX_CART_LINES} lignes"}, status=400
+        )
+    lines = {}
+    for line in raw:
+        try:
+            offer_id, qty = int(line["offer_id"]), int(line.get("qty", 0))
+        except (KeyError, TypeError, ValueError, AttributeError):
+            return Response({"ok": False, "error": "Ligne invalide"}, status=400)
+        if qty < 0:
+            return Response({"ok": False, "error": "Quantité invalide"}, status=400)
+        lines[offer_id] = qty  # une offre répétée : la dernière ligne l'emporte
+    lines = {offer_id: qty for offer_id, qty in lines.items() if qty > 0}
+
+    unknown = set(lines) - set(
+        Offer.objects.filter(id__in=lines, is_active=True).values_list("id", flat=True)
+    )
+    if unknown:
+        return Response(
+            {
+                "ok": False,
+                "error": "Offre inconnue ou inactive",
+                "offer_ids": sorted(unknown),
+            },
+            status=400,
+        )
+
+    cart = get_cart(request)
+    cart.replace(lines)
+    return Response({"ok": True, **cart_payload(cart.priced_lines())})
+
+
 @api_view(["POST"])
 @permission_classes([AllowAny])
 def cart_clear(request):
-    try:
-        del request.session[SESSION_KEY]
-        request.session.modified = True
-    except KeyError:
-        pass
+    get_cart(request).clear()
     return Response({"ok": True})
 
+
 @api_view(["POST"])
 @permission_classes([IsAuthenticated])
 def checkout(request):
-    user = request.user
-    order_id = request.session.get(SESSION_KEY)
-    if not order_id:
-        return Response({"ok": False, "error": "Panier vide"}, status=400)
     try:
-        order = Order.objects.get(id=order_id)
+        result = checkout_cart(get_cart(request), request.user)
     except Order.DoesNotExist:
         return Response({"ok": False, "error": "Commande introuvable"}, status=400)
+    if result is None:
+        return Response({"ok": False, "error": "Panier vide"}, status=400)
+
+    order, tickets = result
+    return Response(
+        {"ok": True, "order_id": order.id, "tickets": [t.id for t in tickets]}
+    )
 
-    if order.user_id != user.id:
-        order.user = user
-        order.save()
 
-    if not order.items.exists():
-        return Response({"ok": False, "error": "Aucun article"}, status=400)
+@api_view(["GET"])
+@permission_classes([IsAdminUser])
+def invoices_export(request):
+    """GET /api/orders/invoices/export/?from=<date>&to=<date> — ZIP des factures.
 
-    created = []
-    for it in order.items.all():
-        for _ in range(it.quantity):
-            t = Ticket.create_from(user=user, order=order, offer=it.offer)
-            created.append(t.id)
+    Réservé au staff. L'archive est produite au fil de l'eau (voir
+    ``orders.export``) ; ``X-Invoice-Count`` annonce le nombre de factures pour
+    suivre la progression.
+    """
+    bounds = {}
+    for param in ("from", "to"):
+        if request.query_params.get(param):
+            try:
+                bounds[param] = parse_date(request.query_params[param])
+            except ValueError:
+                bounds[param] = None
+            if bounds[param] is None:
+                return Response(
+                    {"ok": False, "error": f"Date invalide: {param}"}, status=400
+                )
+    orders = export.paid_orders(bounds.get("from"), bounds.get("to"))
+    total = orders.count()
+    stats = {}
 
-    try:
-        del request.session[SESSION_KEY]
-        request.session.modified = True
-    except KeyError:
-        pass
+    def chunks():
+        yield from export.stream_zip(
+            orders.values_list("id", flat=True).iterator(chunk_size=2000),
+            n_workers=settings.INVOICE_EXPORT_WORKERS,
+            progress=lambda done, size, elapsed: stats.update(
+                done=done, size=size, elapsed=elapsed
+            ),
+        )
+        if stats:
+            logger.info(
+                "Export factures: %d en %.1fs (%.0f/s, %d octets) pour %s",
+                stats["done"],
+                stats["elapsed"],
+                stats["done"] / max(stats["elapsed"], 1e-6),
+                stats["size"],
+                request.user.username,
+            )
 
-    return Response({"ok": True, "order_id": order.id, "tickets": created})
+    name = f"invoices-{bounds.get('from') or 'debut'}-{bounds.get('to') or 'fin'}.zip"
+    response = StreamingHttpResponse(chunks(), content_type="application/zip")
+    response["Content-Disposition"] = f'attachment; filename="{name}"'
+    response["X-Invoice-Count"] = str(total)
+    response["Cache-Control"] = "private, no-store"
+    return response
@@ -0,0 +1,357 @@
+"""Stockage du panier, interchangeable via ``settings.CART_STORE``.
+
+- ``DatabaseCartStore`` (défaut) : une ``Order`` et ses ``OrderItem`` dès le
+  premier ajout.
+- ``SessionCartStore`` : lignes dans la session ; aucune écriture en base avec
+  ``SESSION_ENGINE = "django.contrib.sessions.backends.signed_cookies"``.
+- ``CacheCartStore`` : lignes dans le cache, la session ne garde qu'un jeton.
+
+Les deux derniers ne matérialisent ``Order`` et ``OrderItem`` qu'au checkout,
+en une transaction (``checkout``). Un panier se lit comme ``{offer_id: qty}``
+(``lines``) ou ``{offer_id: (qty, prix unitaire)}`` (``priced_lines``).
+
+Le prix unitaire d'une ligne est relevé à chaque ajout ou modification de la
+ligne et c'est lui qui est affiché et facturé, quel que soit le stockage.
+"""
+
+import secrets
+from abc import ABC, abstractmethod
+from decimal import Decimal
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.utils.module_loading import import_string
+from offers.models import Offer
+from .models import Order, OrderItem
+
+SESSION_KEY = "current_order_id"
+
+
+def get_cart(request):
+    """Panier de la requête, selon ``settings.CART_STORE``."""
+    return import_string(
+        getattr(settings, "CART_STORE", "orders.cart.DatabaseCartStore")
+    )(request)
+
+
+def adopt_order(order, user):
+    """Rattache une commande invitée (ou d'une autre session) à ``user``."""
+    if user is not None and order.user_id != user.id:
+        order.user = user
+        order.save(update_fields=["user"])
+    return order
+
+
+class CartStore(ABC):
+    order_id = None
+
+    def __init__(self, request):
+        self.request = request
+        self.session = request.session
+        self.user = request.user if request.user.is_authenticated else None
+
+    @abstractmethod
+    def priced_lines(self) -> dict:
+        """Contenu du panier, ``{offer_id: (qty, prix unitaire relevé)}``."""
+
+    def lines(self) -> dict:
+        """Contenu du panier, ``{offer_id: qty}``."""
+        return {offer_id: qty for offer_id, (qty, _) in self.priced_lines().items()}
+
+    @abstractmethod
+    def add(self, offer_id: int, qty: int) -> int:
+        """Ajoute ``qty`` à la ligne et renvoie la nouvelle quantité."""
+
+    @abstractmethod
+    def set(self, offer_id: int, qty: int):
+        """Fixe la quantité d'une ligne (0 = suppression)."""
+
+    @abstractmethod
+    def replace(self, lines: dict):
+        """Remplace tout le panier par ``{offer_id: qty}`` (qty > 0)."""
+
+    @abstractmethod
+    def clear(self):
+        """Vide le panier."""
+
+    def checkout(self, user):
+        """Commande prête à émettre pour ``user``, ou ``None`` si le panier est vide.
+
+        Lève ``Order.DoesNotExist`` si le panier référence une commande disparue.
+        """
+        lines = self.priced_lines()
+        existing = set(Offer.objects.filter(id__in=lines).values_list("id", flat=True))
+        lines = {
+            offer_id: line
+            for offer_id, line in lines.items()
+            if offer_id in existing and line[0] > 0
+        }
+        if not lines:
+            return None
+        with transaction.atomic():
+            order = Order.objects.create(user=user)
+            OrderItem.objects.bulk_create(
+                OrderItem(
+                    order=order, offer_id=offer_id, quantity=qty, unit_price_eur=price
+                )
+                for offer_id, (qty, price) in lines.items()
+            )
+            Order.refresh_totals(order.id)
+        order.refresh_from_db(fields=["total_eur", "item_count"])
+        return order
+
+    def forget(self):
+        """Oublie le panier après un checkout réussi."""
+        self.clear()
+
+
+class DatabaseCartStore(CartStore):
+    """Panier en base. Un invité n'a ni ``User`` ni ``Profile`` : sa commande
+    (``user`` NULL) n'est référencée que par la session, et rattachée au compte à
+    la connexion (``orders.signals``) ou au checkout."""
+
+    def __init__(self, request):
+        super().__init__(request)
+        try:
+            self.order_id = int(self.session.get(SESSION_KEY) or 0) or None
+        except (TypeError, ValueError):
+            self.order_id = None  # session corrompue : panier neuf
+
+    def _order(self):
+        """Commande du panier, créée au besoin (une invitée a ``user`` NULL)."""
+        if self.order_id:
+            try:
+                order = Order.objects.get(id=self.order_id)
+                if self.user is not None or order.user_id is None:
+                    return adopt_order(order, self.user)
+            except Order.DoesNotExist:
+                pass
+        order = Order.objects.create(user=self.user)
+        self.order_id = order.id
+        self.session[SESSION_KEY] = order.id
+        return order
+
+    def priced_lines(self):
+        if not self.order_id:
+            return {}
+        rows = (
+            OrderItem.objects.filter(order_id=self.order_id)
+            .order_by("id")
+            .values_list("offer_id", "quantity", "unit_price_eur")
+        )
+        return {offer_id: (qty, price) for offer_id, qty, price in rows}
+
+    def add(self, offer_id, qty):
+        order = self._order()
+        qty = OrderItem.upsert(order.id, offer_id, qty)
+        Order.refresh_totals(order.id)
+        return qty
+
+    def set(self, offer_id, qty):
+        if qty <= 0:
+            if self.order_id:
+                OrderItem.objects.filter(
+                    order_id=self.order_id, offer_id=offer_id
+                ).delete()
+            return
+        order = self._order()
+        OrderItem.upsert(order.id, offer_id, qty, increment=False)
+        Order.refresh_totals(order.id)
+
+    def replace(self, lines):
+        """Applique le différentiel : un INSERT groupé, un UPDATE groupé, un DELETE.
+
+        Les lignes sont relues sous verrou de la commande (``select_for_update``) ;
+        l'INSERT passe par ``ON CONFLICT (order, offer)`` comme ``OrderItem.upsert`` :
+        une ligne ajoutée entre-temps par un ``cart_add`` reçoit la quantité demandée.
+        """
+        if not lines and not self.order_id:
+            return
+        with transaction.atomic():
+            order_id = self._order().id if lines else self.order_id
+            Order.objects.select_for_update().filter(id=order_id).exists()
+            current = {
+                item.offer_id: item
+                for item in OrderItem.objects.filter(order_id=order_id).only(
+                    "id", "offer_id", "quantity", "unit_price_eur"
+                )
+            }
+            if not lines and not current:
+                return
+            new_ids = [offer_id for offer_id in lines if offer_id not in current]
+            changed = [
+                offer_id
+                for offer_id, item in current.items()
+                if offer_id in lines and item.quantity != lines[offer_id]
+            ]
+            # lignes créées ou modifiées : au prix courant, comme ``OrderItem.upsert``
+            touched = new_ids + changed
+            prices = (
+                dict(
+                    Offer.objects.filter(id__in=touched).values_list("id", "price_eur")
+                )
+                if touched
+                else {}
+            )
+            to_create = [
+                OrderItem(
+                    order_id=order_id,
+                    offer_id=offer_id,
+                    quantity=lines[offer_id],
+                    unit_price_eur=prices[offer_id],
+                )
+                for offer_id in new_ids
+            ]
+            to_update = []
+            for offer_id in changed:
+                item = current[offer_id]
+                item.quantity, item.unit_price_eur = lines[offer_id], prices[offer_id]
+                to_update.append(item)
+            removed = [
+                item.id for offer_id, item in current.items() if offer_id not in lines
+            ]
+            if to_create:
+                OrderItem.objects.bulk_create(
+                    to_create,
+                    update_conflicts=True,
+                    unique_fields=["order", "offer"],
+                    update_fields=["quantity", "unit_price_eur"],
+                )
+            if to_update:
+                OrderItem.objects.bulk_update(to_update, ["quantity", "unit_price_eur"])
+            if removed:
+                OrderItem.objects.filter(id__in=removed).delete()
+            Order.refresh_totals(order_id)
+
+    def clear(self):
+        if self.order_id:
+            OrderItem.objects.filter(order_id=self.order_id).delete()
+
+    def checkout(self, user):
+        if not self.order_id:
+            return None
+        order = adopt_order(Order.objects.get(id=self.order_id), user)
+        return order if order.items.exists() else None
+
+    def forget(self):
+        self.session.pop(SESSION_KEY, None)
+        self.order_id = None
+
+
+class MemoryCartStore(CartStore):
+    """Base des paniers hors base : ``_load()`` / ``_save()`` sur un dict
+    ``{offer_id: (qty, prix)}`` ; seule la lecture des prix touche la base."""
+
+    @abstractmethod
+    def _load(self) -> dict:
+        """Panier enregistré, ``{str(offer_id): [qty, "prix"]}``."""
+
+    @abstractmethod
+    def _save(self, data: dict):
+        """Enregistre tout le panier ``{str(offer_id): [qty, "prix"]}``."""
+
+    @staticmethod
+    def _prices(offer_ids) -> dict:
+        return (
+            dict(Offer.objects.filter(id__in=offer_ids).values_list("id", "price_eur"))
+            if offer_ids
+            else {}
+        )
+
+    def priced_lines(self):
+        data = {int(key): value for key, value in self._load().items()}
+        # paniers enregistrés avant le relevé des prix (``{offer_id: qty}``) :
+        # prix courant
+        legacy = self._prices(
+            [offer_id for offer_id, value in data.items() if isinstance(value, int)]
+        )
+        lines = {}
+        for offer_id, value in data.items():
+            if isinstance(value, int):
+                if offer_id in legacy:
+                    lines[offer_id] = (value, legacy[offer_id])
+            else:
+                lines[offer_id] = (value[0], Decimal(value[1]))
+        return lines
+
+    def _store(self, lines):
+        self._save(
+            {
+                str(offer_id): [qty, str(price)]
+                for offer_id, (qty, price) in lines.items()
+            }
+        )
+
+    def add(self, offer_id, qty):
+        lines = self.priced_lines()
+        price = self._prices([offer_id]).get(offer_id)
+        if price is None:
+            return lines.get(offer_id, (0, None))[0]
+        lines[offer_id] = (lines.get(offer_id, (0, None))[0] + qty, price)
+        self._store(lines)
+        return lines[offer_id][0]
+
+    def set(self, offer_id, qty):
+        lines = self.priced_lines()
+        if qty <= 0:
+            lines.pop(offer_id, None)
+        elif (price := self._prices([offer_id]).get(offer_id)) is not None:
+            lines[offer_id] = (qty, price)
+        self._store(lines)
+
+    def replace(self, lines):
+        current = self.priced_lines()
+        changed = [
+            offer_id
+            for offer_id, qty in lines.items()
+            if current.get(offer_id, (None,))[0] != qty
+        ]
+        prices = self._prices(changed)
+        self._store(
+            {
+                offer_id: (
+                    (qty, prices[offer_id]) if offer_id in prices else current[offer_id]
+                )
+                for offer_id, qty in lines.items()
+                if offer_id in prices or offer_id in current
+            }
+        )
+
+
+class SessionCartStore(MemoryCartStore):
+    KEY = "cart_lines"
+
+    def _load(self):
+        return self.session.get(self.KEY, {})
+
+    def _save(self, data):
+        self.session[self.KEY] = data
+
+    def clear(self):
+        self.session.pop(self.KEY, None)
+
+
+class CacheCartStore(MemoryCartStore):
+    TOKEN_KEY = "cart_token"
+
+    def _key(self, create=False):
+        token = self.session.get(self.TOKEN_KEY)
+        if token is None and create:
+            token = self.session[self.TOKEN_KEY] = secrets.token_urlsafe(16)
+        return f"cart:{token}" if token else None
+
+    def _load(self):
+        key = self._key()
+        return dict(cache.get(key) or {}) if key else {}
+
+    def _save(self, data):
+        cache.set(
+            self._key(create=True),
+            data,
+            getattr(settings, "CART_CACHE_TTL", 7 * 24 * 3600),
+        )
+
+    def clear(self):
+        key = self._key()
+        if key:
+            cache.delete(key)
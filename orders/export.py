@@ -0,0 +1,278 @@
+"""Exports en masse, produits au fil de l'eau.
+
+Factures (comptabilité) : une archive ZIP. Les identifiants des commandes
+payées sont lus par curseur serveur, découpés en lots rendus par un pool de
+processus (``core.workers.render_invoices``) ; chaque PDF est compressé dans le
+ZIP puis rendu à l'appelant aussitôt. Seuls
+``workers * 2`` lots sont en vol : la mémoire reste bornée quel que soit
+l'intervalle demandé.
+
+Lignes de commande et tickets (admin, ``export_orders``) : CSV ou JSONL lus en
+tuples ``values_list`` par curseur serveur (``iterator(chunk_size=...)``), sans
+instancier de modèles : mémoire constante, même pour des millions de tickets.
+"""
+
+import csv
+import json
+import multiprocessing
+import time
+import zipfile
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from decimal import Decimal
+from datetime import datetime, time as dtime, timedelta
+from itertools import islice
+from django.http import StreamingHttpResponse
+from django.db.models import (
+    DecimalField,
+    Exists,
+    ExpressionWrapper,
+    F,
+    OuterRef,
+    Subquery,
+)
+from django.utils import timezone
+from core import workers
+from .models import Order, OrderItem
+
+# Lignes lues par aller-retour du curseur serveur
+EXPORT_CHUNK_SIZE = 2000
+
+# (colonne exportée, champ ``values_list``)
+LINE_COLUMNS = (
+    ("order_id", "order_id"),
+    ("order_created_at", "order__created_at"),
+    ("username", "order__user__username"),
+    ("purchase_key", "order__purchase_key"),
+    ("item_id", "id"),
+    ("offer_id", "offer_id"),
+    ("offer_name", "offer__name"),
+    ("offer_type", "offer__offer_type"),
+    ("quantity", "quantity"),
+    ("unit_price_eur", "unit_price_eur"),
+    ("line_total_eur", "line_total"),
+)
+TICKET_COLUMNS = (
+    ("ticket_id", "id"),
+    ("created_at", "created_at"),
+    ("verified_at", "verified_at"),
+    ("ticket_key", "ticket_key"),
+    ("order_id", "order_id"),
+    ("purchase_key", "order__purchase_key"),
+    ("username", "user__username"),
+    ("offer_id", "offer_id"),
+    ("offer_name", "offer__name"),
+    ("offer_type", "offer__offer_type"),
+    ("unit_price_eur", "unit_price"),
+)
+FORMATS = {"csv": "text/csv; charset=utf-8", "jsonl": "application/x-ndjson"}
+
+
+def day_bound(day, end: bool = False):
+    """Début du jour local ``day`` (ou du lendemain si ``end`` : borne exclusive)."""
+    return timezone.make_aware(
+        datetime.combine(day + timedelta(days=1 if end else 0), dtime.min)
+    )
+
+
+def paid_orders(date_from=None, date_to=None):
+    """Commandes réglées (au moins un ticket émis) créées entre deux dates incluses."""
+    from tickets.models import Ticket
+
+    orders = Order.objects.filter(Exists(Ticket.objects.filter(order=OuterRef("pk"))))
+    if date_from:
+        orders = orders.filter(created_at__gte=day_bound(date_from))
+    if date_to:
+        orders = orders.filter(created_at__lt=day_bound(date_to, end=True))
+    return orders.order_by("id")
+
+
+def _batches(order_ids, size):
+    it = iter(order_ids)
+    while batch := list(islice(it, size)):
+        yield batch
+
+
+class _Sink:
+    """Fichier non repositionnable pour ``zipfile``.
+
+    Accumule les octets jusqu'à ``drain``.
+    """
+
+    def __init__(self):
+        self.chunks, self.offset = [], 0
+
+    def write(self, data):
+        self.chunks.append(bytes(data))
+        self.offset += len(data)
+        return len(data)
+
+    def tell(self):
+        return self.offset
+
+    def flush(self):
+        pass
+
+    def drain(self) -> bytes:
+        data = b"".join(self.chunks)
+        self.chunks.clear()
+        return data
+
+
+def _rendered(order_ids, n_workers, batch):
+    """Lots rendus, dans l'ordre des ``order_ids``.
+
+    ``n_workers`` = 0 : rendu dans ce processus.
+    """
+    if n_workers <= 0:
+        for ids in _batches(order_ids, batch):
+            yield workers.render_invoices(ids)
+        return
+    # "spawn" comme run_workers : chaque processus ouvre ses propres connexions
+    pool = ProcessPoolExecutor(
+        max_workers=n_workers,
+        mp_context=multiprocessing.get_context("spawn"),
+        initializer=workers.init,
+    )
+    try:
+        pending = deque()
+        for ids in _batches(order_ids, batch):
+            pending.append(pool.submit(workers.render_invoices, ids))
+            if len(pending) >= n_workers * 2:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+    finally:
+        pool.shutdown(
+            cancel_futures=True
+        )  # client déconnecté : on abandonne les lots restants
+
+
+def stream_zip(order_ids, n_workers: int = 0, batch: int = 20, progress=None):
+    """Génère l'archive ``invoice-<id>.pdf`` par morceaux d'octets.
+
+    ``progress(done, size, elapsed)`` est appelé après chaque lot.
+    """
+    sink = _Sink()
+    started, done = time.monotonic(), 0
+    with zipfile.ZipFile(sink, "w", compression=zipfile.ZIP_DEFLATED) as archive:
+        for results in _rendered(order_ids, n_workers, batch):
+            for order_id, pdf in results:
+                archive.writestr(f"invoice-{order_id}.pdf", pdf)
+            done += len(results)
+            if progress:
+                progress(done, sink.offset, time.monotonic() - started)
+            yield sink.drain()
+    yield sink.drain()  # répertoire central
+
+
+def line_rows(items, chunk_size: int = EXPORT_CHUNK_SIZE):
+    """``(colonnes, tuples)`` des lignes de commande ``items``.
+
+    Jointes aux commandes et aux offres.
+    """
+    money = DecimalField(max_digits=10, decimal_places=2)
+    rows = (
+        items.order_by("order_id", "id")
+        .annotate(
+            line_total=ExpressionWrapper(
+                F("unit_price_eur") * F("quantity"), output_field=money
+            )
+        )
+        .values_list(*(field for _, field in LINE_COLUMNS))
+        .iterator(chunk_size=chunk_size)
+    )
+    return [name for name, _ in LINE_COLUMNS], rows
+
+
+def ticket_rows(tickets, chunk_size: int = EXPORT_CHUNK_SIZE):
+    """``(colonnes, tuples)`` des ``tickets``.
+
+    Avec commande, offre et prix unitaire figé de la ligne.
+    """
+    price = OrderItem.objects.filter(
+        order=OuterRef("order_id"), offer=OuterRef("offer_id")
+    ).values("unit_price_eur")[:1]
+    rows = (
+        tickets.order_by("id")
+        .annotate(unit_price=Subquery(price))
+        .values_list(*(field for _, field in TICKET_COLUMNS))
+        .iterator(chunk_size=chunk_size)
+    )
+    return [name for name, _ in TICKET_COLUMNS], rows
+
+
+def _cell(value):
+    if value is None:
+        return ""
+    if isinstance(value, Decimal):
+        return f"{value:.2f}"  # montants en euros
+    return value.isoformat() if hasattr(value, "isoformat") else str(value)
+
+
+class _Echo:
+    """Pseudo-fichier de ``csv.writer`` : ``write`` renvoie la ligne sans la stocker."""
+
+    def write(self, value):
+        return value
+
+
+def stream_rows(columns, rows, fmt: str = "csv", batch: int = 500):
+    """Encode ``rows`` en CSV (avec en-tête) ou JSONL.
+
+    Produit des octets, par paquets de ``batch`` lignes.
+    """
+    if fmt == "csv":
+        writer = csv.writer(_Echo())
+
+        def encode(row):
+            return writer.writerow([_cell(v) for v in row])
+
+        yield encode(columns).encode()
+    elif fmt == "jsonl":
+
+        def encode(row):
+            return (
+                json.dumps(dict(zip(columns, row)), default=_cell, ensure_ascii=False)
+                + "\n"
+            )
+
+    else:
+        raise ValueError(f"Format inconnu: {fmt}")
+    it = iter(rows)
+    while chunk := list(islice(it, batch)):
+        yield "".join(encode(row) for row in chunk).encode()
+
+
+def rows_response(columns, rows, fmt: str, filename: str):
+    response = StreamingHttpResponse(
+        stream_rows(columns, rows, fmt), content_type=FORMATS[fmt]
+    )
+    response["Content-Disposition"] = f'attachment; filename="{filename}.{fmt}"'
+    return response
+
+
+def admin_action(dataset: str, fmt: str, description: str):
+    """Action d'admin exportant en flux ``dataset`` ("lines" ou "tickets").
+
+    Le queryset de la sélection (commandes ou tickets) n'est utilisé que comme
+    sous-requête : aucune instance n'est chargée.
+    """
+
+    def action(modeladmin, request, queryset):
+        from tickets.models import Ticket
+
+        selection = queryset.order_by().values("pk")
+        if dataset == "lines":
+            columns, rows = line_rows(OrderItem.objects.filter(order__in=selection))
+        elif queryset.model is Ticket:
+            columns, rows = ticket_rows(Ticket.objects.filter(pk__in=selection))
+        else:
+            columns, rows = ticket_rows(Ticket.objects.filter(order__in=selection))
+        return rows_response(
+            columns, rows, fmt, f"{dataset}-{timezone.now():%Y%m%d-%H%M%S}"
+        )
+
+    action.__name__ = f"export_{dataset}_{fmt}"
+    action.short_description = description
+    return action
@@ -0,0 +1,167 @@
+"""Factures PDF rendues une fois puis servies depuis le disque.
+
+Le PDF est construit au premier téléchargement et écrit sous
+``INVOICE_ROOT/<order_id>/<hash>.pdf``, où ``hash`` est l'empreinte des données
+facturées (lignes, prix figés, total). Tant que la commande ne change pas, les
+téléchargements suivants ne coûtent qu'une lecture de fichier ; l'empreinte sert
+aussi d'ETag. Le rendu ReportLab est ``invariant`` : mêmes données, mêmes octets.
+"""
+
+import hashlib
+import os
+import re
+import tempfile
+from collections import defaultdict
+from io import BytesIO
+from pathlib import Path
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+
+# À incrémenter quand la mise en page change : invalide les PDF déjà écrits
+LAYOUT_VERSION = 1
+
+_RANGE_RE = re.compile(r"^\s*bytes=(\d*)-(\d*)\s*$")
+
+
+def invoice_data(order) -> tuple:
+    """Données facturées, dans l'ordre d'affichage (une seule requête)."""
+    lines = tuple(
+        order.items.order_by("id").values_list(
+            "offer__name", "quantity", "unit_price_eur"
+        )
+    )
+    return (
+        order.id,
+        order.created_at.strftime("%Y-%m-%d %H:%M"),
+        lines,
+        order.total_eur,
+    )
+
+
+def invoice_data_many(order_ids) -> list:
+    """``invoice_data`` pour un lot de commandes, en deux requêtes (exports)."""
+    from .models import Order, OrderItem
+
+    lines = defaultdict(list)
+    rows = (
+        OrderItem.objects.filter(order_id__in=order_ids)
+        .order_by("order_id", "id")
+        .values_list("order_id", "offer__name", "quantity", "unit_price_eur")
+    )
+    for order_id, *line in rows:
+        lines[order_id].append(tuple(line))
+    orders = (
+        Order.objects.filter(id__in=order_ids)
+        .order_by("id")
+        .only("id", "created_at", "total_eur")
+    )
+    return [
+        (o.id, o.created_at.strftime("%Y-%m-%d %H:%M"), tuple(lines[o.id]), o.total_eur)
+        for o in orders
+    ]
+
+
+def content_hash(data: tuple) -> str:
+    order_id, created, lines, total = data
+    h = hashlib.sha256(f"v{LAYOUT_VERSION}|{order_id}|{created}|{total:.2f}".encode())
+    for name, qty, price in lines:
+        h.update(f"\n{name}|{qty}|{price:.2f}".encode())
+    return h.hexdigest()[:32]
+
+
+def etag_for(digest: str) -> str:
+    return f'"{digest}"'
+
+
+def render(data: tuple) -> bytes:
+    from reportlab.lib.pagesizes import A4
+    from reportlab.pdfgen import canvas
+
+    order_id, created, lines, total = data
+    buffer = BytesIO()
+    p = canvas.Canvas(buffer, pagesize=A4, invariant=1)
+    width, height = A4
+    y = height - 50
+    p.setFont("Helvetica-Bold", 16)
+    p.drawString(40, y, f"Facture #{order_id}")
+    y -= 20
+    p.setFont("Helvetica", 10)
+    p.drawString(40, y, f"Date: {created}")
+    y -= 30
+    p.setFont("Helvetica-Bold", 12)
+    p.drawString(40, y, "Articles")
+    y -= 20
+    p.setFont("Helvetica", 10)
+    for name, qty, price in lines:
+        p.drawString(40, y, f"- {name} x{qty}")
+        p.drawRightString(width - 40, y, f"{price * qty:.2f} €")  # prix figé à l'ajout
+        y -= 18
+        if y < 60:
+            p.showPage()
+            y = height - 50
+    y -= 10
+    p.setFont("Helvetica-Bold", 12)
+    p.drawRightString(width - 40, y, f"Total: {total:.2f} €")
+    p.showPage()
+    p.save()
+    return buffer.getvalue()
+
+
+def invoice_root() -> Path:
+    """``INVOICE_ROOT``, refusé s'il est sous ``MEDIA_ROOT`` (servi par ``/media/``)."""
+    root = Path(settings.INVOICE_ROOT).resolve()
+    media = Path(settings.MEDIA_ROOT).resolve()
+    if root == media or media in root.parents:
+        raise ImproperlyConfigured("INVOICE_ROOT ne doit pas être sous MEDIA_ROOT")
+    return root
+
+
+def path_for(order_id: int, digest: str) -> Path:
+    return invoice_root() / str(order_id) / f"{digest}.pdf"
+
+
+def get_or_render(data: tuple, digest: str) -> bytes:
+    """Octets du PDF : lus sur disque, sinon rendus puis écrits atomiquement.
+
+    Les versions périmées de la même commande (panier modifié depuis) sont supprimées.
+    """
+    path = path_for(data[0], digest)
+    try:
+        return path.read_bytes()
+    except FileNotFoundError:
+        pass
+    pdf = render(data)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=path.parent, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(pdf)
+        os.replace(tmp, path)  # deux rendus concurrents écrivent les mêmes octets
+    except BaseException:
+        os.unlink(tmp)
+        raise
+    for stale in path.parent.glob("*.pdf"):
+        if stale != path:
+            stale.unlink(missing_ok=True)
+    return pdf
+
+
+def parse_range(header: str, size: int):
+    """``(début, fin)`` inclusifs pour un en-tête ``Range: bytes=a-b`` à plage unique.
+
+    ``None`` : en-tête absent, malformé ou multi-plages (réponse complète) ;
+    ``ValueError`` : plage non satisfaisable (416).
+    """
+    m = _RANGE_RE.match(header or "")
+    if not m or not (m[1] or m[2]):
+        return None
+    if not m[1]:  # suffixe : les N derniers octets
+        if int(m[2]) == 0:
+            raise ValueError("plage vide")
+        return max(size - int(m[2]), 0), size - 1
+    start = int(m[1])
+    if m[2] and int(m[2]) < start:
+        return None  # syntaxe invalide : ignorée
+    if start >= size:
+        raise ValueError("plage hors du fichier")
+    return start, min(int(m[2]), size - 1) if m[2] else size - 1
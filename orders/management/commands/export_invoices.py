@@ -0,0 +1,88 @@
+import os
+import sys
+from django.core.management.base import BaseCommand, CommandError
+from django.utils.dateparse import parse_date
+from orders import export
+
+
+def _date(value):
+    try:
+        day = parse_date(value)
+    except ValueError:
+        day = None
+    if day is None:
+        raise CommandError(f"Date invalide: {value}")
+    return day
+
+
+class Command(BaseCommand):
+    help = (
+        "Exporte les factures des commandes payées d'un intervalle dans une archive ZIP"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--from",
+            dest="date_from",
+            type=_date,
+            help="Premier jour inclus (AAAA-MM-JJ)",
+        )
+        parser.add_argument(
+            "--to", dest="date_to", type=_date, help="Dernier jour inclus (AAAA-MM-JJ)"
+        )
+        parser.add_argument(
+            "--output",
+            "-o",
+            help="Fichier ZIP (défaut : invoices-<from>-<to>.zip ; '-' : stdout)",
+        )
+        parser.add_argument(
+            "--workers",
+            type=int,
+            default=os.cpu_count() or 1,
+            help="Taille du pool de rendu (0 = dans ce processus)",
+        )
+        parser.add_argument(
+            "--batch", type=int, default=20, help="Factures par tâche du pool"
+        )
+
+    def handle(self, *args, **opts):
+        orders = export.paid_orders(opts["date_from"], opts["date_to"])
+        total = orders.count()
+        output = (
+            opts["output"]
+            or f"invoices-{opts['date_from'] or 'debut'}-{opts['date_to'] or 'fin'}.zip"
+        )
+        stats = {"done": 0, "size": 0, "elapsed": 0.0}
+
+        def progress(done, size, elapsed):
+            stats.update(done=done, size=size, elapsed=elapsed)
+            rate = done / elapsed if elapsed else 0
+            self.stderr.write(
+                f"\r{done}/{total} factures  {rate:.0f}/s  {size / 2**20:.1f} Mio",
+                ending="",
+            )
+            self.stderr.flush()
+
+        ids = orders.values_list("id", flat=True).iterator(chunk_size=2000)
+        chunks = export.stream_zip(
+            ids,
+            n_workers=opts["workers"],
+            batch=max(opts["batch"], 1),
+            progress=progress,
+        )
+        out = sys.stdout.buffer if output == "-" else open(output, "wb")
+        try:
+            for chunk in chunks:
+                out.write(chunk)
+        finally:
+            if out is not sys.stdout.buffer:
+                out.close()
+        if stats["done"]:
+            self.stderr.write("")
+        rate = stats["done"] / stats["elapsed"] if stats["elapsed"] else 0
+        self.stderr.write(
+            self.style.SUCCESS(
+                f"{stats['done']} factures exportées dans {output} "
+                f"en {stats['elapsed']:.1f}s ({rate:.0f}/s)"
+            )
+        )
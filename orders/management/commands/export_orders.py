@@ -0,0 +1,103 @@
+import sys
+import time
+from django.core.management.base import BaseCommand
+from orders import export
+from orders.models import Order, OrderItem
+from .export_invoices import _date
+
+
+class Command(BaseCommand):
+    help = (
+        "Exporte en flux les lignes de commande ou les tickets (CSV ou JSONL), "
+        "en mémoire constante"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "dataset",
+            choices=("lines", "tickets"),
+            help=(
+                "lines : commandes × lignes × offres ; "
+                "tickets : tickets × commandes × offres"
+            ),
+        )
+        parser.add_argument("--format", choices=sorted(export.FORMATS), default="csv")
+        parser.add_argument(
+            "--from",
+            dest="date_from",
+            type=_date,
+            help="Commandes créées à partir de ce jour (inclus)",
+        )
+        parser.add_argument(
+            "--to",
+            dest="date_to",
+            type=_date,
+            help="Commandes créées jusqu'à ce jour (inclus)",
+        )
+        parser.add_argument(
+            "--output",
+            "-o",
+            default="-",
+            help="Fichier de sortie ('-' = sortie standard)",
+        )
+        parser.add_argument(
+            "--chunk-size",
+            type=int,
+            default=export.EXPORT_CHUNK_SIZE,
+            help="Lignes lues par aller-retour du curseur serveur",
+        )
+
+    def handle(self, *args, **opts):
+        from tickets.models import Ticket
+
+        orders = Order.objects.all()
+        if opts["date_from"]:
+            orders = orders.filter(created_at__gte=export.day_bound(opts["date_from"]))
+        if opts["date_to"]:
+            orders = orders.filter(
+                created_at__lt=export.day_bound(opts["date_to"], end=True)
+            )
+        selection = (
+            orders.values("pk") if opts["date_from"] or opts["date_to"] else None
+        )
+        chunk_size = max(opts["chunk_size"], 1)
+        if opts["dataset"] == "lines":
+            items = (
+                OrderItem.objects.all()
+                if selection is None
+                else OrderItem.objects.filter(order__in=selection)
+            )
+            columns, rows = export.line_rows(items, chunk_size)
+        else:
+            tickets = (
+                Ticket.objects.all()
+                if selection is None
+                else Ticket.objects.filter(order__in=selection)
+            )
+            columns, rows = export.ticket_rows(tickets, chunk_size)
+
+        count = 0
+
+        def counted(it):
+            nonlocal count
+            for row in it:
+                count += 1
+                yield row
+
+        started = time.monotonic()
+        out = sys.stdout.buffer if opts["output"] == "-" else open(opts["output"], "wb")
+        try:
+            for chunk in export.stream_rows(columns, counted(rows), opts["format"]):
+                out.write(chunk)
+        finally:
+            if out is sys.stdout.buffer:
+                out.flush()
+            else:
+                out.close()
+        elapsed = time.monotonic() - started
+        self.stderr.write(
+            self.style.SUCCESS(
+                f"{count} lignes exportées ({opts['dataset']}, {opts['format']}) "
+                f"en {elapsed:.1f}s"
+            )
+        )
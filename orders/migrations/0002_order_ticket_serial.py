@@ -0,0 +1,24 @@
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+
+def backfill_serials(apps, schema_editor):
+    Order = apps.get_model('orders', 'Order')
+    Ticket = apps.get_model('tickets', 'Ticket')
+    issued = (Ticket.objects.filter(order=OuterRef('pk')).order_by()
+              .values('order').annotate(n=Count('id')).values('n'))
+    Order.objects.update(ticket_serial=Coalesce(Subquery(issued), Value(0)))
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ('orders', '0001_initial'),
+        ('tickets', '0003_add_timestamp_fields'),
+    ]
+    operations = [
+        migrations.AddField(
+            model_name='order',
+            name='ticket_serial',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(backfill_serials, migrations.RunPython.noop),
+    ]
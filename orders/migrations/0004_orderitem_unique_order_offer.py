@@ -0,0 +1,22 @@
+from django.db import migrations, models
+from django.db.models import Count, Min, Sum
+
+def merge_duplicate_lines(apps, schema_editor):
+    OrderItem = apps.get_model('orders', 'OrderItem')
+    duplicates = (OrderItem.objects.values('order_id', 'offer_id').order_by()
+                  .annotate(n=Count('id'), keep=Min('id'), qty=Sum('quantity')).filter(n__gt=1))
+    for dup in duplicates:
+        OrderItem.objects.filter(id=dup['keep']).update(quantity=dup['qty'])
+        OrderItem.objects.filter(order_id=dup['order_id'], offer_id=dup['offer_id']).exclude(id=dup['keep']).delete()
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ('orders', '0003_order_guest_user'),
+    ]
+    operations = [
+        migrations.RunPython(merge_duplicate_lines, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='orderitem',
+            constraint=models.UniqueConstraint(fields=('order', 'offer'), name='orders_item_order_offer_uniq'),
+        ),
+    ]
@@ -0,0 +1,45 @@
+from decimal import Decimal
+from django.db import migrations, models
+from django.db.models import DecimalField, F, OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+
+def backfill(apps, schema_editor):
+    Offer = apps.get_model('offers', 'Offer')
+    Order = apps.get_model('orders', 'Order')
+    OrderItem = apps.get_model('orders', 'OrderItem')
+    # Les lignes existantes prennent le prix courant de l'offre
+    OrderItem.objects.update(unit_price_eur=Subquery(Offer.objects.filter(pk=OuterRef('offer_id')).values('price_eur')[:1]))
+    lines = OrderItem.objects.filter(order=OuterRef('pk')).order_by().values('order')
+    money = DecimalField(max_digits=10, decimal_places=2)
+    Order.objects.update(
+        total_eur=Coalesce(
+            Subquery(lines.annotate(t=Sum(F('unit_price_eur') * F('quantity'), output_field=money)).values('t')),
+            Value(Decimal('0')), output_field=money,
+        ),
+        item_count=Coalesce(Subquery(lines.annotate(n=Sum('quantity')).values('n')), Value(0)),
+    )
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ('offers', '0001_initial'),
+        ('orders', '0004_orderitem_unique_order_offer'),
+    ]
+    operations = [
+        migrations.AddField(
+            model_name='orderitem',
+            name='unit_price_eur',
+            field=models.DecimalField(decimal_places=2, default=0, editable=False, max_digits=8),
+            preserve_default=False,
+        ),
+        migrations.AddField(
+            model_name='order',
+            name='total_eur',
+            field=models.DecimalField(decimal_places=2, default=0, editable=False, max_digits=10),
+        ),
+        migrations.AddField(
+            model_name='order',
+            name='item_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(backfill, migrations.RunPython.noop),
+    ]
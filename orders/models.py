@@ -1,24 +1,128 @@
-from django.db import models
+from decimal import Decimal
+from django.db import models, connection
+from django.db.models import DecimalField, F, OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
 from django.contrib.auth.models import User
 from offers.models import Offer
 import secrets
 
+
 class Order(models.Model):
-    user = models.ForeignKey(User, on_delete=models.CASCADE)
+    user = models.ForeignKey(
+        User, on_delete=models.CASCADE, null=True, blank=True
+    )  # NULL = panier invité
     created_at = models.DateTimeField(auto_now_add=True)
     purchase_key = models.CharField(max_length=32, unique=True, editable=False)
+    ticket_serial = models.PositiveIntegerField(default=0, editable=False)
+    # Dénormalisés depuis les lignes (``refresh_totals``) : listes, factures et admin
+    # lisent le total sans joindre offers_offer
+    total_eur = models.DecimalField(
+        max_digits=10, decimal_places=2, default=0, editable=False
+    )
+    item_count = models.PositiveIntegerField(default=0, editable=False)
 
     def save(self, *args, **kwargs):
         if not self.purchase_key:
             self.purchase_key = secrets.token_hex(16)
         return super().save(*args, **kwargs)
 
-    def total_eur(self):
-        return sum(item.total_eur() for item in self.items.all())
+    @classmethod
+    def refresh_totals(cls, *order_ids):
+        """Recalcule ``total_eur`` et ``item_count`` en un seul UPDATE.
+
+        Sous-requêtes agrégées, aucune ligne chargée en Python.
+        """
+        lines = (
+            OrderItem.objects.filter(order=OuterRef("pk")).order_by().values("order")
+        )
+        money = DecimalField(max_digits=10, decimal_places=2)
+        cls.objects.filter(pk__in=order_ids).update(
+            total_eur=Coalesce(
+                Subquery(
+                    lines.annotate(
+                        t=Sum(F("unit_price_eur") * F("quantity"), output_field=money)
+                    ).values("t")
+                ),
+                Value(Decimal("0")),
+                output_field=money,
+            ),
+            item_count=Coalesce(
+                Subquery(lines.annotate(n=Sum("quantity")).values("n")), Value(0)
+            ),
+        )
+
+    def reserve_serials(self, count: int) -> int:
+        """Réserve ``count`` numéros de série consécutifs, renvoie le premier.
+
+        Un seul ``UPDATE ... RETURNING`` : deux checkouts concurrents de la même
+        commande obtiennent des blocs disjoints.
+        """
+        qn = connection.ops.quote_name
+        serial = qn("ticket_serial")
+        with connection.cursor() as cur:
+            cur.execute(
+                f"UPDATE {qn(self._meta.db_table)} SET {serial} = {serial} + %s "
+                f"WHERE {qn('id')} = %s RETURNING {serial}",
+                [count, self.pk],
+            )
+            last = cur.fetchone()[0]
+        self.ticket_serial = last
+        return last - count + 1
+
 
 class OrderItem(models.Model):
     order = models.ForeignKey(Order, on_delete=models.CASCADE, related_name="items")
     offer = models.ForeignKey(Offer, on_delete=models.PROTECT)
     quantity = models.PositiveIntegerField(default=1)
+    # Prix unitaire figé à l'ajout de la ligne : les totaux ne bougent plus si
+    # l'offre change de prix
+    unit_price_eur = models.DecimalField(max_digits=8, decimal_places=2, editable=False)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["order", "offer"], name="orders_item_order_offer_uniq"
+            ),
+        ]
+
+    @classmethod
+    def upsert(
+        cls, order_id: int, offer_id: int, qty: int, increment: bool = True
+    ) -> int:
+        """Ajoute (``increment``) ou fixe la quantité d'une ligne ; renvoie la
+        nouvelle quantité.
+
+        Un seul ``INSERT ... ON CONFLICT (order, offer) DO UPDATE ... RETURNING`` :
+        deux ajouts concurrents (double-clic) s'additionnent sans se perdre.
+        Le prix unitaire est relu dans la même requête à chaque ajout ou modification :
+        toute la ligne passe au prix courant (pas de quantité ajoutée à un ancien prix).
+        Il reste figé tant que la ligne n'est pas touchée, et au checkout.
+        """
+        qn = connection.ops.quote_name
+        table = qn(cls._meta.db_table)
+        value = (
+            f"{table}.{qn('quantity')} + excluded.{qn('quantity')}"
+            if increment
+            else f"excluded.{qn('quantity')}"
+        )
+        with connection.cursor() as cur:
+            cur.execute(
+                f"INSERT INTO {table} ({qn('order_id')}, {qn('offer_id')}, "
+                f"{qn('quantity')}, {qn('unit_price_eur')}) "
+                f"SELECT %s, o.{qn('id')}, %s, o.{qn('price_eur')} "
+                f"FROM {qn(Offer._meta.db_table)} o WHERE o.{qn('id')} = %s "
+                f"ON CONFLICT ({qn('order_id')}, {qn('offer_id')}) "
+                f"DO UPDATE SET {qn('quantity')} = {value}, "
+                f"{qn('unit_price_eur')} = excluded.{qn('unit_price_eur')} "
+                f"RETURNING {qn('quantity')}",
+                [order_id, qty, offer_id],
+            )
+            return cur.fetchone()[0]
+
+    def save(self, *args, **kwargs):
+        if self.unit_price_eur is None:
+            self.unit_price_eur = self.offer.price_eur
+        return super().save(*args, **kwargs)
+
     def total_eur(self):
-        return float(self.offer.price_eur) * self.quantity
+        return float(self.unit_price_eur) * self.quantity
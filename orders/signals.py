@@ -0,0 +1,21 @@
+from django.contrib.auth.signals import user_logged_in
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+from .cart import SESSION_KEY
+from .models import Order, OrderItem
+
+
+@receiver(user_logged_in)
+def adopt_guest_cart(sender, request, user, **kwargs):
+    """Rattache le panier invité de la session au compte qui vient de se connecter."""
+    order_id = request.session.get(SESSION_KEY) if request is not None else None
+    if order_id:
+        Order.objects.filter(id=order_id, user__isnull=True).update(user=user)
+
+
+@receiver(post_save, sender=OrderItem)
+@receiver(post_delete, sender=OrderItem)
+def refresh_order_totals(sender, instance, **kwargs):
+    """Lignes modifiées via l'ORM (admin, shell) ; les chemins groupés du panier
+    appellent ``Order.refresh_totals`` eux-mêmes."""
+    Order.refresh_totals(instance.order_id)
@@ -0,0 +1,13 @@
+"""Tâches exécutées par ``manage.py run_workers`` (voir ``core.jobs``)."""
+
+from . import invoice
+from .models import Order
+
+
+def render_invoice(order_id: int):
+    """Écrit le PDF de la facture sur disque avant le premier téléchargement."""
+    order = Order.objects.filter(id=order_id).first()
+    if order is None:
+        return
+    data = invoice.invoice_data(order)
+    invoice.get_or_render(data, invoice.content_hash(data))
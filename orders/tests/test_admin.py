@@ -0,0 +1,37 @@
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.contrib.auth.models import User
+from offers.models import Offer
+from orders.models import Order, OrderItem
+
+
+class AdminOrderTests(TestCase):
+    def setUp(self):
+        self.admin = User.objects.create_superuser(
+            username="admin", password="StrongPassw0rd!", email="a@a.a"
+        )
+        self.offer = Offer.objects.create(name="Solo", offer_type="solo", price_eur=50)
+        self.client.login(username="admin", password="StrongPassw0rd!")
+
+    def add_orders(self, n):
+        for _ in range(n):
+            order = Order.objects.create(user=self.admin)
+            OrderItem.objects.create(order=order, offer=self.offer, quantity=2)
+
+    def changelist_queries(self):
+        with CaptureQueriesContext(connection) as ctx:
+            resp = self.client.get("/admin/orders/order/")
+        self.assertEqual(resp.status_code, 200)
+        return len(ctx.captured_queries)
+
+    def test_changelist_query_count_independent_of_rows(self):
+        self.add_orders(2)
+        few = self.changelist_queries()
+        self.add_orders(10)
+        self.assertEqual(self.changelist_queries(), few)
+
+    def test_changelist_shows_denormalised_total(self):
+        self.add_orders(1)
+        resp = self.client.get("/admin/orders/order/")
+        self.assertContains(resp, "100.00 €")
@@ -2,44 +2,50 @@ from django.test import TestCase, override_settings
 from django.contrib.auth.models import User
 from offers.models import Offer
 from tickets.models import Ticket
-import tempfile, shutil, os
+import tempfile
+
 
 @override_settings(MEDIA_ROOT=tempfile.gettempdir())
 class CartCheckoutTests(TestCase):
     def setUp(self):
-        self.user = User.objects.create_user('buyer', password='Password123!')
-        self.offer = Offer.objects.create(name='Solo', offer_type='solo', price_eur=50, is_active=True)
+        self.user = User.objects.create_user("buyer", password="Password123!")
+        self.offer = Offer.objects.create(
+            name="Solo", offer_type="solo", price_eur=50, is_active=True
+        )
 
     def test_cart_add_summary_update_clear(self):
         # add item
-        r = self.client.post('/api/cart/add/', {'offer_id': self.offer.id, 'qty': 2})
+        r = self.client.post("/api/cart/add/", {"offer_id": self.offer.id, "qty": 2})
         self.assertEqual(r.status_code, 200)
         # summary
-        r = self.client.get('/api/cart/')
+        r = self.client.get("/api/cart/")
         self.assertEqual(r.status_code, 200)
         data = r.json()
-        self.assertEqual(len(data['items']), 1)
-        self.assertAlmostEqual(data['total'], 100.0, places=2)
+        self.assertEqual(len(data["items"]), 1)
+        self.assertAlmostEqual(data["total"], 100.0, places=2)
         # update
-        r = self.client.post('/api/cart/update/', {'offer_id': self.offer.id, 'qty': 1})
+        r = self.client.post("/api/cart/update/", {"offer_id": self.offer.id, "qty": 1})
         self.assertEqual(r.status_code, 200)
-        r = self.client.get('/api/cart/')
-        self.assertEqual(r.json()['total'], 50.0)
+        r = self.client.get("/api/cart/")
+        self.assertEqual(r.json()["total"], 50.0)
         # clear
-        r = self.client.post('/api/cart/clear/')
+        r = self.client.post("/api/cart/clear/")
         self.assertEqual(r.status_code, 200)
-        self.assertEqual(self.client.get('/api/cart/').json()['items'], [])
+        self.assertEqual(self.client.get("/api/cart/").json()["items"], [])
 
     def test_checkout_creates_tickets_and_clears_cart(self):
         # login
-        self.client.login(username='buyer', password='Password123!')
+        self.client.login(username="buyer", password="Password123!")
         # add to cart
-        self.client.post('/api/cart/add/', {'offer_id': self.offer.id, 'qty': 2})
+        self.client.post("/api/cart/add/", {"offer_id": self.offer.id, "qty": 2})
         # checkout
-        r = self.client.post('/api/cart/checkout/')
+        r = self.client.post("/api/cart/checkout/")
         self.assertEqual(r.status_code, 200)  # API returns JSON, not redirect
         # tickets created
         self.assertEqual(Ticket.objects.filter(user=self.user).count(), 2)
-        # media file written (at least for one)
+        # no QR file written, the QR is rendered on demand
         t = Ticket.objects.filter(user=self.user).first()
-        self.assertTrue(bool(t.qr_image.name))
+        self.assertFalse(t.qr_image)
+        r = self.client.get(f"/tickets/{t.id}/qr.png")
+        self.assertEqual(r.status_code, 200)
+        self.assertEqual(r["Content-Type"], "image/png")
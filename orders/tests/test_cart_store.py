@@ -0,0 +1,123 @@
+from django.contrib.auth.models import User
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from offers.models import Offer
+from orders.models import Order, OrderItem
+from tickets.models import Ticket
+
+LOCMEM = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        "LOCATION": "cart-tests",
+    }
+}
+
+
+class CartPricingMixin:
+    """Le résumé affiche les prix relevés sur les lignes, ceux du checkout."""
+
+    def test_summary_matches_checkout_after_price_change(self):
+        User.objects.create_user("payer", password="Password123!")
+        self.client.login(username="payer", password="Password123!")
+        self.client.post("/api/cart/add/", {"offer_id": self.solo.id, "qty": 2})
+        Offer.objects.filter(id=self.solo.id).update(price_eur=80)
+        self.assertAlmostEqual(
+            self.client.get("/api/cart/").json()["total"], 100.0
+        )  # prix relevé à l'ajout
+        self.client.post(
+            "/api/cart/add/", {"offer_id": self.solo.id, "qty": 1}
+        )  # toute la ligne au prix courant
+        summary = self.client.get("/api/cart/").json()
+        self.assertAlmostEqual(summary["total"], 240.0)
+        self.assertEqual(self.client.post("/api/cart/checkout/").status_code, 200)
+        self.assertEqual(float(Order.objects.get().total_eur), summary["total"])
+
+
+class MemoryCartStoreMixin(CartPricingMixin):
+    """Scénario commun aux paniers hors base (session signée / cache)."""
+
+    def setUp(self):
+        self.solo = Offer.objects.create(
+            name="Solo", offer_type="solo", price_eur=50, is_active=True
+        )
+        self.duo = Offer.objects.create(
+            name="Duo", offer_type="duo", price_eur=90, is_active=True
+        )
+
+    def test_cart_mutations_do_not_write_database(self):
+        with CaptureQueriesContext(connection) as ctx:
+            self.client.post("/api/cart/add/", {"offer_id": self.solo.id, "qty": 2})
+            self.client.post("/api/cart/add/", {"offer_id": self.duo.id})
+            self.client.post("/api/cart/update/", {"offer_id": self.solo.id, "qty": 3})
+            self.client.get(f"/orders/cart/add/{self.duo.id}/?qty=1")
+        writes = [
+            q["sql"]
+            for q in ctx.captured_queries
+            if q["sql"].lstrip().split()[0].upper() in ("INSERT", "UPDATE", "DELETE")
+        ]
+        self.assertEqual(writes, [])
+        self.assertFalse(Order.objects.exists())
+        data = self.client.get("/api/cart/").json()
+        self.assertEqual(
+            {i["offer_id"]: i["qty"] for i in data["items"]},
+            {self.solo.id: 3, self.duo.id: 2},
+        )
+        self.assertAlmostEqual(data["total"], 330.0)
+
+    def test_checkout_materialises_order(self):
+        self.client.post("/api/cart/add/", {"offer_id": self.solo.id, "qty": 2})
+        user = User.objects.create_user("alice", password="Password123!")
+        self.client.login(username="alice", password="Password123!")
+        r = self.client.post("/api/cart/checkout/")
+        self.assertEqual(r.status_code, 200)
+        order = Order.objects.get()
+        self.assertEqual(order.user, user)
+        self.assertEqual(
+            list(order.items.values_list("offer_id", "quantity")), [(self.solo.id, 2)]
+        )
+        self.assertEqual(Ticket.objects.filter(order=order).count(), 2)
+        self.assertEqual(self.client.get("/api/cart/").json()["items"], [])
+        self.assertEqual(self.client.post("/api/cart/checkout/").status_code, 400)
+
+    def test_cart_lines(self):
+        self.client.post("/api/cart/add/", {"offer_id": self.solo.id, "qty": 2})
+        r = self.client.post(
+            "/api/cart/lines/",
+            {"lines": [{"offer_id": self.duo.id, "qty": 3}]},
+            content_type="application/json",
+        )
+        self.assertEqual(
+            [(i["offer_id"], i["qty"]) for i in r.json()["items"]], [(self.duo.id, 3)]
+        )
+        self.assertFalse(Order.objects.exists())
+
+    def test_clear(self):
+        self.client.post("/api/cart/add/", {"offer_id": self.solo.id})
+        self.client.post("/api/cart/clear/")
+        self.assertEqual(self.client.get("/api/cart/").json()["items"], [])
+        self.assertFalse(OrderItem.objects.exists())
+
+
+class DatabaseCartStoreTests(CartPricingMixin, TestCase):
+    def setUp(self):
+        self.solo = Offer.objects.create(
+            name="Solo", offer_type="solo", price_eur=50, is_active=True
+        )
+
+
+@override_settings(
+    CART_STORE="orders.cart.SessionCartStore",
+    SESSION_ENGINE="django.contrib.sessions.backends.signed_cookies",
+)
+class SessionCartStoreTests(MemoryCartStoreMixin, TestCase):
+    pass
+
+
+@override_settings(
+    CART_STORE="orders.cart.CacheCartStore",
+    CACHES=LOCMEM,
+    SESSION_ENGINE="django.contrib.sessions.backends.signed_cookies",
+)
+class CacheCartStoreTests(MemoryCartStoreMixin, TestCase):
+    pass
@@ -0,0 +1,89 @@
+import io
+import tempfile
+import zipfile
+from datetime import date, timedelta
+from pathlib import Path
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from offers.models import Offer
+from orders.models import Order, OrderItem
+from tickets.models import Ticket
+
+
+class InvoiceExportTests(TestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.tmp = Path(tmp.name)
+        patcher = override_settings(INVOICE_ROOT=tmp.name, INVOICE_EXPORT_WORKERS=0)
+        patcher.enable()
+        self.addCleanup(patcher.disable)
+        self.user = User.objects.create_user(
+            username="buyer", password="StrongPassw0rd!"
+        )
+        self.offer = Offer.objects.create(
+            name="Solo", offer_type="solo", price_eur=50, is_active=True
+        )
+        self.paid = []
+        for _ in range(3):
+            order = Order.objects.create(user=self.user)
+            OrderItem.objects.create(order=order, offer=self.offer, quantity=1)
+            Ticket.issue_for_order(order)
+            self.paid.append(order.id)
+        old = Order.objects.create(user=self.user)
+        OrderItem.objects.create(order=old, offer=self.offer, quantity=1)
+        Ticket.issue_for_order(old)
+        Order.objects.filter(id=old.id).update(
+            created_at=timezone.now() - timedelta(days=30)
+        )
+        Order.objects.create(user=self.user)  # panier non payé : pas de facture
+
+    def _names(self, data):
+        with zipfile.ZipFile(io.BytesIO(data)) as archive:
+            self.assertIsNone(archive.testzip())
+            return sorted(archive.namelist())
+
+    def test_staff_endpoint_streams_zip(self):
+        User.objects.create_user(
+            username="staff", password="StrongPassw0rd!", is_staff=True
+        )
+        self.client.login(username="staff", password="StrongPassw0rd!")
+        today = timezone.localdate().isoformat()
+        resp = self.client.get(f"/api/orders/invoices/export/?from={today}&to={today}")
+        self.assertEqual(resp.status_code, 200)
+        self.assertTrue(resp.streaming)
+        self.assertEqual(resp["X-Invoice-Count"], "3")
+        self.assertEqual(
+            self._names(b"".join(resp.streaming_content)),
+            sorted(f"invoice-{i}.pdf" for i in self.paid),
+        )
+        self.assertEqual(
+            self.client.get("/api/orders/invoices/export/?from=demain").status_code, 400
+        )
+
+    def test_endpoint_requires_staff(self):
+        self.client.login(username="buyer", password="StrongPassw0rd!")
+        self.assertEqual(
+            self.client.get("/api/orders/invoices/export/").status_code, 403
+        )
+
+    def test_command_writes_archive(self):
+        output = self.tmp / "export.zip"
+        err = io.StringIO()
+        call_command(
+            "export_invoices",
+            "--workers",
+            "0",
+            "--batch",
+            "2",
+            "--output",
+            str(output),
+            "--from",
+            (date.today() - timedelta(days=60)).isoformat(),
+            stderr=err,
+        )
+        self.assertEqual(len(self._names(output.read_bytes())), 4)
+        self.assertIn("4/4 factures", err.getvalue())
+        self.assertIn("4 factures exportées", err.getvalue())
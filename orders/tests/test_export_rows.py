@@ -0,0 +1,112 @@
+import csv
+import io
+import json
+import tempfile
+from decimal import Decimal
+from pathlib import Path
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.test import TestCase
+from offers.models import Offer
+from orders import export
+from orders.models import Order, OrderItem
+from tickets.models import Ticket
+
+
+class RowExportTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username="buyer", password="StrongPassw0rd!"
+        )
+        self.solo = Offer.objects.create(name="Solo", offer_type="solo", price_eur=50)
+        self.duo = Offer.objects.create(
+            name="Duo «finale»", offer_type="duo", price_eur=90
+        )
+        self.order = Order.objects.create(user=self.user)
+        OrderItem.objects.create(order=self.order, offer=self.solo, quantity=2)
+        OrderItem.objects.create(order=self.order, offer=self.duo, quantity=1)
+        Ticket.issue_for_order(self.order)
+        self.other = Order.objects.create(user=self.user)
+        OrderItem.objects.create(order=self.other, offer=self.solo, quantity=1)
+
+    def test_line_rows_are_tuples(self):
+        columns, rows = export.line_rows(
+            OrderItem.objects.filter(order=self.order), chunk_size=1
+        )
+        rows = list(rows)
+        self.assertIsInstance(rows[0], tuple)
+        first = dict(zip(columns, rows[0]))
+        self.assertEqual(
+            (first["offer_name"], first["quantity"], first["line_total_eur"]),
+            ("Solo", 2, Decimal("100")),
+        )
+
+    def test_ticket_rows_carry_frozen_price(self):
+        self.solo.price_eur = 10
+        self.solo.save()
+        columns, rows = export.ticket_rows(Ticket.objects.all())
+        prices = sorted(
+            export._cell(dict(zip(columns, row))["unit_price_eur"]) for row in rows
+        )
+        self.assertEqual(prices, ["50.00", "50.00", "90.00"])
+
+    def test_stream_rows_formats(self):
+        columns, rows = export.line_rows(OrderItem.objects.all())
+        parsed = list(
+            csv.reader(
+                io.StringIO(b"".join(export.stream_rows(columns, rows, "csv")).decode())
+            )
+        )
+        self.assertEqual(parsed[0], columns)
+        self.assertEqual(len(parsed), 4)
+        columns, rows = export.ticket_rows(Ticket.objects.all())
+        lines = (
+            b"".join(export.stream_rows(columns, rows, "jsonl")).decode().splitlines()
+        )
+        record = json.loads(lines[0])
+        self.assertIsNone(record["verified_at"])
+        self.assertEqual(record["order_id"], self.order.id)
+        self.assertEqual(len(lines), 3)
+
+    def test_admin_actions_stream(self):
+        User.objects.create_superuser("admin", "admin@example.com", "StrongPassw0rd!")
+        self.client.login(username="admin", password="StrongPassw0rd!")
+        resp = self.client.post(
+            "/admin/orders/order/",
+            {
+                "action": "export_lines_csv",
+                "_selected_action": [self.order.id],
+            },
+        )
+        self.assertTrue(resp.streaming)
+        body = b"".join(resp.streaming_content).decode()
+        self.assertEqual(
+            len(body.splitlines()), 3
+        )  # en-tête + 2 lignes de la commande choisie
+        resp = self.client.post(
+            "/admin/tickets/ticket/",
+            {
+                "action": "export_tickets_jsonl",
+                "_selected_action": list(
+                    Ticket.objects.values_list("id", flat=True)[:1]
+                ),
+            },
+        )
+        self.assertEqual(resp["Content-Type"], "application/x-ndjson")
+        self.assertEqual(len(b"".join(resp.streaming_content).splitlines()), 1)
+
+    def test_command(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            output = Path(tmp) / "tickets.jsonl"
+            err = io.StringIO()
+            call_command(
+                "export_orders",
+                "tickets",
+                "--format",
+                "jsonl",
+                "-o",
+                str(output),
+                stderr=err,
+            )
+            self.assertEqual(len(output.read_text().splitlines()), 3)
+        self.assertIn("3 lignes exportées", err.getvalue())
@@ -0,0 +1,45 @@
+from django.contrib.auth.models import User
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from accounts.models import Profile
+from offers.models import Offer
+from orders.models import Order
+
+
+class GuestCartTests(TestCase):
+    def setUp(self):
+        self.offer = Offer.objects.create(
+            name="Solo", offer_type="solo", price_eur=50, is_active=True
+        )
+
+    def test_guest_cart_creates_no_user(self):
+        self.client.post("/api/cart/add/", data={"offer_id": self.offer.id, "qty": 2})
+        self.client.get(f"/orders/cart/add/{self.offer.id}/?qty=1")
+        self.assertEqual(User.objects.count(), 0)
+        self.assertEqual(Profile.objects.count(), 0)
+        order = Order.objects.get()
+        self.assertIsNone(order.user)
+        self.assertEqual(order.items.get().quantity, 3)
+
+    def test_cart_summary_never_writes(self):
+        self.client.post("/api/cart/add/", data={"offer_id": self.offer.id, "qty": 1})
+        for client in (self.client, self.client_class()):
+            with CaptureQueriesContext(connection) as ctx:
+                self.assertEqual(client.get("/api/cart/").status_code, 200)
+            writes = [
+                q["sql"]
+                for q in ctx.captured_queries
+                if q["sql"].lstrip().split()[0].upper()
+                in ("INSERT", "UPDATE", "DELETE")
+            ]
+            self.assertEqual(writes, [])
+
+    def test_login_adopts_guest_cart(self):
+        self.client.post("/api/cart/add/", data={"offer_id": self.offer.id, "qty": 1})
+        user = User.objects.create_user("alice", password="Password123!")
+        self.client.login(username="alice", password="Password123!")
+        self.assertEqual(Order.objects.get().user, user)
+        r = self.client.post("/api/cart/checkout/")
+        self.assertEqual(r.status_code, 200)
+        self.assertEqual(len(r.json()["tickets"]), 1)
@@ -0,0 +1,91 @@
+import tempfile
+from pathlib import Path
+from unittest import mock
+from django.core.exceptions import ImproperlyConfigured
+from django.test import TestCase, override_settings
+from django.contrib.auth.models import User
+from offers.models import Offer
+from orders.models import Order, OrderItem
+from orders import invoice
+
+
+class InvoiceCacheTests(TestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.root = Path(tmp.name)
+        patcher = override_settings(INVOICE_ROOT=tmp.name)
+        patcher.enable()
+        self.addCleanup(patcher.disable)
+        self.user = User.objects.create_user(username="inv", password="StrongPassw0rd!")
+        self.offer = Offer.objects.create(
+            name="Solo", offer_type="solo", price_eur=50, is_active=True
+        )
+        self.order = Order.objects.create(user=self.user)
+        OrderItem.objects.create(order=self.order, offer=self.offer, quantity=2)
+        self.url = f"/orders/{self.order.id}/invoice.pdf"
+        self.client.login(username="inv", password="StrongPassw0rd!")
+
+    def test_rendered_once_then_read_from_disk(self):
+        with mock.patch("orders.invoice.render", wraps=invoice.render) as render:
+            first = self.client.get(self.url)
+            second = self.client.get(self.url)
+        self.assertEqual(render.call_count, 1)
+        self.assertEqual(first.content, second.content)
+        self.assertTrue(first.content.startswith(b"%PDF"))
+        self.assertEqual(first["ETag"], second["ETag"])
+        self.assertEqual(len(list(self.root.glob(f"{self.order.id}/*.pdf"))), 1)
+
+    def test_refuses_root_under_media(self):
+        with override_settings(MEDIA_ROOT=str(self.root.parent)):
+            with self.assertRaises(ImproperlyConfigured):
+                invoice.path_for(self.order.id, "x")
+
+    def test_render_is_deterministic(self):
+        data = invoice.invoice_data(self.order)
+        self.assertEqual(invoice.render(data), invoice.render(data))
+
+    def test_if_none_match_returns_304(self):
+        etag = self.client.get(self.url)["ETag"]
+        resp = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(resp.status_code, 304)
+        self.assertEqual(resp["ETag"], etag)
+
+    def test_order_change_invalidates(self):
+        etag = self.client.get(self.url)["ETag"]
+        OrderItem.objects.filter(order=self.order).update(quantity=3)
+        Order.refresh_totals(self.order.id)
+        resp = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(resp.status_code, 200)
+        self.assertNotEqual(resp["ETag"], etag)
+        self.assertEqual(
+            len(list(self.root.glob(f"{self.order.id}/*.pdf"))), 1
+        )  # ancienne version supprimée
+
+    def test_range_requests(self):
+        full = self.client.get(self.url)
+        body = full.content
+        resp = self.client.get(self.url, HTTP_RANGE="bytes=0-99")
+        self.assertEqual(resp.status_code, 206)
+        self.assertEqual(resp.content, body[:100])
+        self.assertEqual(resp["Content-Range"], f"bytes 0-99/{len(body)}")
+        resp = self.client.get(self.url, HTTP_RANGE="bytes=-10")
+        self.assertEqual(resp.content, body[-10:])
+        resp = self.client.get(self.url, HTTP_RANGE=f"bytes={len(body)}-")
+        self.assertEqual(resp.status_code, 416)
+        self.assertEqual(resp["Content-Range"], f"bytes */{len(body)}")
+        # If-Range périmé : document complet
+        resp = self.client.get(
+            self.url, HTTP_RANGE="bytes=0-99", HTTP_IF_RANGE='"stale"'
+        )
+        self.assertEqual((resp.status_code, resp.content), (200, body))
+
+    def test_parse_range(self):
+        self.assertIsNone(invoice.parse_range(None, 10))
+        self.assertIsNone(invoice.parse_range("bytes=0-1,4-5", 10))
+        self.assertIsNone(invoice.parse_range("bytes=5-3", 10))
+        self.assertEqual(invoice.parse_range("bytes=2-", 10), (2, 9))
+        self.assertEqual(invoice.parse_range("bytes=8-100", 10), (8, 9))
+        self.assertEqual(invoice.parse_range("bytes=-100", 10), (0, 9))
+        with self.assertRaises(ValueError):
+            invoice.parse_range("bytes=-0", 10)
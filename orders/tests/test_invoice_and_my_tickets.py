@@ -1,12 +1,22 @@
-from django.test import TestCase
+import os
+import tempfile
+from django.test import TestCase, override_settings
 from django.contrib.auth.models import User
 from offers.models import Offer
 from orders.models import Order, OrderItem
 
+
+@override_settings(
+    INVOICE_ROOT=os.path.join(tempfile.gettempdir(), "etickets-invoices")
+)
 class InvoiceAndMyTicketsTests(TestCase):
     def setUp(self):
-        self.user = User.objects.create_user(username="john", password="StrongPassw0rd!")
-        self.offer = Offer.objects.create(name="Solo", offer_type="solo", price_eur=50, is_active=True)
+        self.user = User.objects.create_user(
+            username="john", password="StrongPassw0rd!"
+        )
+        self.offer = Offer.objects.create(
+            name="Solo", offer_type="solo", price_eur=50, is_active=True
+        )
 
     def test_invoice_pdf(self):
         order = Order.objects.create(user=self.user)
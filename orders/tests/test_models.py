@@ -3,12 +3,67 @@ from django.contrib.auth.models import User
 from offers.models import Offer
 from orders.models import Order, OrderItem
 
+
 class OrderModelTest(TestCase):
     def setUp(self):
-        self.user = User.objects.create_user(username='u', password='p4ssword!')
-        self.offer = Offer.objects.create(name='Solo', offer_type='solo', price_eur=50)
+        self.user = User.objects.create_user(username="u", password="p4ssword!")
+        self.offer = Offer.objects.create(name="Solo", offer_type="solo", price_eur=50)
 
     def test_order_total(self):
         order = Order.objects.create(user=self.user)
         OrderItem.objects.create(order=order, offer=self.offer, quantity=2)
-        self.assertEqual(order.total_eur(), 100.0)
+        order.refresh_from_db()
+        self.assertEqual(order.total_eur, 100)
+        self.assertEqual(order.item_count, 2)
+
+    def test_price_snapshot_follows_line_changes(self):
+        order = Order.objects.create(user=self.user)
+        OrderItem.upsert(order.id, self.offer.id, 1)
+        Order.refresh_totals(order.id)
+        self.offer.price_eur = 80
+        self.offer.save()
+        order.refresh_from_db()
+        self.assertEqual(
+            order.total_eur, 50
+        )  # ligne non touchée : prix relevé conservé
+        OrderItem.upsert(
+            order.id, self.offer.id, 2
+        )  # ajout : toute la ligne au prix courant
+        Order.refresh_totals(order.id)
+        order.refresh_from_db()
+        self.assertEqual(order.items.get().unit_price_eur, 80)
+        self.assertEqual((order.total_eur, order.item_count), (240, 3))
+        item = order.items.get()
+        item.delete()
+        order.refresh_from_db()
+        self.assertEqual((order.total_eur, order.item_count), (0, 0))
+
+    def test_reserve_serials_allocates_contiguous_blocks(self):
+        order = Order.objects.create(user=self.user)
+        with self.assertNumQueries(1):
+            self.assertEqual(order.reserve_serials(3), 1)
+        self.assertEqual(order.reserve_serials(2), 4)
+        # Un autre objet pointant sur la même ligne continue la séquence
+        self.assertEqual(Order.objects.get(id=order.id).reserve_serials(1), 6)
+        order.refresh_from_db()
+        self.assertEqual(order.ticket_serial, 6)
+
+    def test_upsert_adds_and_sets_in_one_query(self):
+        order = Order.objects.create(user=self.user)
+        with self.assertNumQueries(1):
+            self.assertEqual(OrderItem.upsert(order.id, self.offer.id, 2), 2)
+        self.assertEqual(OrderItem.upsert(order.id, self.offer.id, 3), 5)
+        self.assertEqual(
+            OrderItem.upsert(order.id, self.offer.id, 1, increment=False), 1
+        )
+        self.assertEqual(list(order.items.values_list("quantity", flat=True)), [1])
+
+    def test_cart_add_returns_new_quantity(self):
+        r1 = self.client.post("/api/cart/add/", {"offer_id": self.offer.id, "qty": 2})
+        with self.assertNumQueries(
+            5
+        ):  # session, offre, commande, upsert, totaux (sans réécrire la session)
+            r2 = self.client.post(
+                "/api/cart/add/", {"offer_id": self.offer.id, "qty": 1}
+            )
+        self.assertEqual((r1.json()["qty"], r2.json()["qty"]), (2, 3))
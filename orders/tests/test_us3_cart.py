@@ -1,13 +1,22 @@
+from unittest.mock import patch
+from django.db import connection
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
 from offers.models import Offer
+from orders.models import OrderItem
+
 
 class CartApiTests(TestCase):
     def setUp(self):
-        self.offer = Offer.objects.create(name="Solo", offer_type="solo", price_eur=50, is_active=True)
+        self.offer = Offer.objects.create(
+            name="Solo", offer_type="solo", price_eur=50, is_active=True
+        )
 
     def test_cart_add_and_summary(self):
         # add 2
-        resp = self.client.post("/api/cart/add/", data={"offer_id": self.offer.id, "qty": 2})
+        resp = self.client.post(
+            "/api/cart/add/", data={"offer_id": self.offer.id, "qty": 2}
+        )
         self.assertEqual(resp.status_code, 200)
         # summary
         resp = self.client.get("/api/cart/")
@@ -21,10 +30,112 @@ class CartApiTests(TestCase):
         # add 1
         self.client.post("/api/cart/add/", data={"offer_id": self.offer.id, "qty": 1})
         # update to 3
-        self.client.post("/api/cart/update/", data={"offer_id": self.offer.id, "qty": 3})
+        self.client.post(
+            "/api/cart/update/", data={"offer_id": self.offer.id, "qty": 3}
+        )
         resp = self.client.get("/api/cart/")
         self.assertEqual(resp.json()["items"][0]["qty"], 3)
         # clear
         self.client.post("/api/cart/clear/")
         resp = self.client.get("/api/cart/")
         self.assertEqual(resp.json()["items"], [])
+
+    def test_cart_lines_replaces_whole_cart(self):
+        duo = Offer.objects.create(
+            name="Duo", offer_type="duo", price_eur=90, is_active=True
+        )
+        famille = Offer.objects.create(
+            name="Famille", offer_type="familiale", price_eur=150, is_active=True
+        )
+        self.client.post("/api/cart/add/", data={"offer_id": self.offer.id, "qty": 1})
+        self.client.post("/api/cart/add/", data={"offer_id": duo.id, "qty": 1})
+        # solo modifié, duo retiré, famille ajouté : un INSERT, un UPDATE, un DELETE
+        with CaptureQueriesContext(connection) as ctx:
+            resp = self.client.post(
+                "/api/cart/lines/",
+                data={
+                    "lines": [
+                        {"offer_id": self.offer.id, "qty": 4},
+                        {"offer_id": famille.id, "qty": 1},
+                    ]
+                },
+                content_type="application/json",
+            )
+        self.assertEqual(resp.status_code, 200)
+        item_writes = [
+            q["sql"].split()[0]
+            for q in ctx.captured_queries
+            if q["sql"].startswith(
+                (
+                    'INSERT INTO "orders_orderitem"',
+                    'UPDATE "orders_orderitem"',
+                    'DELETE FROM "orders_orderitem"',
+                )
+            )
+        ]
+        self.assertEqual(sorted(item_writes), ["DELETE", "INSERT", "UPDATE"])
+        data = resp.json()
+        self.assertEqual(
+            {i["offer_id"]: i["qty"] for i in data["items"]},
+            {self.offer.id: 4, famille.id: 1},
+        )
+        self.assertAlmostEqual(data["total"], 350.0, places=2)
+        self.assertEqual(self.client.get("/api/cart/").json()["items"], data["items"])
+
+    def test_cart_lines_tolerates_concurrent_add(self):
+        duo = Offer.objects.create(
+            name="Duo", offer_type="duo", price_eur=90, is_active=True
+        )
+        self.client.post("/api/cart/add/", data={"offer_id": self.offer.id, "qty": 1})
+        order_id = self.client.session["current_order_id"]
+        prices_lookup = Offer.objects.filter
+
+        def add_from_other_tab(*args, **kwargs):
+            # cart_add concurrent, entre la relecture des lignes et l'INSERT groupé
+            if (
+                "is_active" not in kwargs
+                and not OrderItem.objects.filter(order_id=order_id, offer=duo).exists()
+            ):
+                OrderItem.upsert(order_id, duo.id, 5)
+            return prices_lookup(*args, **kwargs)
+
+        with patch.object(Offer.objects, "filter", side_effect=add_from_other_tab):
+            resp = self.client.post(
+                "/api/cart/lines/",
+                data={"lines": [{"offer_id": duo.id, "qty": 2}]},
+                content_type="application/json",
+            )
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual(
+            dict(
+                OrderItem.objects.filter(order_id=order_id).values_list(
+                    "offer_id", "quantity"
+                )
+            ),
+            {duo.id: 2},
+        )
+
+    def test_cart_lines_validation(self):
+        inactive = Offer.objects.create(
+            name="Old", offer_type="solo", price_eur=10, is_active=False
+        )
+        for payload in (
+            {},
+            {"lines": "x"},
+            {"lines": [{"qty": 1}]},
+            {"lines": [{"offer_id": self.offer.id, "qty": -1}]},
+        ):
+            resp = self.client.post(
+                "/api/cart/lines/", data=payload, content_type="application/json"
+            )
+            self.assertEqual(resp.status_code, 400, payload)
+        resp = self.client.post(
+            "/api/cart/lines/",
+            data={"lines": [{"offer_id": inactive.id, "qty": 1}]},
+            content_type="application/json",
+        )
+        self.assertEqual(resp.json()["offer_ids"], [inactive.id])
+        resp = self.client.post(
+            "/api/cart/lines/", data={"lines": []}, content_type="application/json"
+        )
+        self.assertEqual(resp.json()["items"], [])
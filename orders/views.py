@@ -1,55 +1,105 @@
 from django.shortcuts import render, get_object_or_404, redirect
 from django.contrib.auth.decorators import login_required
 from django.views.decorators.csrf import csrf_exempt
+from django.http import HttpResponse, HttpResponseBadRequest, HttpResponseNotModified
+from django.utils.http import parse_etags
+from django.db.models import Count, Exists, OuterRef, Prefetch, prefetch_related_objects
 from .models import Order, OrderItem
 from offers.models import Offer
-from .api import get_or_create_guest_user, get_or_create_order_for
+from .api import checkout_cart, get_cart
+from . import invoice
+
+MY_ORDERS_PAGE_SIZE = 20
+
 
 @login_required
 def my_orders(request):
-    orders = Order.objects.filter(user=request.user).prefetch_related("items__offer").order_by("-id")
-    return render(request, "my_orders.html", {"orders": orders})
+    """Commandes de l'utilisateur, paginées par curseur sur ``-id`` (``?before=<id>``).
+
+    Le total vient de la colonne dénormalisée ``Order.total_eur`` ; le nombre de
+    lignes et l'état payé sont agrégés en SQL, et les lignes ne sont chargées
+    que pour la page affichée.
+    """
+    from tickets.models import Ticket
+
+    orders = (
+        Order.objects.filter(user=request.user)
+        .annotate(
+            line_count=Count("items"),
+            is_paid=Exists(Ticket.objects.filter(order=OuterRef("pk"))),
+        )
+        .order_by("-id")
+    )
+    before = _require_int(request.GET.get("before"), 0)
+    if before > 0:
+        orders = orders.filter(id__lt=before)
+    page = list(orders[: MY_ORDERS_PAGE_SIZE + 1])
+    has_next = len(page) > MY_ORDERS_PAGE_SIZE
+    page = page[:MY_ORDERS_PAGE_SIZE]
+    prefetch_related_objects(
+        page,
+        Prefetch(
+            "items", queryset=OrderItem.objects.select_related("offer").order_by("id")
+        ),
+    )
+    return render(
+        request,
+        "my_orders.html",
+        {
+            "orders": page,
+            "next_before": page[-1].id if has_next else None,
+            "is_first_page": before <= 0,
+        },
+    )
+
 
 @login_required
 def invoice_pdf(request, order_id: int):
-    from io import BytesIO
-    from reportlab.lib.pagesizes import A4
-    from reportlab.pdfgen import canvas
-    from django.http import HttpResponse
+    """GET /orders/<id>/invoice.pdf — PDF rendu une fois puis lu sur disque.
+
+    Voir ``orders.invoice``.
+
+    ETag = empreinte des données facturées : ``If-None-Match`` répond 304 sans
+    lire le fichier ; ``Range`` (plage unique, ``If-Range``) répond 206.
+    """
     order = get_object_or_404(Order, id=order_id, user=request.user)
-    buffer = BytesIO()
-    p = canvas.Canvas(buffer, pagesize=A4)
-    width, height = A4
-    y = height - 50
-    p.setFont("Helvetica-Bold", 16)
-    p.drawString(40, y, f"Facture #{order.id}")
-    y -= 20
-    p.setFont("Helvetica", 10)
-    p.drawString(40, y, f"Date: {order.created_at.strftime('%Y-%m-%d %H:%M')}")
-    y -= 30
-    total = 0.0
-    p.setFont("Helvetica-Bold", 12)
-    p.drawString(40, y, "Articles")
-    y -= 20
-    p.setFont("Helvetica", 10)
-    for it in order.items.select_related("offer"):
-        line_total = float(it.offer.price_eur) * it.quantity
-        total += line_total
-        p.drawString(40, y, f"- {it.offer.name} x{it.quantity}")
-        p.drawRightString(width-40, y, f"{line_total:.2f} €")
-        y -= 18
-        if y < 60:
-            p.showPage(); y = height - 50
-    y -= 10
-    p.setFont("Helvetica-Bold", 12)
-    p.drawRightString(width-40, y, f"Total: {total:.2f} €")
-    p.showPage()
-    p.save()
-    buffer.seek(0)
-    response = HttpResponse(buffer.getvalue(), content_type="application/pdf")
-    response["Content-Disposition"] = f'inline; filename="invoice-{order.id}.pdf"'
+    data = invoice.invoice_data(order)
+    digest = invoice.content_hash(data)
+    etag = invoice.etag_for(digest)
+    inm = request.headers.get("If-None-Match", "")
+    if inm.strip() == "*" or etag in parse_etags(inm):
+        response = HttpResponseNotModified()
+        response["ETag"] = etag
+        return response
+    pdf = invoice.get_or_render(data, digest)
+    if_range = request.headers.get("If-Range")
+    try:
+        byte_range = (
+            invoice.parse_range(request.headers.get("Range"), len(pdf))
+            if if_range in (None, etag)
+            else None
+        )
+    except ValueError:
+        response = HttpResponse(status=416)
+        response["Content-Range"] = f"bytes */{len(pdf)}"
+    else:
+        if byte_range is None:
+            response = HttpResponse(pdf, content_type="application/pdf")
+        else:
+            start, end = byte_range
+            response = HttpResponse(
+                pdf[start : end + 1], content_type="application/pdf", status=206
+            )
+            response["Content-Range"] = f"bytes {start}-{end}/{len(pdf)}"
+        response["Content-Disposition"] = f'inline; filename="invoice-{order.id}.pdf"'
+    response["ETag"] = etag
+    response["Accept-Ranges"] = "bytes"
+    response["Cache-Control"] = (
+        "private, no-cache"  # revalidation : le panier peut encore changer
+    )
     return response
 
+
 @csrf_exempt
 def cart_add_redirect(request, offer_id: int):
     """GET fallback: /orders/cart/add/<offer_id>/?qty=1&next=/offers/
@@ -62,24 +112,18 @@ def cart_add_redirect(request, offer_id: int):
         qty = int(request.GET.get("qty", "1"))
     except Exception:
         qty = 1
-    user = get_or_create_guest_user(request)
     offer = get_object_or_404(Offer, id=offer_id, is_active=True)
-    order = get_or_create_order_for(request, user)
-    item, _ = OrderItem.objects.get_or_create(order=order, offer=offer, defaults={"quantity": 0})
-    item.quantity = (item.quantity or 0) + max(qty, 1)
-    item.save()
-    request.session.modified = True
+    get_cart(request).add(offer.id, max(qty, 1))
     return redirect(next_url)
 
 
-from django.http import HttpResponseBadRequest
-
 def _require_int(val, default=0):
     try:
         return int(val)
     except Exception:
         return default
 
+
 @csrf_exempt
 def cart_update_redirect(request, offer_id: int):
     """GET fallback: /orders/cart/update/<offer_id>/?qty=2&next=/offers/
@@ -91,31 +135,19 @@ def cart_update_redirect(request, offer_id: int):
     qty = _require_int(request.GET.get("qty"), -999)
     if qty == -999:
         return HttpResponseBadRequest("qty requis")
-    user = get_or_create_guest_user(request)
     offer = get_object_or_404(Offer, id=offer_id, is_active=True)
-    order = get_or_create_order_for(request, user)
-    from .models import OrderItem
-    if qty <= 0:
-        OrderItem.objects.filter(order=order, offer=offer).delete()
-    else:
-        item, _ = OrderItem.objects.get_or_create(order=order, offer=offer, defaults={"quantity": 0})
-        item.quantity = qty
-        item.save()
-    request.session.modified = True
+    get_cart(request).set(offer.id, qty)
     return redirect(next_url)
 
+
 @csrf_exempt
 def cart_clear_redirect(request):
-    """GET fallback: /orders/cart/clear/?next=/offers/  -> vide le panier
-"""
+    """GET fallback: /orders/cart/clear/?next=/offers/  -> vide le panier"""
     next_url = request.GET.get("next") or "/offers/"
-    user = get_or_create_guest_user(request)
-    order = get_or_create_order_for(request, user)
-    from .models import OrderItem
-    OrderItem.objects.filter(order=order).delete()
-    request.session.modified = True
+    get_cart(request).clear()
     return redirect(next_url)
 
+
 @login_required(login_url="/login/")
 def checkout_redirect(request):
     """GET /orders/checkout/ — finalise la commande (mock)
@@ -123,41 +155,20 @@ def checkout_redirect(request):
     - Sinon génère les tickets et redirige vers /my/tickets/
     """
     from django.contrib import messages
-    from tickets.models import Ticket
-    from .api import SESSION_KEY
 
-    order_id = request.session.get(SESSION_KEY)
-    if not order_id:
-        messages.warning(request, "Votre panier est vide.")
-        return redirect("/offers/")
+    # Génération des tickets (mock) — 1 ticket par quantité
+    # QR rendus à la demande par /tickets/<id>/qr.png
     try:
-        order = Order.objects.get(id=order_id)
+        result = checkout_cart(get_cart(request), request.user)
     except Order.DoesNotExist:
         messages.error(request, "Commande introuvable.")
         return redirect("/offers/")
-
-    if order.user_id != request.user.id:
-        order.user = request.user
-        order.save()
-
-    if not order.items.exists():
+    if result is None:
         messages.warning(request, "Votre panier est vide.")
         return redirect("/offers/")
 
-    # Génération des tickets (mock) — 1 ticket par quantité
-    created = 0
-    for it in order.items.all():
-        for _ in range(it.quantity):
-            Ticket.create_from(user=request.user, order=order, offer=it.offer)
-            created += 1
-
-    # Nettoie le panier
-    try:
-        from .api import SESSION_KEY as SK
-        del request.session[SK]
-        request.session.modified = True
-    except Exception:
-        pass
-
-    messages.success(request, f"Paiement simulé réussi — {created} billet(s) généré(s).")
+    _, tickets = result
+    messages.success(
+        request, f"Paiement simulé réussi — {len(tickets)} billet(s) généré(s)."
+    )
     return redirect("/my/tickets/")
@@ -1,7 +1,13 @@
 from django.contrib import admin
+from orders.export import admin_action
 from .models import Ticket
 
+
 @admin.register(Ticket)
 class TicketAdmin(admin.ModelAdmin):
-    list_display = ("id","user","order","offer","ticket_key")
+    list_display = ("id", "user", "order", "offer", "ticket_key")
     readonly_fields = ("ticket_key",)
+    actions = [
+        admin_action("tickets", "csv", "Exporter les tickets (CSV)"),
+        admin_action("tickets", "jsonl", "Exporter les tickets (JSONL)"),
+    ]
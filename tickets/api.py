@@ -1,62 +1,240 @@
+from datetime import datetime, time, timedelta
 from rest_framework.decorators import api_view, permission_classes
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
+from django.http import StreamingHttpResponse
+from django.urls import reverse
 from django.utils import timezone
-from django.core.cache import cache
-from .models import Ticket, checksum
+from django.utils.dateparse import parse_date
+from django.conf import settings
+from .models import Ticket
+from . import bloom, keys, snapshot, verify_cache
+
+
+def _format_error(key):
+    """Contrôles de forme d'une clé, sans accès base.
+
+    Renvoie le message d'erreur ou None.
+    """
+    if not key:
+        return "Clé de ticket requise"
+    if len(key) > 200:  # Prevent DoS with huge keys
+        return "Clé trop longue"
+    if ":" not in key:
+        return "Format invalide"
+    return None
+
+
+def _signature_error(key):
+    """Signature (v2) ou checksum (clés héritées), sans lecture en base."""
+    if keys.is_valid(key):
+        return None
+    return "Signature invalide" if keys.is_signed(key) else "Checksum invalide"
+
 
 @api_view(["POST"])
 @permission_classes([IsAuthenticated])
 def verify_ticket(request):
-    key = request.data.get("ticket_key","").strip()
-    
+    key = request.data.get("ticket_key", "").strip()
+
     # Enhanced validation
-    if not key:
-        return Response({"ok": False, "error": "Clé de ticket requise"}, status=400)
-    
-    if len(key) > 200:  # Prevent DoS with huge keys
-        return Response({"ok": False, "error": "Clé trop longue"}, status=400)
-        
-    if ":" not in key:
-        return Response({"ok": False, "error": "Format invalide"}, status=400)
-    
-    raw, chk = key.rsplit(":", 1)
-    
-    # Check cache first to avoid database hit
-    cache_key = f"ticket_verify_{key[:20]}"  # Use first 20 chars as cache key
-    cached_result = cache.get(cache_key)
-    if cached_result:
-        return Response(cached_result)
-    
-    # Verify checksum
-    if checksum(raw) != chk:
-        error_result = {"ok": False, "error": "Checksum invalide"}
-        cache.set(cache_key, error_result, 60)  # Cache failed attempts for 1 minute
-        return Response(error_result, status=400)
-    
-    try:
-        # Optimized query with select_related
-        ticket = Ticket.objects.select_related('offer', 'user', 'order').get(
-            ticket_key=key, 
-            user=request.user
+    error = _format_error(key)
+    if error:
+        return Response({"ok": False, "error": error}, status=400)
+
+    error = _signature_error(key)
+    if error:
+        return Response({"ok": False, "error": error}, status=400)
+
+    # Clé jamais émise (filtre de Bloom) : réponse immédiate, sans cache ni base
+    if not bloom.might_exist(key):
+        return Response(
+            {"ok": False, "error": "Ticket inconnu ou non autorisé"}, status=404
         )
-        
-        # Update verification timestamp
-        ticket.verified_at = timezone.now()
-        ticket.save(update_fields=['verified_at'])
-        
-        success_result = {
-            "ok": True, 
-            "ticket_id": ticket.id, 
-            "offer": ticket.offer.name,
-            "verified_at": ticket.verified_at.isoformat()
-        }
-        
-        # Cache successful verification for 5 minutes
-        cache.set(cache_key, success_result, 300)
-        return Response(success_result)
-        
-    except Ticket.DoesNotExist:
+
+    # Cache par (utilisateur, clé complète) : absorbe les re-scans au portique
+    cached = verify_cache.get(request.user.id, key)
+    if cached:
+        payload, status = cached
+        return Response(payload, status=status)
+
+    # Une seule requête : UPDATE conditionnel, le premier scan gagne
+    admitted = Ticket.admit(key, request.user)
+    if admitted is None:
         error_result = {"ok": False, "error": "Ticket inconnu ou non autorisé"}
-        cache.set(cache_key, error_result, 60)
+        verify_cache.set(request.user.id, key, error_result, 404)
         return Response(error_result, status=404)
+
+    ticket, first_scan = admitted
+    success_result = {
+        "ok": True,
+        "ticket_id": ticket.id,
+        "offer": ticket.offer_name,
+        "verified_at": ticket.verified_at.isoformat(),  # horodatage du premier passage
+        "first_scan": first_scan,
+    }
+
+    # Un hit ultérieur est forcément un re-scan
+    verify_cache.set(request.user.id, key, {**success_result, "first_scan": False})
+    return Response(success_result)
+
+
+@api_view(["POST"])
+@permission_classes([IsAuthenticated])
+def verify_tickets_batch(request):
+    """POST /api/tickets/verify/batch/ {"ticket_keys": [...]}
+
+    Rejoue d'un coup les scans mis en tampon par un scanner : une seule requête
+    ``ticket_key IN (...)`` et un seul UPDATE de ``verified_at`` (tickets jamais
+    scannés uniquement) qui renvoie les horodatages enregistrés. Les résultats
+    suivent l'ordre des clés reçues.
+    """
+    raw_keys = request.data.get("ticket_keys")
+    if not isinstance(raw_keys, list) or not raw_keys:
+        return Response({"ok": False, "error": "Liste ticket_keys requise"}, status=400)
+    limit = getattr(settings, "TICKET_VERIFY_BATCH_MAX", 500)
+    if len(raw_keys) > limit:
+        return Response(
+            {"ok": False, "error": f"Maximum {limit} clés par lot"}, status=400
+        )
+
+    scanned = [str(k or "").strip() for k in raw_keys]
+    errors = {}
+    for key in set(scanned):
+        error = _format_error(key) or _signature_error(key)
+        if error:
+            errors[key] = error
+
+    candidates = [k for k in set(scanned) if k not in errors and bloom.might_exist(k)]
+    found = (
+        {
+            t.ticket_key: t
+            for t in Ticket.objects.select_related("offer").filter(
+                ticket_key__in=candidates, user=request.user
+            )
+        }
+        if candidates
+        else {}
+    )
+
+    now = timezone.now()
+    # horodatages relus dans l'UPDATE : le SELECT ci-dessus a pu être devancé
+    # par un autre scan
+    stamps = Ticket.admit_many([t.id for t in found.values()], now)
+    first_ids = {pk for pk, verified_at in stamps.items() if verified_at == now}
+    verify_cache.invalidate(
+        [(request.user.id, t.ticket_key) for t in found.values() if t.id in first_ids]
+    )
+
+    results, seen = [], set()
+    for key in scanned:
+        ticket = found.get(key)
+        if (
+            ticket is not None and ticket.id in stamps
+        ):  # absent : supprimé depuis le SELECT
+            # une clé répétée dans le lot n'est admise qu'une fois
+            first_scan = ticket.id in first_ids and key not in seen
+            seen.add(key)
+            results.append(
+                {
+                    "ticket_key": key,
+                    "ok": True,
+                    "ticket_id": ticket.id,
+                    "offer": ticket.offer.name,
+                    "verified_at": stamps[ticket.id].isoformat(),
+                    "first_scan": first_scan,
+                }
+            )
+        else:
+            results.append(
+                {
+                    "ticket_key": key,
+                    "ok": False,
+                    "error": errors.get(key, "Ticket inconnu ou non autorisé"),
+                }
+            )
+    return Response(
+        {
+            "ok": True,
+            "count": len(results),
+            "verified": sum(r["ok"] for r in results),
+            "results": results,
+        }
+    )
+
+
+@api_view(["GET"])
+@permission_classes([IsAuthenticated])
+def tickets_snapshot(request):
+    """GET /api/tickets/snapshot/?offer=<id>&from=<date>&to=<date>&since=<curseur>
+
+    Liste d'autorisation binaire (voir ``tickets.snapshot``) pour valider hors
+    ligne ; les admissions sont remontées ensuite via ``/api/tickets/verify/batch/``.
+    Le curseur de la réponse (en-tête et ``X-Snapshot-Cursor``) sert de ``since``
+    à la synchronisation suivante, qui ne renvoie que les changements.
+    """
+    tickets = Ticket.objects.filter(user=request.user)
+    params = request.query_params
+    try:
+        if params.get("offer"):
+            tickets = tickets.filter(offer_id=int(params["offer"]))
+        since = snapshot.decode_cursor(params["since"]) if params.get("since") else None
+    except (ValueError, OverflowError, OSError):
+        return Response({"ok": False, "error": "Paramètre invalide"}, status=400)
+    # bornes en datetime (jour local) pour rester sur tickets_created_at_idx
+    for param, lookup, shift in (
+        ("from", "created_at__gte", 0),
+        ("to", "created_at__lt", 1),
+    ):
+        if params.get(param):
+            try:
+                day = parse_date(params[param])
+            except ValueError:
+                day = None
+            if day is None:
+                return Response(
+                    {"ok": False, "error": f"Date invalide: {param}"}, status=400
+                )
+            bound = timezone.make_aware(
+                datetime.combine(day + timedelta(days=shift), time.min)
+            )
+            tickets = tickets.filter(**{lookup: bound})
+
+    cursor, allowed, revoked = snapshot.build(tickets, since)
+    response = StreamingHttpResponse(
+        snapshot.stream(cursor, allowed, revoked, delta=since is not None),
+        content_type=snapshot.CONTENT_TYPE,
+    )
+    response["Content-Length"] = snapshot.size(allowed, revoked)
+    response["X-Snapshot-Cursor"] = str(cursor)
+    response["Cache-Control"] = "private, no-store"
+    return response
+
+
+@api_view(["GET"])
+@permission_classes([IsAuthenticated])
+def my_tickets_api(request):
+    """GET /api/my/tickets/?cursor=<curseur> — portefeuille en JSON (mobile)."""
+    try:
+        tickets, next_cursor = Ticket.wallet_page(
+            request.user, request.query_params.get("cursor")
+        )
+    except ValueError:
+        return Response({"ok": False, "error": "Curseur invalide"}, status=400)
+    results = [
+        {
+            "id": t.id,
+            "offer": t.offer.name,
+            "order_id": t.order_id,
+            "ticket_key": t.ticket_key,
+            "created_at": t.created_at.isoformat(),
+            "verified_at": t.verified_at.isoformat() if t.verified_at else None,
+            "qr": {
+                "thumb": reverse("ticket_qr_thumb", args=[t.id]),
+                "png": reverse("ticket_qr_png", args=[t.id]),
+                "svg": reverse("ticket_qr_svg", args=[t.id]),
+            },
+        }
+        for t in tickets
+    ]
+    return Response({"ok": True, "results": results, "next_cursor": next_cursor})
@@ -1,6 +1,9 @@
 from django.urls import path
-from .api import verify_ticket
+from .api import verify_ticket, verify_tickets_batch, tickets_snapshot, my_tickets_api
 
 urlpatterns = [
     path("tickets/verify/", verify_ticket, name="verify_ticket"),
+    path("tickets/verify/batch/", verify_tickets_batch, name="verify_tickets_batch"),
+    path("tickets/snapshot/", tickets_snapshot, name="tickets_snapshot"),
+    path("my/tickets/", my_tickets_api, name="my_tickets_api"),
 ]
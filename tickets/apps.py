@@ -1,4 +1,9 @@
 from django.apps import AppConfig
+
+
 class TicketsConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "tickets"
+
+    def ready(self):
+        import tickets.signals  # noqa
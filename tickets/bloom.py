@@ -0,0 +1,132 @@
+"""Filtre de Bloom en mémoire (par processus) des clés de tickets émises.
+
+Seules les clés héritées (checksum SHA-256 tronqué, non signé) y figurent : une
+clé v2 est déjà authentifiée par sa signature HMAC, et aucune clé héritée n'est
+plus émise, de sorte que les filtres des différents workers ne divergent pas.
+Un « non » du filtre est définitif : la vérification répond « ticket inconnu »
+sans requête. Un « peut-être » retombe sur la base.
+
+Le filtre est construit au premier usage par un parcours en flux de
+``values_list('ticket_key')``, complété à chaque ticket enregistré dans le
+processus, et reconstruit quand ``manage.py rebuild_ticket_bloom`` incrémente la
+génération ``core.Generation`` (ligne en base, vue par tous les processus et
+machines ; relue au plus toutes les ``TICKET_BLOOM_CHECK_INTERVAL`` secondes).
+"""
+
+import hashlib
+import logging
+import math
+import threading
+import time
+from django.conf import settings
+from . import keys
+
+logger = logging.getLogger("etickets.business")
+
+GENERATION_KEY = "ticket_bloom_generation"
+
+
+class BloomFilter:
+    def __init__(self, capacity: int, fp_rate: float = 0.001):
+        capacity = max(capacity, 1)
+        self.size = max(8, int(-capacity * math.log(fp_rate) / (math.log(2) ** 2)))
+        self.hashes = max(1, round(self.size / capacity * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+        self.count = 0
+
+    def _positions(self, item: str):
+        digest = hashlib.blake2b(item.encode(), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], "little")
+        h2 = int.from_bytes(digest[8:], "little") | 1
+        return ((h1 + i * h2) % self.size for i in range(self.hashes))
+
+    def add(self, item: str):
+        for pos in self._positions(item):
+            self.bits[pos >> 3] |= 1 << (pos & 7)
+        self.count += 1
+
+    def __contains__(self, item: str) -> bool:
+        return all(
+            self.bits[pos >> 3] & (1 << (pos & 7)) for pos in self._positions(item)
+        )
+
+    def expected_fp_rate(self) -> float:
+        return (1 - math.exp(-self.hashes * self.count / self.size)) ** self.hashes
+
+
+_lock = threading.Lock()
+_filter = None
+_generation = None
+_checked_at = 0.0
+
+
+def _legacy_keys():
+    from .models import Ticket
+
+    return Ticket.objects.exclude(ticket_key__startswith=keys.VERSION + ".")
+
+
+def build() -> BloomFilter:
+    """Construit un filtre à partir de la base, en flux (mémoire bornée)."""
+    qs = _legacy_keys()
+    bloom = BloomFilter(
+        capacity=int(qs.count() * 1.25) + 1000,  # marge pour les ajouts ultérieurs
+        fp_rate=getattr(settings, "TICKET_BLOOM_FP_RATE", 0.001),
+    )
+    for key in qs.values_list("ticket_key", flat=True).iterator(chunk_size=5000):
+        bloom.add(key)
+    return bloom
+
+
+def _current_generation():
+    from core.models import Generation
+
+    try:
+        return Generation.current(GENERATION_KEY)
+    except Exception as exc:  # base indisponible : on garde le filtre courant
+        logger.warning(f"ticket bloom generation read failed: {exc}")
+        return _generation
+
+
+def get_filter() -> BloomFilter:
+    """Filtre du processus, (re)construit au besoin."""
+    global _filter, _generation, _checked_at
+    now = time.monotonic()
+    if _filter is not None and now - _checked_at < getattr(
+        settings, "TICKET_BLOOM_CHECK_INTERVAL", 30
+    ):
+        return _filter
+    with _lock:
+        generation = _current_generation()
+        if _filter is None or generation != _generation:
+            _filter = build()
+            _generation = generation
+            logger.info(
+                f"ticket bloom filter built: {_filter.count} keys, {_filter.size} bits"
+            )
+        _checked_at = now
+        return _filter
+
+
+def might_exist(key: str) -> bool:
+    """``False`` si la clé n'a certainement jamais été émise."""
+    if not getattr(settings, "TICKET_BLOOM_ENABLED", True) or keys.is_signed(key):
+        return True
+    return key in get_filter()
+
+
+def add(key: str):
+    """Ajoute une clé émise dans ce processus.
+
+    Sans effet si le filtre n'existe pas encore.
+    """
+    if _filter is not None and not keys.is_signed(key):
+        with _lock:
+            _filter.add(key)
+
+
+def bump_generation():
+    """Demande à tous les processus de reconstruire leur filtre."""
+    from core.models import Generation
+
+    Generation.bump(GENERATION_KEY)
@@ -0,0 +1,67 @@
+"""Format de clé de ticket signé (v2).
+
+    v2.<order_id>.<serial>.<offer_id>.<purchase_key>:<hmac>
+
+La signature HMAC-SHA256 (clé serveur ``TICKET_SIGNING_KEY``) couvre tous les
+champs en clair : une clé forgée ou abîmée est rejetée sans lecture en base.
+Le couple (commande, série) identifie le ticket : il est connu avant l'INSERT
+groupé, contrairement à l'id.
+
+Les anciennes clés ``<base>-<serial>:<sha256[:8]>`` restent acceptées.
+"""
+
+import hashlib
+from django.conf import settings
+from django.utils.crypto import constant_time_compare, salted_hmac
+
+VERSION = "v2"
+SIG_LENGTH = 32  # hex, 128 bits
+
+
+def checksum(s: str) -> str:
+    """Somme de contrôle non signée des clés héritées."""
+    return hashlib.sha256(s.encode()).hexdigest()[:8]
+
+
+def _signature(raw: str) -> str:
+    return salted_hmac(
+        "tickets.keys", raw, secret=settings.TICKET_SIGNING_KEY, algorithm="sha256"
+    ).hexdigest()[:SIG_LENGTH]
+
+
+def sign(order_id: int, serial: int, offer_id: int, purchase_key: str) -> str:
+    raw = f"{VERSION}.{order_id}.{serial}.{offer_id}.{purchase_key}"
+    return f"{raw}:{_signature(raw)}"
+
+
+def parse(key: str):
+    """Renvoie les champs d'une clé v2 authentique, ``None`` sinon."""
+    raw, _, sig = key.rpartition(":")
+    parts = raw.split(".")
+    if (
+        len(parts) != 5
+        or parts[0] != VERSION
+        or not constant_time_compare(_signature(raw), sig)
+    ):
+        return None
+    _, order_id, serial, offer_id, purchase_key = parts
+    if not (order_id.isdigit() and serial.isdigit() and offer_id.isdigit()):
+        return None
+    return {
+        "order_id": int(order_id),
+        "serial": int(serial),
+        "offer_id": int(offer_id),
+        "purchase_key": purchase_key,
+    }
+
+
+def is_signed(key: str) -> bool:
+    return key.startswith(VERSION + ".")
+
+
+def is_valid(key: str) -> bool:
+    """Contrôle hors base : signature pour v2, checksum pour les clés héritées."""
+    if is_signed(key):
+        return parse(key) is not None
+    raw, _, chk = key.rpartition(":")
+    return bool(raw) and checksum(raw) == chk
@@ -0,0 +1,46 @@
+import secrets
+from django.core.management.base import BaseCommand
+from tickets import bloom
+from tickets.keys import checksum
+
+
+class Command(BaseCommand):
+    help = (
+        "Reconstruit le filtre de Bloom des clés de tickets "
+        "et mesure son taux de faux positifs"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--probes",
+            type=int,
+            default=10000,
+            help="Clés aléatoires (jamais émises) testées pour les faux positifs",
+        )
+
+    def handle(self, *args, **opts):
+        bf = bloom.build()
+        probes = max(opts["probes"], 0)
+        false_positives = 0
+        for _ in range(probes):
+            raw = secrets.token_hex(16)
+            if f"{raw}:{checksum(raw)}" in bf:
+                false_positives += 1
+        bloom.bump_generation()
+
+        self.stdout.write(
+            f"Clés: {bf.count}  bits: {bf.size} ({len(bf.bits) // 1024} Kio)  "
+            f"hachages: {bf.hashes}"
+        )
+        self.stdout.write(f"Faux positifs attendus: {bf.expected_fp_rate():.4%}")
+        if probes:
+            self.stdout.write(
+                f"Faux positifs mesurés: {false_positives}/{probes} "
+                f"({false_positives / probes:.4%})"
+            )
+        self.stdout.write(
+            self.style.SUCCESS(
+                "Génération incrémentée : chaque processus web reconstruira "
+                "son filtre au prochain contrôle"
+            )
+        )
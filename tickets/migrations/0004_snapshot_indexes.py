@@ -0,0 +1,21 @@
+from django.db import migrations, models
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ('tickets', '0003_add_timestamp_fields'),
+    ]
+
+    operations = [
+        migrations.AlterModelOptions(
+            name='ticket',
+            options={'ordering': ['-created_at']},
+        ),
+        migrations.AddIndex(
+            model_name='ticket',
+            index=models.Index(fields=['created_at'], name='tickets_created_at_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='ticket',
+            index=models.Index(fields=['verified_at'], name='tickets_verified_at_idx'),
+        ),
+    ]
@@ -1,55 +1,178 @@
-from django.db import models
+from datetime import datetime, timezone as dt_timezone
+from django.db import models, transaction, connection, IntegrityError
+from django.db.models import Q
+from django.utils import timezone
 from django.contrib.auth.models import User
 from offers.models import Offer
 from orders.models import Order
-import hashlib, qrcode
-from django.conf import settings
-from pathlib import Path
+from . import keys
+from .keys import checksum  # noqa: F401 (clés héritées)
+
+# Nouvelles tentatives d'allocation en cas de conflit sur l'index unique ticket_key
+KEY_ATTEMPTS = 5
+# Tickets par page du portefeuille (/my/tickets/ et /api/my/tickets/)
+WALLET_PAGE_SIZE = 12
+
+
+def encode_wallet_cursor(ticket) -> str:
+    return f"{int(ticket.created_at.timestamp() * 1_000_000)}.{ticket.id}"
+
+
+def decode_wallet_cursor(cursor: str):
+    """``"<µs>.<id>"`` vers ``(created_at, id)`` ; ``ValueError`` si invalide."""
+    micros, pk = (int(part) for part in cursor.split(".", 1))
+    if micros < 0 or pk < 0:
+        raise ValueError(cursor)
+    return datetime.fromtimestamp(micros / 1_000_000, tz=dt_timezone.utc), pk
 
-def checksum(s: str) -> str:
-    return hashlib.sha256(s.encode()).hexdigest()[:8]
 
 class Ticket(models.Model):
     user = models.ForeignKey(User, on_delete=models.CASCADE)
     order = models.ForeignKey(Order, on_delete=models.CASCADE)
     offer = models.ForeignKey(Offer, on_delete=models.PROTECT)
     ticket_key = models.CharField(
-        max_length=128, 
-        unique=True, 
+        max_length=128,
+        unique=True,
         editable=False,
         db_index=True,  # Database index for fast lookups
-        help_text="Unique ticket key with checksum for verification"
+        help_text="Unique ticket key with checksum for verification",
     )
+    # Héritage : plus renseigné, le QR est rendu à la demande
+    # (``tickets.qr``, /tickets/<id>/qr.png)
     qr_image = models.ImageField(upload_to="qr/", blank=True, null=True)
     created_at = models.DateTimeField(auto_now_add=True)  # Track creation time
     verified_at = models.DateTimeField(null=True, blank=True)  # Track verification
 
     class Meta:
         indexes = [
-            models.Index(fields=['user', 'order'], name='tickets_user_order_idx'),
-            models.Index(fields=['order', 'offer'], name='tickets_order_offer_idx'),
-            models.Index(fields=['created_at'], name='tickets_created_at_idx'),
+            models.Index(fields=["user", "order"], name="tickets_user_order_idx"),
+            models.Index(fields=["order", "offer"], name="tickets_order_offer_idx"),
+            models.Index(fields=["created_at"], name="tickets_created_at_idx"),
+            models.Index(
+                fields=["verified_at"], name="tickets_verified_at_idx"
+            ),  # deltas des instantanés
         ]
-        ordering = ['-created_at']
+        ordering = ["-created_at"]
+
+    @classmethod
+    def wallet_page(cls, user, cursor=None, size=WALLET_PAGE_SIZE):
+        """Tickets de ``user``, plus récents d'abord, paginés par curseur sur
+        ``(created_at, id)`` (index ``tickets_created_at_idx``).
+
+        Renvoie ``(tickets, next_cursor)`` ; ``ValueError`` si le curseur est invalide.
+        """
+        qs = (
+            cls.objects.filter(user=user)
+            .select_related("offer")
+            .order_by("-created_at", "-id")
+        )
+        if cursor:
+            created_at, pk = decode_wallet_cursor(cursor)
+            qs = qs.filter(
+                Q(created_at__lt=created_at) | Q(created_at=created_at, id__lt=pk)
+            )
+        page = list(qs[: size + 1])
+        if len(page) > size:
+            return page[:size], encode_wallet_cursor(page[size - 1])
+        return page, None
 
     @classmethod
     def create_from(cls, user: User, order: Order, offer: Offer):
-        base = user.profile.user_secret_key + order.purchase_key
-        serial = cls.objects.filter(order=order).count() + 1
-        raw = f"{base}-{serial}"
-        key = f"{raw}:{checksum(raw)}"
-        while cls.objects.filter(ticket_key=key).exists():
-            serial += 1
-            raw = f"{base}-{serial}"
-            key = f"{raw}:{checksum(raw)}"
-
-        t = cls.objects.create(user=user, order=order, offer=offer, ticket_key=key)
-        img = qrcode.make(key)
-        media = Path(settings.MEDIA_ROOT)
-        media.mkdir(parents=True, exist_ok=True)
-        path = media / f"qr/TCK-{t.id}.png"
-        path.parent.mkdir(parents=True, exist_ok=True)
-        img.save(path)
-        t.qr_image.name = str(path.relative_to(media))
-        t.save()
+        for _ in range(KEY_ATTEMPTS):
+            key = keys.sign(
+                order.id, order.reserve_serials(1), offer.id, order.purchase_key
+            )
+            try:
+                with transaction.atomic():
+                    t = cls.objects.create(
+                        user=user, order=order, offer=offer, ticket_key=key
+                    )
+                break
+            except IntegrityError:
+                continue  # série déjà prise : on en réserve une autre
+        else:
+            raise IntegrityError("Impossible d'allouer une clé de ticket")
         return t
+
+    @classmethod
+    def issue_for_order(cls, order: Order):
+        """Émet tous les tickets d'une commande (1 par quantité) en un seul INSERT.
+
+        Les numéros de série sont réservés d'un bloc par ``Order.reserve_serials`` ;
+        le QR est rendu à la demande (voir ``tickets.qr``).
+        """
+        lines = list(order.items.values_list("offer_id", "quantity"))
+        offer_ids = [offer_id for offer_id, qty in lines for _ in range(qty)]
+        if not offer_ids:
+            return []
+
+        for _ in range(KEY_ATTEMPTS):
+            start = order.reserve_serials(len(offer_ids))
+            tickets = [
+                cls(
+                    user_id=order.user_id,
+                    order=order,
+                    offer_id=offer_id,
+                    ticket_key=keys.sign(
+                        order.id, start + i, offer_id, order.purchase_key
+                    ),
+                )
+                for i, offer_id in enumerate(offer_ids)
+            ]
+            try:
+                with transaction.atomic():
+                    return cls.objects.bulk_create(tickets)
+            except IntegrityError:
+                continue  # bloc en conflit sur ticket_key : nouveau bloc
+        raise IntegrityError("Impossible d'allouer les clés de tickets")
+
+    @classmethod
+    def admit(cls, key: str, user: User):
+        """Enregistre un passage au contrôle en une seule requête.
+
+        Le premier scan gagne.
+
+        ``UPDATE ... SET verified_at = COALESCE(verified_at, now) ... RETURNING`` :
+        deux tourniquets concurrents obtiennent le même horodatage d'origine.
+        Renvoie ``(ticket, first_scan)`` avec ``ticket.offer_name`` renseigné,
+        ou ``None`` si le ticket est inconnu ou n'appartient pas à ``user``.
+        """
+        qn = connection.ops.quote_name
+        table, verified = qn(cls._meta.db_table), qn("verified_at")
+        now = timezone.now()
+        rows = list(
+            cls.objects.raw(
+                f"UPDATE {table} SET {verified} = COALESCE({verified}, %s) "
+                f"WHERE {qn('ticket_key')} = %s AND {qn('user_id')} = %s "
+                f"RETURNING {qn('id')}, {qn('offer_id')}, {verified}, "
+                f"(SELECT o.{qn('name')} FROM {qn(Offer._meta.db_table)} o "
+                f"WHERE o.{qn('id')} = {table}.{qn('offer_id')}) AS offer_name",
+                [connection.ops.adapt_datetimefield_value(now), key, user.id],
+            )
+        )
+        if not rows:
+            return None
+        return rows[0], rows[0].verified_at == now
+
+    @classmethod
+    def admit_many(cls, ids, when=None):
+        """Variante groupée de ``admit`` : un seul UPDATE, seuls les tickets jamais
+        scannés prennent l'horodatage ``when``.
+
+        Renvoie ``{id: verified_at}`` tel qu'enregistré en base : un ticket admis
+        entre-temps par un autre tourniquet garde son horodatage d'origine
+        (``verified_at != when``).
+        """
+        ids = list(ids)
+        if not ids:
+            return {}
+        qn = connection.ops.quote_name
+        table, verified = qn(cls._meta.db_table), qn("verified_at")
+        when = when or timezone.now()
+        rows = cls.objects.raw(
+            f"UPDATE {table} SET {verified} = COALESCE({verified}, %s) "
+            f"WHERE {qn('id')} IN ({', '.join(['%s'] * len(ids))}) "
+            f"RETURNING {qn('id')}, {verified}",
+            [connection.ops.adapt_datetimefield_value(when), *ids],
+        )
+        return {t.id: t.verified_at for t in rows}
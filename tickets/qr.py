@@ -0,0 +1,34 @@
+"""Rendu des QR codes à la demande.
+
+Les octets encodés sont gardés dans un LRU borné propre au processus : un QR
+ne dépend que de ``ticket_key``, il ne change jamais et n'a pas besoin d'être
+écrit sur disque.
+"""
+
+import hashlib
+from functools import lru_cache
+from io import BytesIO
+import qrcode
+import qrcode.image.svg
+from django.conf import settings
+
+CONTENT_TYPES = {"png": "image/png", "svg": "image/svg+xml", "thumb": "image/png"}
+
+
+def etag_for(key: str, fmt: str) -> str:
+    """ETag fort calculé sans rendre l'image (permet un 304 immédiat)."""
+    return '"%s"' % hashlib.sha256(f"{fmt}|{key}".encode()).hexdigest()[:32]
+
+
+@lru_cache(maxsize=getattr(settings, "QR_CACHE_SIZE", 1024))
+def render(key: str, fmt: str = "png") -> bytes:
+    buf = BytesIO()
+    if fmt == "svg":
+        qrcode.make(key, image_factory=qrcode.image.svg.SvgPathImage).save(buf)
+    elif fmt == "thumb":
+        qrcode.make(key, box_size=2, border=2).save(
+            buf
+        )  # vignette du portefeuille (~100 px)
+    else:
+        qrcode.make(key).save(buf)
+    return buf.getvalue()
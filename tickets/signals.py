@@ -0,0 +1,16 @@
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+from .models import Ticket
+from . import bloom, verify_cache
+
+
+@receiver(post_save, sender=Ticket)
+@receiver(post_delete, sender=Ticket)
+def invalidate_verification(sender, instance, **kwargs):
+    verify_cache.invalidate([(instance.user_id, instance.ticket_key)])
+
+
+@receiver(post_save, sender=Ticket)
+def remember_issued_key(sender, instance, created, **kwargs):
+    if created:
+        bloom.add(instance.ticket_key)
@@ -0,0 +1,116 @@
+"""Liste d'autorisation binaire pour les scanners hors ligne.
+
+Format (big-endian) ::
+
+    en-tête   4s  magic b"ETSN"
+              B   version (1)
+              B   drapeaux (bit 0 : delta depuis ``since``)
+              B   largeur des empreintes (16)
+              x
+              Q   curseur à renvoyer en ``?since=`` (µs depuis l'epoch)
+              I   nombre d'empreintes autorisées
+              I   nombre d'empreintes révoquées
+    autorisés N × 16 octets, triés
+    révoqués  M × 16 octets, triés
+
+Une empreinte est ``sha256(ticket_key)[:16]`` : le scanner hache la clé lue puis
+fait une recherche dichotomique. « Révoqué » signifie déjà admis au contrôle
+(``verified_at`` renseigné) ; un delta peut répéter des empreintes déjà reçues
+(recouvrement de ``TICKET_SNAPSHOT_OVERLAP`` secondes contre les transactions
+validées en retard), leur application est idempotente. Les tickets supprimés
+n'apparaissent pas dans les deltas : une synchronisation complète les purge.
+"""
+
+import hashlib
+import struct
+from datetime import datetime, timedelta, timezone as dt_timezone
+from django.conf import settings
+from django.utils import timezone
+
+MAGIC = b"ETSN"
+VERSION = 1
+DIGEST_SIZE = 16
+FLAG_DELTA = 0x01
+HEADER = struct.Struct(">4sBBBxQII")
+CONTENT_TYPE = "application/vnd.etickets.snapshot"
+
+
+def digest(key: str) -> bytes:
+    return hashlib.sha256(key.encode()).digest()[:DIGEST_SIZE]
+
+
+def encode_cursor(moment: datetime) -> int:
+    return int(moment.timestamp() * 1_000_000)
+
+
+def decode_cursor(value) -> datetime:
+    """Curseur ``?since=`` vers datetime ; ``ValueError`` si invalide."""
+    micros = int(value)
+    if micros < 0:
+        raise ValueError(value)
+    return datetime.fromtimestamp(micros / 1_000_000, tz=dt_timezone.utc)
+
+
+def _digests(qs):
+    return sorted(
+        {
+            digest(k)
+            for k in qs.values_list("ticket_key", flat=True).iterator(chunk_size=5000)
+        }
+    )
+
+
+def build(tickets, since=None):
+    """Calcule (curseur, autorisés, révoqués) pour le queryset ``tickets``.
+
+    Complet : tickets non scannés / scannés. Delta : tickets créés et non scannés
+    depuis ``since`` (index ``tickets_created_at_idx``) / scannés depuis ``since``
+    (index ``tickets_verified_at_idx``).
+    """
+    cursor = encode_cursor(timezone.now())
+    allowed = tickets.filter(verified_at__isnull=True)
+    revoked = tickets.filter(verified_at__isnull=False)
+    if since is not None:
+        since = since - timedelta(
+            seconds=getattr(settings, "TICKET_SNAPSHOT_OVERLAP", 60)
+        )
+        allowed = allowed.filter(created_at__gte=since)
+        revoked = revoked.filter(verified_at__gte=since)
+    return cursor, _digests(allowed), _digests(revoked)
+
+
+def stream(cursor, allowed, revoked, delta=False, chunk=4096):
+    """Génère l'en-tête puis les deux sections par blocs de ``chunk`` empreintes."""
+    yield HEADER.pack(
+        MAGIC,
+        VERSION,
+        FLAG_DELTA if delta else 0,
+        DIGEST_SIZE,
+        cursor,
+        len(allowed),
+        len(revoked),
+    )
+    for section in (allowed, revoked):
+        for i in range(0, len(section), chunk):
+            yield b"".join(section[i : i + chunk])
+
+
+def size(allowed, revoked) -> int:
+    return HEADER.size + DIGEST_SIZE * (len(allowed) + len(revoked))
+
+
+def parse(data: bytes):
+    """Décode un instantané (outil côté client et tests)."""
+    magic, version, flags, width, cursor, n_allowed, n_revoked = HEADER.unpack_from(
+        data
+    )
+    if magic != MAGIC or version != VERSION:
+        raise ValueError("Instantané invalide")
+    body = data[HEADER.size :]
+    chunks = [body[i : i + width] for i in range(0, len(body), width)]
+    return {
+        "delta": bool(flags & FLAG_DELTA),
+        "cursor": cursor,
+        "allowed": chunks[:n_allowed],
+        "revoked": chunks[n_allowed : n_allowed + n_revoked],
+    }
@@ -0,0 +1,97 @@
+from io import StringIO
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from core.models import Generation
+from offers.models import Offer
+from orders.models import Order
+from tickets.models import Ticket, checksum
+from tickets import bloom, keys
+
+
+def legacy_key(raw):
+    return f"{raw}:{checksum(raw)}"
+
+
+class BloomFilterTests(TestCase):
+    def test_no_false_negatives(self):
+        bf = bloom.BloomFilter(capacity=1000, fp_rate=0.01)
+        items = [legacy_key(f"k{i}") for i in range(1000)]
+        for item in items:
+            bf.add(item)
+        self.assertTrue(all(item in bf for item in items))
+        self.assertLess(bf.expected_fp_rate(), 0.02)
+        misses = sum(legacy_key(f"x{i}") in bf for i in range(2000))
+        self.assertLess(misses, 100)
+
+
+class BloomVerifyTests(TestCase):
+    def setUp(self):
+        bloom._filter = None
+        self.user = User.objects.create_user("scanner", password="Password123!")
+        offer = Offer.objects.create(
+            name="Solo", offer_type="solo", price_eur=50, is_active=True
+        )
+        self.order = Order.objects.create(user=self.user)
+        self.ticket = Ticket.objects.create(
+            user=self.user,
+            order=self.order,
+            offer=offer,
+            ticket_key=legacy_key("legacy-1"),
+        )
+        self.offer = offer
+        self.client.login(username="scanner", password="Password123!")
+
+    def tearDown(self):
+        bloom._filter = None
+
+    def verify(self, key):
+        return self.client.post("/api/tickets/verify/", {"ticket_key": key})
+
+    def test_unknown_legacy_key_rejected_without_query(self):
+        self.assertEqual(
+            self.verify(self.ticket.ticket_key).status_code, 200
+        )  # construit le filtre
+        with self.assertNumQueries(2):  # session + utilisateur seulement
+            r = self.verify(legacy_key("never-issued"))
+        self.assertEqual(r.status_code, 404)
+        self.assertEqual(r.json()["error"], "Ticket inconnu ou non autorisé")
+
+    def test_key_saved_after_build_is_known(self):
+        bloom.get_filter()
+        t = Ticket.objects.create(
+            user=self.user,
+            order=self.order,
+            offer=self.offer,
+            ticket_key=legacy_key("legacy-2"),
+        )
+        self.assertTrue(bloom.might_exist(t.ticket_key))
+        self.assertEqual(self.verify(t.ticket_key).status_code, 200)
+
+    def test_signed_keys_bypass_filter(self):
+        bloom.get_filter()
+        self.assertTrue(bloom.might_exist(keys.sign(1, 1, 1, "ab" * 16)))
+
+    def test_rebuild_command_reports_false_positive_rate(self):
+        out = StringIO()
+        call_command("rebuild_ticket_bloom", probes=500, stdout=out)
+        self.assertIn("Clés: 1", out.getvalue())
+        self.assertIn("Faux positifs mesurés", out.getvalue())
+
+    @override_settings(TICKET_BLOOM_CHECK_INTERVAL=0)
+    def test_rebuild_from_another_process_is_seen(self):
+        bloom.get_filter()
+        # clé importée hors de ce processus (aucun signal reçu ici)
+        Ticket.objects.bulk_create(
+            [
+                Ticket(
+                    user=self.user,
+                    order=self.order,
+                    offer=self.offer,
+                    ticket_key=legacy_key("imported"),
+                )
+            ]
+        )
+        self.assertFalse(bloom.might_exist(legacy_key("imported")))
+        Generation.bump(bloom.GENERATION_KEY)  # rebuild_ticket_bloom lancé ailleurs
+        self.assertTrue(bloom.might_exist(legacy_key("imported")))
@@ -0,0 +1,66 @@
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.contrib.auth.models import User
+from offers.models import Offer
+from orders.models import Order, OrderItem
+from tickets.models import Ticket
+from tickets import keys
+
+
+class SignedKeyTests(SimpleTestCase):
+    def test_sign_and_parse_roundtrip(self):
+        key = keys.sign(12, 3, 7, "ab" * 16)
+        self.assertTrue(key.startswith("v2.12.3.7."))
+        self.assertLessEqual(len(key), 128)
+        self.assertEqual(
+            keys.parse(key),
+            {"order_id": 12, "serial": 3, "offer_id": 7, "purchase_key": "ab" * 16},
+        )
+        self.assertTrue(keys.is_valid(key))
+
+    def test_tampered_or_garbled_keys_rejected(self):
+        key = keys.sign(12, 3, 7, "ab" * 16)
+        raw, sig = key.rsplit(":", 1)
+        self.assertIsNone(keys.parse(raw.replace(".3.", ".4.") + ":" + sig))
+        self.assertIsNone(keys.parse(raw + ":" + "0" * len(sig)))
+        self.assertIsNone(keys.parse("v2.garbage:deadbeef"))
+        self.assertFalse(keys.is_valid(key[:-1]))
+
+    def test_signature_depends_on_server_secret(self):
+        key = keys.sign(1, 1, 1, "cd" * 16)
+        with override_settings(TICKET_SIGNING_KEY="another-secret"):
+            self.assertFalse(keys.is_valid(key))
+
+    def test_legacy_checksum_keys_still_valid(self):
+        raw = "user-1:order-1"
+        self.assertTrue(keys.is_valid(f"{raw}:{keys.checksum(raw)}"))
+        self.assertFalse(keys.is_valid(f"{raw}:deadbeef"))
+
+
+class SignedKeyVerifyTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user("gate", password="Password123!")
+        offer = Offer.objects.create(
+            name="Solo", offer_type="solo", price_eur=50, is_active=True
+        )
+        self.order = Order.objects.create(user=self.user)
+        OrderItem.objects.create(order=self.order, offer=offer, quantity=1)
+        self.ticket = Ticket.issue_for_order(self.order)[0]
+        self.client.login(username="gate", password="Password123!")
+
+    def test_issued_tickets_use_signed_keys(self):
+        fields = keys.parse(self.ticket.ticket_key)
+        self.assertEqual(fields["order_id"], self.order.id)
+        self.assertEqual(fields["purchase_key"], self.order.purchase_key)
+        r = self.client.post(
+            "/api/tickets/verify/", {"ticket_key": self.ticket.ticket_key}
+        )
+        self.assertEqual(r.status_code, 200)
+        self.assertTrue(r.json()["ok"])
+
+    def test_forged_key_rejected_without_ticket_lookup(self):
+        key = keys.sign(self.order.id, 99, 1, self.order.purchase_key)
+        forged = key[:-1] + ("0" if key[-1] != "0" else "1")
+        with self.assertNumQueries(2):  # session + utilisateur, aucune requête tickets
+            r = self.client.post("/api/tickets/verify/", {"ticket_key": forged})
+        self.assertEqual(r.status_code, 400)
+        self.assertIn("Signature", r.json()["error"])
@@ -0,0 +1,53 @@
+from django.test import TestCase
+from django.contrib.auth.models import User
+from offers.models import Offer
+from orders.models import Order, OrderItem
+from tickets.models import Ticket
+from tickets import qr
+
+
+class TicketQrEndpointTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user("qr", password="Password123!")
+        self.other = User.objects.create_user("other", password="Password123!")
+        offer = Offer.objects.create(
+            name="Solo", offer_type="solo", price_eur=50, is_active=True
+        )
+        order = Order.objects.create(user=self.user)
+        OrderItem.objects.create(order=order, offer=offer, quantity=1)
+        self.ticket = Ticket.issue_for_order(order)[0]
+        qr.render.cache_clear()
+
+    def test_requires_login_and_ownership(self):
+        r = self.client.get(f"/tickets/{self.ticket.id}/qr.png")
+        self.assertEqual(r.status_code, 302)
+        self.client.login(username="other", password="Password123!")
+        r = self.client.get(f"/tickets/{self.ticket.id}/qr.png")
+        self.assertEqual(r.status_code, 404)
+
+    def test_png_and_svg_rendered_on_demand(self):
+        self.client.login(username="qr", password="Password123!")
+        r = self.client.get(f"/tickets/{self.ticket.id}/qr.png")
+        self.assertEqual(r.status_code, 200)
+        self.assertEqual(r["Content-Type"], "image/png")
+        self.assertTrue(r.content.startswith(b"\x89PNG"))
+        self.assertIn("immutable", r["Cache-Control"])
+        self.assertEqual(r["ETag"], qr.etag_for(self.ticket.ticket_key, "png"))
+
+        r = self.client.get(f"/tickets/{self.ticket.id}/qr.svg")
+        self.assertEqual(r.status_code, 200)
+        self.assertEqual(r["Content-Type"], "image/svg+xml")
+        self.assertIn(b"<svg", r.content)
+        self.assertNotEqual(r["ETag"], qr.etag_for(self.ticket.ticket_key, "png"))
+
+    def test_if_none_match_returns_304_and_lru_is_reused(self):
+        self.client.login(username="qr", password="Password123!")
+        r = self.client.get(f"/tickets/{self.ticket.id}/qr.png")
+        etag = r["ETag"]
+        r = self.client.get(
+            f"/tickets/{self.ticket.id}/qr.png", HTTP_IF_NONE_MATCH=etag
+        )
+        self.assertEqual(r.status_code, 304)
+        self.assertEqual(r["ETag"], etag)
+        self.client.get(f"/tickets/{self.ticket.id}/qr.png")
+        self.assertEqual(qr.render.cache_info().hits, 1)
@@ -0,0 +1,97 @@
+from datetime import timedelta
+from django.contrib.auth.models import User
+from django.test import TestCase
+from django.utils import timezone
+from offers.models import Offer
+from orders.models import Order, OrderItem
+from tickets.models import Ticket
+from tickets import snapshot
+
+
+class SnapshotTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user("scanner", password="Password123!")
+        self.solo = Offer.objects.create(
+            name="Solo", offer_type="solo", price_eur=50, is_active=True
+        )
+        self.duo = Offer.objects.create(
+            name="Duo", offer_type="duo", price_eur=90, is_active=True
+        )
+        order = Order.objects.create(user=self.user)
+        OrderItem.objects.create(order=order, offer=self.solo, quantity=2)
+        OrderItem.objects.create(order=order, offer=self.duo, quantity=1)
+        self.tickets = Ticket.issue_for_order(order)
+        self.url = "/api/tickets/snapshot/"
+        self.client.login(username="scanner", password="Password123!")
+
+    def fetch(self, **params):
+        r = self.client.get(self.url, params)
+        self.assertEqual(r.status_code, 200)
+        self.assertEqual(r["Content-Type"], snapshot.CONTENT_TYPE)
+        return snapshot.parse(b"".join(r.streaming_content)), r
+
+    def test_requires_auth(self):
+        self.client.logout()
+        self.assertEqual(self.client.get(self.url).status_code, 403)
+
+    def test_full_snapshot_sorted_digests(self):
+        Ticket.admit(self.tickets[0].ticket_key, self.user)
+        data, r = self.fetch()
+        self.assertFalse(data["delta"])
+        self.assertEqual(r["X-Snapshot-Cursor"], str(data["cursor"]))
+        self.assertEqual(
+            data["allowed"],
+            sorted(snapshot.digest(t.ticket_key) for t in self.tickets[1:]),
+        )
+        self.assertEqual(data["revoked"], [snapshot.digest(self.tickets[0].ticket_key)])
+        self.assertEqual(
+            int(r["Content-Length"]), snapshot.HEADER.size + 3 * snapshot.DIGEST_SIZE
+        )
+
+    def test_offer_filter(self):
+        data, _ = self.fetch(offer=self.duo.id)
+        self.assertEqual(
+            data["allowed"],
+            [
+                snapshot.digest(t.ticket_key)
+                for t in self.tickets
+                if t.offer_id == self.duo.id
+            ],
+        )
+
+    def test_date_range(self):
+        today = timezone.localdate()
+        data, _ = self.fetch(**{"from": today.isoformat(), "to": today.isoformat()})
+        self.assertEqual(len(data["allowed"]), 3)
+        data, _ = self.fetch(**{"from": (today + timedelta(days=1)).isoformat()})
+        self.assertEqual(data["allowed"], [])
+
+    def test_delta_since_cursor(self):
+        old = timezone.now() - timedelta(days=1)
+        Ticket.objects.filter(pk=self.tickets[0].pk).update(created_at=old)
+        Ticket.objects.filter(pk=self.tickets[1].pk).update(
+            created_at=old, verified_at=old
+        )
+        since = snapshot.encode_cursor(timezone.now() - timedelta(hours=1))
+
+        Ticket.admit(self.tickets[0].ticket_key, self.user)
+        data, _ = self.fetch(since=since)
+        self.assertTrue(data["delta"])
+        self.assertEqual(data["allowed"], [snapshot.digest(self.tickets[2].ticket_key)])
+        self.assertEqual(data["revoked"], [snapshot.digest(self.tickets[0].ticket_key)])
+
+    def test_other_users_tickets_excluded(self):
+        User.objects.create_user("other", password="Password123!")
+        self.client.login(username="other", password="Password123!")
+        data, _ = self.fetch()
+        self.assertEqual(data["allowed"], [])
+
+    def test_invalid_params(self):
+        for params in (
+            {"since": "abc"},
+            {"since": "-1"},
+            {"offer": "x"},
+            {"from": "2024-13-40"},
+            {"to": "demain"},
+        ):
+            self.assertEqual(self.client.get(self.url, params).status_code, 400, params)
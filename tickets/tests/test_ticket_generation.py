@@ -1,16 +1,83 @@
-from django.test import TestCase, override_settings
+from django.test import TestCase
 from django.contrib.auth.models import User
 from offers.models import Offer
-from orders.models import Order
+from orders.models import Order, OrderItem
 from tickets.models import Ticket
-import tempfile
+from tickets import keys
+
 
-@override_settings(MEDIA_ROOT=tempfile.gettempdir())
 class TicketGenerationTests(TestCase):
-    def test_ticket_key_and_qr_saved(self):
-        user = User.objects.create_user('u', password='Password123!')
-        offer = Offer.objects.create(name='Solo', offer_type='solo', price_eur=50, is_active=True)
+    def _qr_png(self, user, ticket):
+        self.client.force_login(user)
+        return self.client.get(f"/tickets/{ticket.id}/qr.png")
+
+    def test_ticket_key_and_qr_on_demand(self):
+        user = User.objects.create_user("u", password="Password123!")
+        offer = Offer.objects.create(
+            name="Solo", offer_type="solo", price_eur=50, is_active=True
+        )
         order = Order.objects.create(user=user)
         t = Ticket.create_from(user=user, order=order, offer=offer)
-        self.assertIn(':', t.ticket_key)  # contient checksum séparé
-        self.assertTrue(t.qr_image.name)
+        self.assertIn(":", t.ticket_key)  # contient checksum séparé
+        # aucun fichier écrit : le QR est rendu par la vue
+        self.assertFalse(Ticket.objects.get(id=t.id).qr_image)
+        r = self._qr_png(user, t)
+        self.assertEqual(r.status_code, 200)
+        self.assertTrue(r.content.startswith(b"\x89PNG"))
+
+    def test_issue_for_order_bulk(self):
+        user = User.objects.create_user("bulk", password="Password123!")
+        solo = Offer.objects.create(
+            name="Solo", offer_type="solo", price_eur=50, is_active=True
+        )
+        fam = Offer.objects.create(
+            name="Familiale", offer_type="familiale", price_eur=150, is_active=True
+        )
+        order = Order.objects.create(user=user)
+        OrderItem.objects.create(order=order, offer=solo, quantity=2)
+        OrderItem.objects.create(order=order, offer=fam, quantity=10)
+        order = Order.objects.select_related("user__profile").get(id=order.id)
+        # Nombre de requêtes constant quelle que soit la quantité :
+        # lignes, réservation des séries, INSERT (+ SAVEPOINT/RELEASE)
+        with self.assertNumQueries(5):
+            tickets = Ticket.issue_for_order(order)
+        self.assertEqual(len(tickets), 12)
+        self.assertTrue(all(t.id for t in tickets))
+        self.assertEqual(len({t.ticket_key for t in tickets}), 12)
+        self.assertEqual(Ticket.objects.filter(order=order, offer=fam).count(), 10)
+        # QR rendu à la demande, rien n'est stocké sur le ticket
+        self.assertFalse(tickets[0].qr_image)
+        self.assertEqual(self._qr_png(user, tickets[0]).status_code, 200)
+
+    def test_issue_for_order_skips_taken_serials(self):
+        user = User.objects.create_user("again", password="Password123!")
+        offer = Offer.objects.create(
+            name="Solo", offer_type="solo", price_eur=50, is_active=True
+        )
+        order = Order.objects.create(user=user)
+        OrderItem.objects.create(order=order, offer=offer, quantity=2)
+        first = Ticket.issue_for_order(order)
+        second = Ticket.issue_for_order(order)
+        keys = {t.ticket_key for t in first + second}
+        self.assertEqual(len(keys), 4)
+        order.refresh_from_db()
+        self.assertEqual(order.ticket_serial, 4)
+
+    def test_issue_for_order_retries_on_key_conflict(self):
+        user = User.objects.create_user("legacy", password="Password123!")
+        offer = Offer.objects.create(
+            name="Solo", offer_type="solo", price_eur=50, is_active=True
+        )
+        order = Order.objects.create(user=user)
+        OrderItem.objects.create(order=order, offer=offer, quantity=2)
+        # Clé occupant déjà la série 2 alors que le compteur est à 0
+        Ticket.objects.create(
+            user=user,
+            order=order,
+            offer=offer,
+            ticket_key=keys.sign(order.id, 2, offer.id, order.purchase_key),
+        )
+        tickets = Ticket.issue_for_order(order)
+        self.assertEqual(len(tickets), 2)
+        self.assertEqual(Ticket.objects.filter(order=order).count(), 3)
+        self.assertEqual([keys.parse(t.ticket_key)["serial"] for t in tickets], [3, 4])
@@ -5,29 +5,80 @@ from orders.models import Order, OrderItem
 from tickets.models import Ticket
 import tempfile
 
+
 @override_settings(MEDIA_ROOT=tempfile.gettempdir())
 class VerifyTicketTests(TestCase):
     def setUp(self):
-        self.user = User.objects.create_user('buyer', password='Password123!')
-        self.offer = Offer.objects.create(name='Solo', offer_type='solo', price_eur=50, is_active=True)
+        self.user = User.objects.create_user("buyer", password="Password123!")
+        self.offer = Offer.objects.create(
+            name="Solo", offer_type="solo", price_eur=50, is_active=True
+        )
         self.order = Order.objects.create(user=self.user)
         OrderItem.objects.create(order=self.order, offer=self.offer, quantity=1)
-        self.ticket = Ticket.create_from(user=self.user, order=self.order, offer=self.offer)
+        self.ticket = Ticket.create_from(
+            user=self.user, order=self.order, offer=self.offer
+        )
 
     def test_verify_requires_auth(self):
-        r = self.client.post('/api/tickets/verify/', {'ticket_key': self.ticket.ticket_key}, content_type='application/json')
+        r = self.client.post(
+            "/api/tickets/verify/",
+            {"ticket_key": self.ticket.ticket_key},
+            content_type="application/json",
+        )
         self.assertEqual(r.status_code, 403)
 
     def test_verify_success_and_errors(self):
-        self.client.login(username='buyer', password='Password123!')
+        self.client.login(username="buyer", password="Password123!")
         # OK
-        r = self.client.post('/api/tickets/verify/', {'ticket_key': self.ticket.ticket_key}, content_type='application/json')
+        r = self.client.post(
+            "/api/tickets/verify/",
+            {"ticket_key": self.ticket.ticket_key},
+            content_type="application/json",
+        )
         self.assertEqual(r.status_code, 200)
-        self.assertEqual(r.json().get('ok'), True)
+        self.assertEqual(r.json().get("ok"), True)
         # Bad format
-        r = self.client.post('/api/tickets/verify/', {'ticket_key': 'INVALID'}, content_type='application/json')
+        r = self.client.post(
+            "/api/tickets/verify/",
+            {"ticket_key": "INVALID"},
+            content_type="application/json",
+        )
         self.assertEqual(r.status_code, 400)
         # Bad checksum
-        bad = self.ticket.ticket_key[:-1] + ('x' if self.ticket.ticket_key[-1]!='x' else 'y')
-        r = self.client.post('/api/tickets/verify/', {'ticket_key': bad}, content_type='application/json')
+        bad = self.ticket.ticket_key[:-1] + (
+            "x" if self.ticket.ticket_key[-1] != "x" else "y"
+        )
+        r = self.client.post(
+            "/api/tickets/verify/", {"ticket_key": bad}, content_type="application/json"
+        )
         self.assertEqual(r.status_code, 400)
+
+    def test_first_scan_wins(self):
+        self.client.login(username="buyer", password="Password123!")
+        ticket = Ticket.issue_for_order(self.order)[0]
+        r1 = self.client.post(
+            "/api/tickets/verify/",
+            {"ticket_key": ticket.ticket_key},
+            content_type="application/json",
+        )
+        self.assertTrue(r1.json()["first_scan"])
+        r2 = self.client.post(
+            "/api/tickets/verify/",
+            {"ticket_key": ticket.ticket_key},
+            content_type="application/json",
+        )
+        self.assertEqual(r2.status_code, 200)
+        self.assertFalse(r2.json()["first_scan"])
+        self.assertEqual(r2.json()["verified_at"], r1.json()["verified_at"])
+
+    def test_admit_returns_original_timestamp(self):
+        ticket = Ticket.issue_for_order(self.order)[0]
+        with self.assertNumQueries(1):
+            admitted, first = Ticket.admit(ticket.ticket_key, self.user)
+        self.assertTrue(first)
+        self.assertEqual(admitted.offer_name, "Solo")
+        again, first = Ticket.admit(ticket.ticket_key, self.user)
+        self.assertFalse(first)
+        self.assertEqual(again.verified_at, admitted.verified_at)
+        other = User.objects.create_user("intruder", password="Password123!")
+        self.assertIsNone(Ticket.admit(ticket.ticket_key, other))
@@ -0,0 +1,119 @@
+from datetime import timedelta
+from unittest.mock import patch
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from django.contrib.auth.models import User
+from offers.models import Offer
+from orders.models import Order, OrderItem
+from tickets.models import Ticket
+from tickets import keys
+
+
+class VerifyBatchTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user("scanner", password="Password123!")
+        self.other = User.objects.create_user("other", password="Password123!")
+        offer = Offer.objects.create(
+            name="Duo", offer_type="duo", price_eur=90, is_active=True
+        )
+        order = Order.objects.create(user=self.user)
+        OrderItem.objects.create(order=order, offer=offer, quantity=3)
+        self.tickets = Ticket.issue_for_order(order)
+        other_order = Order.objects.create(user=self.other)
+        OrderItem.objects.create(order=other_order, offer=offer, quantity=1)
+        self.foreign = Ticket.issue_for_order(other_order)[0]
+        self.url = "/api/tickets/verify/batch/"
+
+    def post(self, data):
+        return self.client.post(self.url, data, content_type="application/json")
+
+    def test_requires_auth(self):
+        r = self.post({"ticket_keys": [self.tickets[0].ticket_key]})
+        self.assertEqual(r.status_code, 403)
+
+    def test_results_in_input_order(self):
+        self.client.login(username="scanner", password="Password123!")
+        forged = self.tickets[0].ticket_key[:-1] + (
+            "0" if self.tickets[0].ticket_key[-1] != "0" else "1"
+        )
+        unknown = keys.sign(999, 1, 1, "ff" * 16)
+        sent = [
+            self.tickets[2].ticket_key,
+            "garbage",
+            forged,
+            self.foreign.ticket_key,
+            unknown,
+            self.tickets[0].ticket_key,
+        ]
+        r = self.post({"ticket_keys": sent})
+        self.assertEqual(r.status_code, 200)
+        data = r.json()
+        self.assertEqual([res["ticket_key"] for res in data["results"]], sent)
+        self.assertEqual(
+            [res["ok"] for res in data["results"]],
+            [True, False, False, False, False, True],
+        )
+        self.assertEqual(data["results"][0]["ticket_id"], self.tickets[2].id)
+        self.assertEqual(data["results"][1]["error"], "Format invalide")
+        self.assertEqual(data["results"][2]["error"], "Signature invalide")
+        self.assertIn("inconnu", data["results"][3]["error"])
+        self.assertEqual(data["verified"], 2)
+        self.assertEqual(
+            Ticket.objects.filter(user=self.user, verified_at__isnull=False).count(), 2
+        )
+        self.foreign.refresh_from_db()
+        self.assertIsNone(self.foreign.verified_at)
+
+    def test_one_select_and_one_update(self):
+        self.client.login(username="scanner", password="Password123!")
+        self.client.get("/api/cart/")  # charge session et utilisateur
+        sent = [t.ticket_key for t in self.tickets]
+        with self.assertNumQueries(4):  # session, utilisateur, SELECT ... IN, UPDATE
+            r = self.post({"ticket_keys": sent})
+        self.assertEqual(r.json()["verified"], 3)
+
+    @override_settings(TICKET_VERIFY_BATCH_MAX=2)
+    def test_rejects_invalid_payloads(self):
+        self.client.login(username="scanner", password="Password123!")
+        self.assertEqual(self.post({"ticket_keys": []}).status_code, 400)
+        self.assertEqual(self.post({"ticket_keys": "nope"}).status_code, 400)
+        r = self.post({"ticket_keys": [t.ticket_key for t in self.tickets]})
+        self.assertEqual(r.status_code, 400)
+
+    def test_rescans_keep_first_timestamp(self):
+        self.client.login(username="scanner", password="Password123!")
+        key = self.tickets[0].ticket_key
+        first = self.post({"ticket_keys": [key, key]}).json()["results"]
+        self.assertEqual([res["first_scan"] for res in first], [True, False])
+        again = self.post({"ticket_keys": [key]}).json()["results"][0]
+        self.assertTrue(again["ok"])
+        self.assertFalse(again["first_scan"])
+        self.assertEqual(again["verified_at"], first[0]["verified_at"])
+
+    def test_ticket_admitted_after_preread_keeps_stored_timestamp(self):
+        self.client.login(username="scanner", password="Password123!")
+        earlier = timezone.now() - timedelta(seconds=5)
+        admit_many = Ticket.admit_many
+
+        def other_turnstile_first(ids, when=None):
+            # autre tourniquet entre le SELECT du lot et son UPDATE
+            Ticket.objects.filter(id=self.tickets[0].id).update(verified_at=earlier)
+            return admit_many(ids, when)
+
+        with patch("tickets.api.Ticket.admit_many", side_effect=other_turnstile_first):
+            r = self.post(
+                {
+                    "ticket_keys": [
+                        self.tickets[0].ticket_key,
+                        self.tickets[1].ticket_key,
+                    ]
+                }
+            )
+        self.assertEqual(r.status_code, 200)
+        raced, fresh = r.json()["results"]
+        self.assertTrue(raced["ok"])
+        self.assertFalse(raced["first_scan"])
+        self.assertEqual(raced["verified_at"], earlier.isoformat())
+        self.assertTrue(fresh["first_scan"])
+        self.tickets[0].refresh_from_db()
+        self.assertEqual(self.tickets[0].verified_at, earlier)
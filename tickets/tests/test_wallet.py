@@ -0,0 +1,76 @@
+from datetime import timedelta
+from django.contrib.auth.models import User
+from django.test import TestCase
+from django.utils import timezone
+from offers.models import Offer
+from orders.models import Order, OrderItem
+from tickets.models import Ticket, WALLET_PAGE_SIZE
+
+
+class WalletPaginationTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user("wallet", password="Password123!")
+        offer = Offer.objects.create(
+            name="Famille", offer_type="familiale", price_eur=150, is_active=True
+        )
+        order = Order.objects.create(user=self.user)
+        OrderItem.objects.create(
+            order=order, offer=offer, quantity=WALLET_PAGE_SIZE + 3
+        )
+        self.tickets = Ticket.issue_for_order(order)
+        # horodatages identiques deux à deux : le curseur départage par id
+        base = timezone.now() - timedelta(days=1)
+        for i, t in enumerate(self.tickets):
+            Ticket.objects.filter(pk=t.pk).update(
+                created_at=base + timedelta(seconds=i // 2)
+            )
+        self.client.login(username="wallet", password="Password123!")
+
+    def expected_order(self):
+        return list(
+            Ticket.objects.filter(user=self.user)
+            .order_by("-created_at", "-id")
+            .values_list("id", flat=True)
+        )
+
+    def test_html_pages_cover_all_tickets_with_lazy_thumbnails(self):
+        r = self.client.get("/my/tickets/")
+        first = [t.id for t in r.context["tickets"]]
+        self.assertEqual(len(first), WALLET_PAGE_SIZE)
+        self.assertContains(r, 'loading="lazy"', count=WALLET_PAGE_SIZE)
+        self.assertContains(r, f"/tickets/{first[0]}/qr-thumb.png")
+        self.assertNotContains(
+            r, f'<img src="/tickets/{first[0]}/qr.png"'
+        )  # pleine taille à l'ouverture seulement
+        r = self.client.get("/my/tickets/", {"cursor": r.context["next_cursor"]})
+        rest = [t.id for t in r.context["tickets"]]
+        self.assertIsNone(r.context["next_cursor"])
+        self.assertEqual(first + rest, self.expected_order())
+
+    def test_json_variant(self):
+        seen, cursor = [], None
+        while True:
+            r = self.client.get(
+                "/api/my/tickets/", {"cursor": cursor} if cursor else {}
+            )
+            self.assertEqual(r.status_code, 200)
+            data = r.json()
+            seen += [t["id"] for t in data["results"]]
+            cursor = data["next_cursor"]
+            if not cursor:
+                break
+        self.assertEqual(seen, self.expected_order())
+        self.assertEqual(
+            data["results"][0]["qr"]["thumb"],
+            f"/tickets/{data['results'][0]['id']}/qr-thumb.png",
+        )
+        self.assertEqual(
+            self.client.get("/api/my/tickets/", {"cursor": "x"}).status_code, 400
+        )
+
+    def test_thumbnail_is_smaller_png(self):
+        t = self.tickets[0]
+        thumb = self.client.get(f"/tickets/{t.id}/qr-thumb.png")
+        full = self.client.get(f"/tickets/{t.id}/qr.png")
+        self.assertEqual(thumb["Content-Type"], "image/png")
+        self.assertLess(len(thumb.content), len(full.content))
@@ -1,7 +1,25 @@
 from django.urls import path
-from .views import scan_page, my_tickets
+from .views import scan_page, my_tickets, ticket_qr
 
 urlpatterns = [
     path("scan/", scan_page, name="scan_page"),
     path("my/tickets/", my_tickets, name="my_tickets"),
+    path(
+        "tickets/<int:ticket_id>/qr.png",
+        ticket_qr,
+        {"fmt": "png"},
+        name="ticket_qr_png",
+    ),
+    path(
+        "tickets/<int:ticket_id>/qr.svg",
+        ticket_qr,
+        {"fmt": "svg"},
+        name="ticket_qr_svg",
+    ),
+    path(
+        "tickets/<int:ticket_id>/qr-thumb.png",
+        ticket_qr,
+        {"fmt": "thumb"},
+        name="ticket_qr_thumb",
+    ),
 ]
@@ -0,0 +1,51 @@
+"""Cache des résultats de vérification de tickets.
+
+Clé = empreinte SHA-256 de (utilisateur, clé complète) : pas de collision entre
+les tickets d'un même acheteur, ni de fuite d'un utilisateur à l'autre.
+Les résultats positifs et négatifs ont des durées de vie distinctes ; l'entrée
+est invalidée quand le ticket est scanné par lot, modifié ou supprimé (révoqué).
+Une panne du cache ne fait jamais échouer une vérification.
+"""
+
+import hashlib
+import logging
+from django.conf import settings
+from django.core.cache import cache
+
+logger = logging.getLogger("etickets.business")
+
+
+def cache_key(user_id, key: str) -> str:
+    return "ticket_verify:" + hashlib.sha256(f"{user_id}|{key}".encode()).hexdigest()
+
+
+def get(user_id, key: str):
+    """Renvoie ``(payload, status)`` en cache, ou ``None``."""
+    try:
+        return cache.get(cache_key(user_id, key))
+    except Exception as exc:
+        logger.warning(f"verify cache get failed: {exc}")
+        return None
+
+
+def set(user_id, key: str, payload: dict, status: int = 200):
+    ttl = (
+        getattr(settings, "TICKET_VERIFY_CACHE_TTL", 300)
+        if payload.get("ok")
+        else getattr(settings, "TICKET_VERIFY_NEGATIVE_TTL", 60)
+    )
+    try:
+        cache.set(cache_key(user_id, key), (payload, status), ttl)
+    except Exception as exc:
+        logger.warning(f"verify cache set failed: {exc}")
+
+
+def invalidate(pairs):
+    """Supprime les entrées pour des couples ``(user_id, ticket_key)``."""
+    keys = [cache_key(user_id, key) for user_id, key in pairs]
+    if not keys:
+        return
+    try:
+        cache.delete_many(keys)
+    except Exception as exc:
+        logger.warning(f"verify cache invalidation failed: {exc}")
@@ -1,11 +1,51 @@
 from django.shortcuts import render
 from django.contrib.auth.decorators import login_required
+from django.http import Http404, HttpResponse, HttpResponseNotModified
+from django.utils.http import parse_etags
 from .models import Ticket
+from . import qr
+
 
 def scan_page(request):
     return render(request, "scan.html")
 
+
 @login_required
 def my_tickets(request):
-    tickets = Ticket.objects.filter(user=request.user).select_related("offer","order").order_by("-id")
-    return render(request, "my_tickets.html", {"tickets": tickets})
+    """Portefeuille paginé (``?cursor=``) ; vignettes QR chargées paresseusement,
+    le QR pleine taille seulement à l'ouverture d'un ticket."""
+    cursor = request.GET.get("cursor")
+    try:
+        tickets, next_cursor = Ticket.wallet_page(request.user, cursor)
+    except ValueError:
+        cursor = None
+        tickets, next_cursor = Ticket.wallet_page(request.user)
+    return render(
+        request,
+        "my_tickets.html",
+        {"tickets": tickets, "next_cursor": next_cursor, "is_first_page": not cursor},
+    )
+
+
+@login_required
+def ticket_qr(request, ticket_id: int, fmt: str):
+    """GET /tickets/<id>/qr.png|svg|qr-thumb.png — QR rendu à la demande.
+
+    L'image est calculée depuis ``ticket_key``.
+    """
+    key = (
+        Ticket.objects.filter(id=ticket_id, user=request.user)
+        .values_list("ticket_key", flat=True)
+        .first()
+    )
+    if key is None:
+        raise Http404("Ticket introuvable")
+    etag = qr.etag_for(key, fmt)
+    inm = request.headers.get("If-None-Match", "")
+    if inm.strip() == "*" or etag in parse_etags(inm):
+        response = HttpResponseNotModified()
+    else:
+        response = HttpResponse(qr.render(key, fmt), content_type=qr.CONTENT_TYPES[fmt])
+    response["ETag"] = etag
+    response["Cache-Control"] = "private, max-age=31536000, immutable"
+    return response